@@ -1,24 +1,10 @@
 import base64
-import json
-import os
-import re
-from openai import OpenAI
+from app.core.config import settings
+from app.schemas.ai_output import FloorplanStructureOutput
+from app.services.ai_decoding import responses_structured
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-
-def extract_json(text: str):
-    """GPT가 텍스트를 섞어서 보내도 JSON 부분만 추출"""
-    match = re.search(r"\{[\s\S]*\}", text)
-    if not match:
-        return {}
-    try:
-        return json.loads(match.group())
-    except:
-        return {}
-
-
-def analyze_floorplan_with_gpt(image_path: str):
+async def analyze_floorplan_with_gpt(image_path: str):
     with open(image_path, "rb") as f:
         img_b64 = base64.b64encode(f.read()).decode()
 
@@ -32,11 +18,15 @@ def analyze_floorplan_with_gpt(image_path: str):
       "doors": [{"x":0,"y":0,"width_cm":80}],
       "windows": [{"x":0,"y":0,"width_cm":120}],
       "rooms": [{"type":"kitchen","polygon":[[x,y], ...]}],
-      "built_in": [{"type":"closet","polygon":[[x,y], ...]}]
+      "built_in": [{"type":"closet","polygon":[[x,y], ...]}],
+      "cm_per_px": 1.0
     }
+    좌표는 이미지 픽셀(px) 기준.
+    cm_per_px: 치수선 숫자나 문 폭으로 추정한 1px당 실제 길이(cm). 추정할 수 없으면 null.
     """
 
-    response = client.responses.create(
+    structure = await responses_structured(
+        FloorplanStructureOutput,
         model="gpt-4o",
         input=[
             {
@@ -46,14 +36,11 @@ def analyze_floorplan_with_gpt(image_path: str):
                     {
                         "type": "input_image",
                         "image_url": f"data:image/png;base64,{img_b64}",
+                        "detail": settings.FLOORPLAN_IMAGE_DETAIL,
                     }
                 ]
             }
         ]
     )
 
-    text = response.output_text
-
-    print("\n=========== GPT RAW OUTPUT ===========\n", text)
-
-    return extract_json(text)
+    return structure.model_dump()
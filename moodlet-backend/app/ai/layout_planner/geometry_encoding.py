@@ -0,0 +1,225 @@
+# app/ai/layout_planner/geometry_encoding.py
+
+"""
+모델 프롬프트용 평면도 / 가구 목록 압축 인코딩.
+
+json.dumps(fp_struct) 대신
+1) 좌표(px)를 precision_cm에 해당하는 px 격자로 양자화 (정수, 축척 = struct의 cm_per_px)
+2) 같은 직선 위에서 이어지거나 겹치는 벽 선분 병합
+3) 방 polygon Douglas-Peucker 단순화 (허용 오차 = 같은 px 격자)
+4) 키 이름 반복 없는 표 형식 텍스트로 출력
+
+    coords px (1px = 2cm) rounded to 5
+    walls(x1 y1 x2 y2)
+    0 0 600 0
+    ...
+    rooms(type: x,y ...)
+    bedroom: 0,0 300,0 300,400 0,400
+
+precision_cm ↑ → 프롬프트 ↓ / 좌표 오차 ↑ (설정: LAYOUT_GEOMETRY_PRECISION_CM, 0이면 기존 JSON)
+"""
+
+import json
+import math
+
+from app.ai.layout_planner.occupancy import cm_per_px
+
+
+def _num(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def quantize(value: float, step: float) -> int:
+    """step 배수로 반올림한 정수 좌표 (step <= 0 이면 정수 반올림만)"""
+    if step <= 0:
+        return round(value)
+    return round(round(value / step) * step)
+
+
+# --------------------------------------------------------
+# 토큰 수
+# --------------------------------------------------------
+_encoder = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    tiktoken(o200k_base, gpt-4o 계열)이 설치돼 있으면 실제 토큰 수,
+    없으면 근사치 (ASCII 4글자 = 1토큰, 그 외 문자 1글자 = 1토큰)
+    """
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoder = False
+    if _encoder:
+        return len(_encoder.encode(text))
+
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+# --------------------------------------------------------
+# 1) 벽 병합
+# --------------------------------------------------------
+def merge_collinear_walls(walls: list, step: float) -> list:
+    """
+    끝점을 step 격자로 스냅한 뒤, 같은 직선(정수 직선 방정식 a·x + b·y = c) 위에서
+    겹치거나 맞닿는 선분을 하나로 합침. 스냅 후 길이 0인 벽은 버림.
+    (검출 결과의 잘게 쪼개진 / 약간 흔들린 벽 조각이 같은 직선으로 모임)
+    반환: [(x1, y1, x2, y2), ...] 정수 좌표
+    """
+    lines: dict[tuple, list] = {}
+    for w in walls:
+        x1, y1, x2, y2 = (quantize(_num(w.get(k)), step) for k in ("x1", "y1", "x2", "y2"))
+        if (x1, y1) == (x2, y2):
+            continue
+        a, b = y2 - y1, x1 - x2
+        g = math.gcd(a, b)
+        a, b = a // g, b // g
+        if a < 0 or (a == 0 and b < 0):
+            a, b = -a, -b
+        c = a * x1 + b * y1
+        # 직선 방향 (-b, a) 위 위치
+        t1, t2 = -b * x1 + a * y1, -b * x2 + a * y2
+        lines.setdefault((a, b, c), []).append((min(t1, t2), max(t1, t2)))
+
+    merged = []
+    for (a, b, c), intervals in lines.items():
+        intervals.sort()
+        start, end = intervals[0]
+        for lo, hi in intervals[1:]:
+            if lo <= end:
+                end = max(end, hi)
+            else:
+                merged.append(_on_line(a, b, c, start) + _on_line(a, b, c, end))
+                start, end = lo, hi
+        merged.append(_on_line(a, b, c, start) + _on_line(a, b, c, end))
+    return merged
+
+
+def _on_line(a: int, b: int, c: int, t: int) -> tuple[int, int]:
+    # a·x + b·y = c, -b·x + a·y = t 의 해
+    norm = a * a + b * b
+    return round((a * c - b * t) / norm), round((b * c + a * t) / norm)
+
+
+# --------------------------------------------------------
+# 2) polygon 단순화
+# --------------------------------------------------------
+def _point_line_dist(p, a, b) -> float:
+    (px, py), (ax, ay), (bx, by) = p, a, b
+    dx, dy = bx - ax, by - ay
+    length = math.hypot(dx, dy)
+    if length == 0:
+        return math.hypot(px - ax, py - ay)
+    return abs(dy * px - dx * py + bx * ay - by * ax) / length
+
+
+def douglas_peucker(points: list, epsilon: float) -> list:
+    """열린 polyline 단순화 (재귀 대신 스택)"""
+    if len(points) < 3 or epsilon <= 0:
+        return list(points)
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        best_idx, best_dist = None, epsilon
+        for k in range(start + 1, end):
+            d = _point_line_dist(points[k], points[start], points[end])
+            if d > best_dist:
+                best_idx, best_dist = k, d
+        if best_idx is not None:
+            keep[best_idx] = True
+            stack += [(start, best_idx), (best_idx, end)]
+    return [p for p, k in zip(points, keep) if k]
+
+
+def simplify_polygon(polygon: list, epsilon: float) -> list:
+    """닫힌 polygon: 시작점에서 가장 먼 꼭짓점 기준으로 두 polyline으로 나눠 단순화"""
+    pts = [(_num(p[0]), _num(p[1])) for p in polygon if len(p) >= 2]
+    if len(pts) <= 3 or epsilon <= 0:
+        return pts
+
+    far = max(range(len(pts)), key=lambda k: math.hypot(pts[k][0] - pts[0][0], pts[k][1] - pts[0][1]))
+    first = douglas_peucker(pts[:far + 1], epsilon)
+    second = douglas_peucker(pts[far:] + [pts[0]], epsilon)
+    simplified = first[:-1] + second[:-1]
+    return simplified if len(simplified) >= 3 else pts
+
+
+# --------------------------------------------------------
+# 3) 표 형식 인코딩
+# --------------------------------------------------------
+def _q(value, step: float) -> str:
+    return str(quantize(_num(value), step))
+
+
+def encode_floorplan(struct: dict, precision_cm: float) -> str:
+    """{walls, doors, windows, rooms, cm_per_px} → 압축 텍스트 (좌표는 px, 격자 = precision_cm / cm_per_px)"""
+    scale = cm_per_px(struct)
+    step = precision_cm / scale
+    lines = [f"coords px (1px = {scale:g}cm) rounded to {step:g}"]
+
+    lines.append("walls(x1 y1 x2 y2)")
+    lines += [
+        " ".join(map(str, wall))
+        for wall in sorted(merge_collinear_walls(struct.get("walls") or [], step))
+    ]
+
+    for key in ("doors", "windows"):
+        items = struct.get(key) or []
+        if items:
+            lines.append(f"{key}(x y width)")
+            lines += [
+                f"{_q(o.get('x'), step)} {_q(o.get('y'), step)} {_q(o.get('width_cm'), 1)}"
+                for o in items
+            ]
+
+    rooms = struct.get("rooms") or []
+    if rooms:
+        lines.append("rooms(type: x,y ...)")
+        for room in rooms:
+            pts = simplify_polygon(room.get("polygon") or [], step)
+            coords = " ".join(f"{_q(x, step)},{_q(y, step)}" for x, y in pts)
+            lines.append(f"{room.get('type') or 'room'}: {coords}")
+
+    return "\n".join(lines)
+
+
+def encode_furniture(furniture: list) -> str:
+    """[{id, name, width, depth, category}] → 'id|width|depth|category|name' 표"""
+    lines = ["id|width|depth|category|name"]
+    for f in furniture:
+        w = "" if f.get("width") is None else _q(f["width"], 1)
+        d = "" if f.get("depth") is None else _q(f["depth"], 1)
+        name = str(f.get("name") or "").replace("|", "/").replace("\n", " ")
+        lines.append(f"{f['id']}|{w}|{d}|{f.get('category') or ''}|{name}")
+    return "\n".join(lines)
+
+
+def encode_layout_inputs(struct: dict, furniture: list, precision_cm: float) -> tuple[str, str, dict]:
+    """
+    (평면도 텍스트, 가구 텍스트, 토큰 통계) 반환
+    precision_cm <= 0 이면 기존 JSON 그대로 (비교/롤백용)
+    """
+    raw_fp = json.dumps(struct, ensure_ascii=False)
+    raw_furniture = json.dumps(furniture, ensure_ascii=False)
+    if precision_cm <= 0:
+        fp_text, furniture_text = raw_fp, raw_furniture
+    else:
+        fp_text = encode_floorplan(struct, precision_cm)
+        furniture_text = encode_furniture(furniture)
+
+    stats = {
+        "tokens_before": count_tokens(raw_fp) + count_tokens(raw_furniture),
+        "tokens_after": count_tokens(fp_text) + count_tokens(furniture_text),
+    }
+    return fp_text, furniture_text, stats
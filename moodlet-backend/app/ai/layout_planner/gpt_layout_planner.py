@@ -1,10 +1,12 @@
-import json
-from openai import OpenAI
-import os
-from app.models.floorplan import FloorplanObject
+from sqlalchemy import select
+from app.core.config import settings
+from app.core.tracing import span
+from app.schemas.ai_output import LayoutPlanOutput
+from app.services.ai_decoding import chat_structured
+from app.models.floorplan import Floorplan, FloorplanObject
 from app.models.furniture import FurnitureProduct
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from app.ai.layout_planner.geometry_encoding import encode_layout_inputs
+from app.ai.layout_planner.preview_renderer import render_layout_preview
 
 SYSTEM_PROMPT = """
 너는 고급 인테리어 가구 배치 전문가 AI이다.
@@ -20,10 +22,8 @@ SYSTEM_PROMPT = """
 - 좌표 단위는 픽셀(px).
 """
 
-def run_gpt_layout(db, fp_id: int, furniture_ids: list):
-    # 1) floorplan 구조 가져오기
-    objects = db.query(FloorplanObject).filter(FloorplanObject.fp_id == fp_id).all()
-
+def build_floorplan_struct(objects) -> dict:
+    """FloorplanObject 목록 → 프롬프트용 {walls, doors, windows, rooms}"""
     fp_struct = {
         "walls": [],
         "doors": [],
@@ -42,41 +42,92 @@ def run_gpt_layout(db, fp_id: int, furniture_ids: list):
         elif t == "room":
             fp_struct["rooms"].append(o.position_json)
 
-    # 2) 가구 정보 가져오기
+    return fp_struct
+
+
+async def run_gpt_layout(db, fp_id: int, furniture_ids: list):
+    """
+    db: AsyncSession
+    필요한 행을 모두 읽은 뒤 트랜잭션을 끝내고 모델을 호출 → 응답을 기다리는 동안 풀 커넥션을 잡지 않음
+    (결과 저장은 호출부에서 같은 세션으로 새 트랜잭션)
+    """
+    # 1) floorplan 구조 가져오기
+    objects = (
+        await db.execute(select(FloorplanObject).where(FloorplanObject.fp_id == fp_id))
+    ).scalars().all()
+
+    fp_struct = build_floorplan_struct(objects)
+    # 분석 결과의 축척 → 좌표 양자화 격자(px) 계산에 사용
+    meta = (
+        await db.execute(select(Floorplan.meta_json).where(Floorplan.fp_id == fp_id))
+    ).scalar()
+    if isinstance(meta, dict) and meta.get("cm_per_px"):
+        fp_struct["cm_per_px"] = meta["cm_per_px"]
+
+    # 2) 가구 정보 가져오기 (IN 쿼리 한 번)
+    rows = (
+        await db.execute(
+            select(
+                FurnitureProduct.product_id,
+                FurnitureProduct.name,
+                FurnitureProduct.width,
+                FurnitureProduct.depth,
+                FurnitureProduct.category,
+            ).where(FurnitureProduct.product_id.in_(furniture_ids))
+        )
+    ).all()
+    by_id = {r.product_id: r for r in rows}
+
+    # 읽기 트랜잭션 종료 → 커넥션 반환 (expire_on_commit=False라 호출부 객체 속성은 유지)
+    await db.commit()
+
     furniture_data = []
     for fid in furniture_ids:
-        f = db.query(FurnitureProduct).filter(FurnitureProduct.product_id == fid).first()
+        f = by_id.get(fid)
+        if not f:
+            continue
         furniture_data.append({
             "id": fid,
-            "name": f.product_name,
-            "width": f.width_cm,
-            "depth": f.depth_cm,
+            "name": f.name,
+            "width": float(f.width) if f.width is not None else None,
+            "depth": float(f.depth) if f.depth is not None else None,
             "category": f.category,
         })
 
-    # 3) GPT에 프롬프트 구성
+    # 3) GPT에 프롬프트 구성 (벽 병합 / polygon 단순화 / 좌표 양자화한 표 형식)
+    with span("encode_layout_inputs", precision=settings.LAYOUT_GEOMETRY_PRECISION_CM) as s:
+        fp_text, furniture_text, stats = encode_layout_inputs(
+            fp_struct, furniture_data, settings.LAYOUT_GEOMETRY_PRECISION_CM
+        )
+        if s is not None:
+            s.set(**stats)
+
     prompt = f"""
-    평면도 구조:
-    {json.dumps(fp_struct, ensure_ascii=False)}
-
-    배치할 가구 목록:
-    {json.dumps(furniture_data, ensure_ascii=False)}
-
-    아래 형식으로 출력해라:
-
-    [
-      {{
-        "furniture_id": 1,
-        "position": {{"x":100, "y":120}},
-        "size": {{"w":120, "h":60}},
-        "rotation": 0,
-        "confidence": 0.95,
-        "z_index": 1
-      }}
-    ]
+    평면도 구조 (한 줄에 하나, 괄호 안이 열 순서):
+    {fp_text}
+
+    배치할 가구 목록 (첫 줄이 열 이름, id가 furniture_id):
+    {furniture_text}
+
+    아래 형식의 JSON으로 출력해라:
+
+    {{
+      "items": [
+        {{
+          "furniture_id": 1,
+          "position": {{"x":100, "y":120}},
+          "size": {{"w":120, "h":60}},
+          "rotation": 0,
+          "confidence": 0.95,
+          "z_index": 1
+        }}
+      ]
+    }}
     """
 
-    response = client.chat.completions.create(
+    plan = await chat_structured(
+        LayoutPlanOutput,
+        list_key="items",
         model="gpt-4o",
         messages=[
             {"role": "system", "content": SYSTEM_PROMPT},
@@ -84,32 +135,12 @@ def run_gpt_layout(db, fp_id: int, furniture_ids: list):
         ]
     )
 
-    txt = response.choices[0].message["content"]
-    return json.loads(txt)
+    return [item.model_dump() for item in plan.items]
 
-def generate_preview_image(floorplan_url: str, items: list):
+def generate_preview_image(db, layout_id: int):
     """
     floorplan + 배치된 가구를 시각적으로 그려주는 이미지 생성
+    - gpt-image 대신 저장된 좌표 그대로 로컬 SVG 렌더링 (preview_renderer)
+    - base64 data URI 대신 캐시된 정적 파일 URL 반환
     """
-
-    prompt = f"""
-    다음 평면도 위에 주어진 가구들을 배치한 모습을 하나의 이미지로 그려줘.
-
-    평면도 URL:
-    {floorplan_url}
-
-    가구 목록:
-    {items}
-
-    '배치된 인테리어 프리뷰 이미지' 형태로 자연스럽게 렌더링해줘.
-    """
-
-    resp = client.images.generate(
-        model="gpt-image-1",
-        prompt=prompt,
-        size="1024x1024"
-    )
-
-    img_b64 = resp.data[0].b64_json
-    return "data:image/png;base64," + img_b64
-
+    return render_layout_preview(db, layout_id)
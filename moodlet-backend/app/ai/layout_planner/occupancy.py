@@ -0,0 +1,470 @@
+# app/ai/layout_planner/occupancy.py
+
+"""
+평면도 점유 격자(occupancy grid) + 거리장(distance field).
+
+- 업로드 직후 평면도 구조(벽/문/창문/방)를 FLOORPLAN_GRID_CM 해상도 격자로 래스터화
+    blocked  : 벽(두께 WALL_THICKNESS_CM) / 문 회전 반경 / 창문 앞 여유 공간
+    distance : 가장 가까운 blocked 셀까지의 유클리드 거리(cm, 정확한 EDT)
+               blocked가 하나도 없으면 격자 대각선 길이 (JSON으로 내보낼 수 있는 유한값)
+    rooms    : 셀별 방 번호 (0 = 방 밖, i + 1 = rooms[i])
+- uploads/grids/{fp_id}.npz 로 압축 저장
+  읽을 때는 캐시 디렉터리에 .npy로 한 번 풀어두고 memory map (프로세스 간 페이지 공유)
+- 좌표 → 셀 변환 + 배열 인덱싱 1회: is_free / clearance_cm / room_at 모두 O(1)
+  직사각형이 비었는지(rect_free)는 누적합(integral image)으로 O(1)
+
+좌표 단위는 분석 결과와 같은 픽셀(px), 치수(벽 두께 / 문·창문 폭 / 격자 크기 / 거리)는 cm.
+px → cm 비율은 분석 결과의 cm_per_px (없으면 FLOORPLAN_DEFAULT_CM_PER_PX).
+
+격자 캐시(_loaded)는 sync 라우트가 threadpool에서 함께 쓰므로 _lock으로 보호,
+임시 파일은 호출마다 고유한 이름으로 쓴 뒤 os.replace.
+"""
+
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.tracing import span
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+GRID_DIR = os.path.join(ROOT_DIR, "uploads", "grids")
+GRID_CACHE_DIR = os.path.join(GRID_DIR, "mmap")
+
+WALL_THICKNESS_CM = 10.0
+DEFAULT_DOOR_CM = 80.0
+DEFAULT_WINDOW_CM = 60.0
+GRID_PAD_CM = 20.0
+
+# 셀 수 상한 — 넘으면 셀 크기를 키워서 맞춤 (EDT 비용 ∝ 높이 × 너비²)
+MAX_GRID_CELLS = 250_000
+# EDT 행 방향 단계에서 한 번에 만드는 (행, 열, 열) 블록 원소 수 상한
+EDT_CHUNK_ELEMS = 4_000_000
+
+LOADED_MAX = 32
+_loaded: "OrderedDict[int, OccupancyGrid]" = OrderedDict()
+_lock = threading.Lock()
+
+ARRAY_NAMES = ("blocked", "distance", "rooms")
+
+
+def _num(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def cm_per_px(struct: dict) -> float:
+    """분석 결과의 px → cm 비율 (없거나 잘못된 값이면 설정 기본값)"""
+    scale = _num(struct.get("cm_per_px"), 0.0)
+    return scale if scale > 0 else settings.FLOORPLAN_DEFAULT_CM_PER_PX
+
+
+def _tmp_name(path: str) -> str:
+    return f"{path}.{uuid.uuid4().hex}.tmp"
+
+
+# --------------------------------------------------------
+# 격자 객체
+# --------------------------------------------------------
+class OccupancyGrid:
+    def __init__(self, blocked, distance, rooms, meta: dict):
+        self.blocked = blocked
+        self.distance = distance
+        self.rooms = rooms
+        self.meta = meta
+        self.origin_x = meta["origin"][0]
+        self.origin_y = meta["origin"][1]
+        # 이전 버전 격자는 cell_cm만 저장 (당시 1px = 1cm 가정)
+        self.cm_per_px = meta.get("cm_per_px", 1.0)
+        self.cell_px = meta.get("cell_px", meta.get("cell_cm"))
+        self.room_types = meta.get("room_types", [])
+        self._integral = None
+        self._free_widths = {}
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.blocked.shape
+
+    def to_cell(self, x: float, y: float) -> tuple[int, int] | None:
+        """좌표(px) → (row, col). 격자 밖이면 None"""
+        col = int((x - self.origin_x) // self.cell_px)
+        row = int((y - self.origin_y) // self.cell_px)
+        h, w = self.shape
+        if 0 <= row < h and 0 <= col < w:
+            return row, col
+        return None
+
+    def is_free(self, x: float, y: float) -> bool:
+        cell = self.to_cell(x, y)
+        return cell is not None and not self.blocked[cell]
+
+    def clearance_cm(self, x: float, y: float) -> float:
+        """가장 가까운 벽/문/창문까지 거리(cm). 격자 밖이면 0"""
+        cell = self.to_cell(x, y)
+        return float(self.distance[cell]) if cell is not None else 0.0
+
+    def room_at(self, x: float, y: float) -> int | None:
+        """rooms 목록 인덱스 (방 밖이면 None)"""
+        cell = self.to_cell(x, y)
+        if cell is None:
+            return None
+        label = int(self.rooms[cell])
+        return label - 1 if label else None
+
+    def room_type_at(self, x: float, y: float) -> str | None:
+        idx = self.room_at(x, y)
+        return self.room_types[idx] if idx is not None and idx < len(self.room_types) else None
+
+    @property
+    def integral(self) -> np.ndarray:
+        """blocked 누적합 (앞에 0 행/열을 붙여 경계 분기 없이 사각형 합 계산)"""
+        if self._integral is None:
+            summed = np.asarray(self.blocked, dtype=np.int32).cumsum(axis=0).cumsum(axis=1)
+            self._integral = np.pad(summed, ((1, 0), (1, 0)))
+        return self._integral
+
+    def rect_free(self, x: float, y: float, w: float, h: float) -> bool:
+        """좌상단 (x, y), 크기 w × h (px) 축 정렬 사각형이 격자 안이고 blocked 셀과 겹치지 않는지"""
+        rows, cols = self.shape
+        c0 = int((x - self.origin_x) // self.cell_px)
+        r0 = int((y - self.origin_y) // self.cell_px)
+        c1 = int(np.ceil((x + w - self.origin_x) / self.cell_px))
+        r1 = int(np.ceil((y + h - self.origin_y) / self.cell_px))
+        if c0 < 0 or r0 < 0 or c1 > cols or r1 > rows or c1 <= c0 or r1 <= r0:
+            return False
+        s = self.integral
+        return int(s[r1, c1] - s[r0, c1] - s[r1, c0] + s[r0, c0]) == 0
+
+    def free_widths(self, room_index: int | None, bbox=None) -> np.ndarray:
+        """
+        방(rooms 목록 room_index)의 빈 셀 → free_rect_widths (격자 객체에 캐시)
+        room_index가 None이면 bbox (x0, y0, x1, y1) px 안의 빈 셀 (방 정보가 없는 평면도)
+        """
+        key = room_index if room_index is not None else tuple(bbox)
+        cached = self._free_widths.get(key)
+        if cached is not None:
+            return cached
+
+        free = ~np.asarray(self.blocked, dtype=bool)
+        if room_index is not None:
+            allowed = free & (np.asarray(self.rooms) == room_index + 1)
+        else:
+            x0, y0, x1, y1 = bbox
+            c0 = max(int(np.ceil((x0 - self.origin_x) / self.cell_px)), 0)
+            r0 = max(int(np.ceil((y0 - self.origin_y) / self.cell_px)), 0)
+            c1 = int((x1 - self.origin_x) // self.cell_px)
+            r1 = int((y1 - self.origin_y) // self.cell_px)
+            allowed = np.zeros_like(free)
+            allowed[r0:r1, c0:c1] = free[r0:r1, c0:c1]
+
+        rows = np.flatnonzero(allowed.any(axis=1))
+        cols = np.flatnonzero(allowed.any(axis=0))
+        if rows.size == 0:
+            widths = np.zeros(1, dtype=np.int64)
+        else:
+            widths = free_rect_widths(allowed[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1])
+        self._free_widths[key] = widths
+        return widths
+
+
+def free_rect_widths(allowed: np.ndarray) -> np.ndarray:
+    """
+    allowed(True = 놓을 수 있는 셀) 안의 축 정렬 사각형 → widths[k] = 높이 k셀 사각형의 최대 폭(셀)
+    높이 k, 폭 L 사각형은 어떤 행에서 "위로 k셀 이상 연속"인 셀이 L개 연달아 있을 때만 존재.
+    마지막 원소는 항상 0 (그보다 높은 사각형은 없음)
+    """
+    h, w = allowed.shape
+    up = np.zeros((h, w), dtype=np.int32)
+    run = np.zeros(w, dtype=np.int32)
+    for r in range(h):
+        run = np.where(allowed[r], run + 1, 0)
+        up[r] = run
+
+    widths = [w]
+    for k in range(1, h + 1):
+        tall = up >= k
+        keep = tall.any(axis=1)
+        if not keep.any():
+            break
+        # 높이 k를 못 채우는 행은 이후 k에서도 못 채움 → 제외
+        up, tall = up[keep], tall[keep]
+        # 행 사이에 False 열을 끼워 한 번의 diff로 모든 행의 연속 구간 길이 계산
+        edges = np.diff(np.pad(tall, ((0, 0), (1, 1))).ravel().astype(np.int8))
+        widths.append(int((np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)).max()))
+    widths.append(0)
+    return np.asarray(widths, dtype=np.int64)
+
+
+# --------------------------------------------------------
+# 래스터화
+# --------------------------------------------------------
+def _bounds(struct: dict) -> tuple[float, float, float, float] | None:
+    xs, ys = [], []
+    for w in struct.get("walls") or []:
+        xs += [_num(w.get("x1")), _num(w.get("x2"))]
+        ys += [_num(w.get("y1")), _num(w.get("y2"))]
+    for r in struct.get("rooms") or []:
+        for pt in r.get("polygon") or []:
+            xs.append(_num(pt[0]))
+            ys.append(_num(pt[1]))
+    for o in (struct.get("doors") or []) + (struct.get("windows") or []):
+        xs.append(_num(o.get("x")))
+        ys.append(_num(o.get("y")))
+    if not xs:
+        return None
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _mark_segment(blocked, x1, y1, x2, y2, radius):
+    """선분에서 radius(셀) 이내인 셀 중심을 blocked 처리 (선분 주변 창만 계산)"""
+    h, w = blocked.shape
+    r0 = max(int(np.floor(min(y1, y2) - radius)), 0)
+    r1 = min(int(np.ceil(max(y1, y2) + radius)) + 1, h)
+    c0 = max(int(np.floor(min(x1, x2) - radius)), 0)
+    c1 = min(int(np.ceil(max(x1, x2) + radius)) + 1, w)
+    if r0 >= r1 or c0 >= c1:
+        return
+
+    py = np.arange(r0, r1)[:, None] + 0.5
+    px = np.arange(c0, c1)[None, :] + 0.5
+    dx, dy = x2 - x1, y2 - y1
+    length2 = dx * dx + dy * dy
+    if length2 == 0:
+        t = 0.0
+    else:
+        t = np.clip(((px - x1) * dx + (py - y1) * dy) / length2, 0.0, 1.0)
+    dist2 = (px - (x1 + t * dx)) ** 2 + (py - (y1 + t * dy)) ** 2
+    blocked[r0:r1, c0:c1] |= dist2 <= radius * radius
+
+
+def _polygon_mask(shape, polygon) -> np.ndarray:
+    """셀 중심 기준 even-odd 규칙 point-in-polygon (모든 셀 한 번에)"""
+    h, w = shape
+    mask = np.zeros(shape, dtype=bool)
+    if len(polygon) < 3:
+        return mask
+
+    py = np.arange(h)[:, None] + 0.5
+    px = np.arange(w)[None, :] + 0.5
+    n = len(polygon)
+    for i in range(n):
+        xi, yi = polygon[i]
+        xj, yj = polygon[(i + 1) % n]
+        if yi == yj:
+            continue   # 수평 변은 교차 판정에 영향 없음
+        crosses = (yi > py) != (yj > py)
+        x_cross = (xj - xi) * (py - yi) / (yj - yi) + xi
+        mask ^= crosses & (px < x_cross)
+    return mask
+
+
+def _edt(blocked: np.ndarray) -> np.ndarray:
+    """
+    정확한 유클리드 거리 변환 (셀 단위, float32). blocked가 하나도 없으면 격자 대각선 길이
+    1) 열마다 가장 가까운 blocked 행까지 거리 g (누적 max/min으로 벡터화)
+    2) 행마다 D(x) = min_x' g(x')² + (x - x')²  (행 블록 단위 broadcast)
+    """
+    h, w = blocked.shape
+    if not blocked.any():
+        return np.full((h, w), np.hypot(h, w), dtype=np.float32)
+
+    far = h + w
+    rows = np.arange(h)[:, None]
+    above = np.maximum.accumulate(np.where(blocked, rows, -far), axis=0)
+    below = np.minimum.accumulate(np.where(blocked, rows, h + far)[::-1], axis=0)[::-1]
+    g2 = np.minimum(rows - above, below - rows).astype(np.float64) ** 2
+
+    cols = np.arange(w)
+    dx2 = ((cols[:, None] - cols[None, :]) ** 2).astype(np.float64)
+    out = np.empty((h, w), dtype=np.float64)
+    step = max(EDT_CHUNK_ELEMS // (w * w), 1)
+    for r0 in range(0, h, step):
+        block = g2[r0:r0 + step]
+        out[r0:r0 + step] = (block[:, None, :] + dx2[None, :, :]).min(axis=2)
+    return np.sqrt(out).astype(np.float32)
+
+
+def build_occupancy(struct: dict, cell_cm: float | None = None) -> OccupancyGrid | None:
+    """
+    struct: {walls, doors, windows, rooms, cm_per_px} (분석 결과 / _floorplan_struct)
+    geometry가 없으면 None
+    """
+    bounds = _bounds(struct)
+    if bounds is None:
+        return None
+
+    scale = cm_per_px(struct)
+    cell_cm = float(cell_cm or settings.FLOORPLAN_GRID_CM)
+    min_x, min_y, max_x, max_y = bounds
+    pad_px = GRID_PAD_CM / scale
+    origin_x, origin_y = min_x - pad_px, min_y - pad_px
+    span_x, span_y = max_x - min_x + pad_px * 2, max_y - min_y + pad_px * 2
+
+    # 격자는 px 좌표 위에 놓이고, 한 칸 = cell_px (= cell_cm / cm_per_px)
+    cell_px = cell_cm / scale
+    cells = (span_x / cell_px) * (span_y / cell_px)
+    if cells > MAX_GRID_CELLS:
+        cell_px *= float(np.sqrt(cells / MAX_GRID_CELLS))
+    w = max(int(np.ceil(span_x / cell_px)), 1)
+    h = max(int(np.ceil(span_y / cell_px)), 1)
+    cell_cm = cell_px * scale
+
+    def cx(x):
+        return (_num(x) - origin_x) / cell_px
+
+    def cy(y):
+        return (_num(y) - origin_y) / cell_px
+
+    blocked = np.zeros((h, w), dtype=bool)
+    # cm 치수 → 셀 수
+    wall_radius = WALL_THICKNESS_CM / 2 / cell_cm
+    for wall in struct.get("walls") or []:
+        _mark_segment(
+            blocked, cx(wall.get("x1")), cy(wall.get("y1")),
+            cx(wall.get("x2")), cy(wall.get("y2")), wall_radius,
+        )
+    # 문: 문 폭만큼 회전 반경 / 창문: 폭의 절반만큼 앞 공간
+    for door in struct.get("doors") or []:
+        x, y = cx(door.get("x")), cy(door.get("y"))
+        _mark_segment(blocked, x, y, x, y, _num(door.get("width_cm"), DEFAULT_DOOR_CM) / cell_cm)
+    for win in struct.get("windows") or []:
+        x, y = cx(win.get("x")), cy(win.get("y"))
+        _mark_segment(blocked, x, y, x, y, _num(win.get("width_cm"), DEFAULT_WINDOW_CM) / 2 / cell_cm)
+
+    rooms = np.zeros((h, w), dtype=np.uint16)
+    room_types = []
+    for idx, room in enumerate(struct.get("rooms") or [], start=1):
+        polygon = [(cx(p[0]), cy(p[1])) for p in room.get("polygon") or [] if len(p) >= 2]
+        rooms[_polygon_mask((h, w), polygon)] = idx
+        room_types.append(room.get("type"))
+
+    distance = _edt(blocked) * np.float32(cell_cm)
+
+    meta = {
+        "origin": [origin_x, origin_y],
+        "cell_px": cell_px,
+        "cm_per_px": scale,
+        "room_types": room_types,
+    }
+    return OccupancyGrid(blocked, distance, rooms, meta)
+
+
+# --------------------------------------------------------
+# 저장 / 로드
+# --------------------------------------------------------
+def grid_path(fp_id: int) -> str:
+    return os.path.join(GRID_DIR, f"{fp_id}.npz")
+
+
+def save_occupancy(fp_id: int, grid: OccupancyGrid) -> str:
+    path = grid_path(fp_id)
+    os.makedirs(GRID_DIR, exist_ok=True)
+    tmp_path = _tmp_name(path)
+    with span("file.write", path=path):
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez_compressed(
+                    f,
+                    blocked=grid.blocked,
+                    distance=grid.distance,
+                    rooms=grid.rooms,
+                    meta=np.array(json.dumps(grid.meta, ensure_ascii=False)),
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    with _lock:
+        _loaded.pop(fp_id, None)
+    return path
+
+
+def build_and_save(fp_id: int, struct: dict) -> OccupancyGrid | None:
+    """업로드 후처리 단계 (CPU 작업 → run_in_threadpool로 호출)"""
+    with span("occupancy.build", fp_id=fp_id) as s:
+        grid = build_occupancy(struct)
+        if grid is None:
+            return None
+        if s is not None:
+            s.set(shape=str(grid.shape), cell_px=grid.cell_px, cm_per_px=grid.cm_per_px)
+    save_occupancy(fp_id, grid)
+    return grid
+
+
+def _extract_for_mmap(fp_id: int, npz_path: str) -> str:
+    """압축 npz → 배열별 .npy (memory map은 비압축 파일만 가능)"""
+    out_dir = os.path.join(GRID_CACHE_DIR, str(fp_id))
+    marker = os.path.join(out_dir, "meta.json")
+    if os.path.exists(marker) and os.path.getmtime(marker) >= os.path.getmtime(npz_path):
+        return out_dir
+
+    # 다른 스레드/프로세스가 같은 평면도를 동시에 풀어도 각자 고유 임시 파일 → 원자적 교체
+    os.makedirs(out_dir, exist_ok=True)
+    with np.load(npz_path) as z:
+        for name in ARRAY_NAMES:
+            path = os.path.join(out_dir, f"{name}.npy")
+            tmp_path = _tmp_name(path)
+            with open(tmp_path, "wb") as f:
+                np.save(f, z[name])
+            os.replace(tmp_path, path)
+        meta = str(z["meta"])
+    # meta.json을 마지막에 써서 "추출 완료" 표시로 사용
+    tmp_path = _tmp_name(marker)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(meta)
+    os.replace(tmp_path, marker)
+    return out_dir
+
+
+def load_occupancy(fp_id: int) -> OccupancyGrid | None:
+    """저장된 격자 (없으면 None). 프로세스 안에서는 LOADED_MAX개까지 재사용"""
+    with _lock:
+        grid = _loaded.get(fp_id)
+        if grid is not None:
+            _loaded.move_to_end(fp_id)
+            return grid
+
+    npz_path = grid_path(fp_id)
+    if not os.path.exists(npz_path):
+        return None
+
+    out_dir = _extract_for_mmap(fp_id, npz_path)
+    with open(os.path.join(out_dir, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    arrays = {
+        name: np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode="r")
+        for name in ARRAY_NAMES
+    }
+    grid = OccupancyGrid(arrays["blocked"], arrays["distance"], arrays["rooms"], meta)
+    _remember(fp_id, grid)
+    return grid
+
+
+def _remember(fp_id: int, grid: OccupancyGrid):
+    with _lock:
+        _loaded[fp_id] = grid
+        _loaded.move_to_end(fp_id)
+        if len(_loaded) > LOADED_MAX:
+            _loaded.popitem(last=False)
+
+
+def get_occupancy(fp_id: int, load_struct) -> OccupancyGrid | None:
+    """
+    저장된 격자가 없을 때만 load_struct()로 구조를 읽어 만들고 저장
+    (업로드 후처리가 실패했던 / 이 기능 이전에 올라온 평면도용)
+    """
+    grid = load_occupancy(fp_id)
+    if grid is not None:
+        return grid
+
+    grid = build_and_save(fp_id, load_struct())
+    if grid is not None:
+        _remember(fp_id, grid)
+    return grid
@@ -0,0 +1,279 @@
+# app/ai/layout_planner/preview_renderer.py
+
+"""
+배치 결과(LayoutFurnitureItem)를 평면도 위에 직접 그려주는 로컬 프리뷰 렌더러.
+
+- gpt-image 호출 없이 저장된 좌표/크기/회전값 그대로 SVG로 렌더링
+- 결과 파일은 static/previews/{layout_id}_{version}.svg 로 캐시
+- version = 배치 아이템 내용 해시 → 배치가 바뀌면 자동으로 새 파일
+- 새 파일을 쓸 때 같은 layout의 이전 버전 / PREVIEW_MAX_AGE 지난 파일 삭제,
+  그래도 PREVIEW_MAX_FILES를 넘으면 오래된 파일부터 삭제
+"""
+
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import time
+from html import escape
+
+from app.models.floorplan import Floorplan, FloorplanObject, LayoutSession, LayoutFurnitureItem
+from app.models.furniture import FurnitureProduct
+from app.core.metrics import record_cache
+from app.core.tracing import span
+
+PREVIEW_DIR = "static/previews"
+PREVIEW_URL_PREFIX = "/static/previews"
+PREVIEW_MAX_FILES = 2000
+PREVIEW_MAX_AGE = 7 * 24 * 3600
+# 쓰다가 죽은 프로세스가 남긴 임시 파일 정리 기준
+PREVIEW_TMP_MAX_AGE = 3600
+
+CANVAS_PAD = 40
+DEFAULT_ITEM_SIZE = (80.0, 40.0)
+
+WALL_COLOR = "#222"
+DOOR_COLOR = "#c47f2c"
+WINDOW_COLOR = "#5db1ff"
+ROOM_FILL = "#f3f3f3"
+ITEM_FILL = "#8fb996"
+ITEM_STROKE = "#3d6b45"
+
+
+# --------------------------------------------------------
+# 내부 유틸
+# --------------------------------------------------------
+def _num(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _item_size(size: dict | None) -> tuple[float, float]:
+    """size_json은 GPT 출력({w,h})과 DB 규격({width,depth}) 둘 다 허용"""
+    size = size or {}
+    w = size.get("w", size.get("width"))
+    h = size.get("h", size.get("depth", size.get("height")))
+    return _num(w, DEFAULT_ITEM_SIZE[0]), _num(h, DEFAULT_ITEM_SIZE[1])
+
+
+def layout_version(items: list) -> str:
+    """배치 아이템 내용 기반 버전 키 (같은 배치면 같은 파일 재사용)"""
+    payload = [
+        [
+            i.lf_id,
+            i.furniture_id,
+            i.position_json,
+            i.size_json,
+            _num(i.rotation_deg),
+            i.z_index,
+            str(i.updated_at),
+        ]
+        for i in items
+    ]
+    raw = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def _bounds(walls: list, rooms: list, boxes: list) -> tuple[float, float, float, float]:
+    xs, ys = [], []
+    for w in walls:
+        xs += [_num(w.get("x1")), _num(w.get("x2"))]
+        ys += [_num(w.get("y1")), _num(w.get("y2"))]
+    for r in rooms:
+        for pt in r.get("polygon") or []:
+            xs.append(_num(pt[0]))
+            ys.append(_num(pt[1]))
+    for x, y, w, h, _ in boxes:
+        xs += [x, x + w]
+        ys += [y, y + h]
+
+    if not xs:
+        return 0.0, 0.0, 800.0, 600.0
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+# --------------------------------------------------------
+# SVG 렌더링
+# --------------------------------------------------------
+def render_layout_svg(
+    floorplan_url: str | None,
+    fp_objects: list,
+    items: list,
+    names: dict,
+) -> str:
+    """
+    floorplan_url : 배경으로 깔 평면도 이미지 (없으면 벽 geometry만 사용)
+    fp_objects    : FloorplanObject 목록 (wall / door / window / room)
+    items         : LayoutFurnitureItem 목록
+    names         : furniture_id → 표시할 이름
+    """
+    walls = [o.position_json for o in fp_objects if o.type == "wall"]
+    doors = [o.position_json for o in fp_objects if o.type == "door"]
+    windows = [o.position_json for o in fp_objects if o.type == "window"]
+    rooms = [o.position_json for o in fp_objects if o.type == "room"]
+
+    boxes = []
+    for i in sorted(items, key=lambda it: it.z_index or 0):
+        pos = i.position_json or {}
+        w, h = _item_size(i.size_json)
+        boxes.append((_num(pos.get("x")), _num(pos.get("y")), w, h, i))
+
+    min_x, min_y, max_x, max_y = _bounds(walls, rooms, boxes)
+    vb_x, vb_y = min_x - CANVAS_PAD, min_y - CANVAS_PAD
+    vb_w = (max_x - min_x) + CANVAS_PAD * 2
+    vb_h = (max_y - min_y) + CANVAS_PAD * 2
+
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" '
+        f'viewBox="{vb_x:.1f} {vb_y:.1f} {vb_w:.1f} {vb_h:.1f}" '
+        f'width="{vb_w:.0f}" height="{vb_h:.0f}" font-family="sans-serif">',
+        f'<rect x="{vb_x:.1f}" y="{vb_y:.1f}" width="{vb_w:.1f}" height="{vb_h:.1f}" fill="#fff"/>',
+    ]
+
+    # 1) 배경: 평면도 이미지 or 방 polygon
+    # 이미지는 벽/방 geometry 범위에만 맞춤 (가구가 밖으로 나가도 평면도가 늘어나지 않게)
+    if floorplan_url:
+        img_x, img_y, img_max_x, img_max_y = (
+            _bounds(walls, rooms, []) if walls or rooms else (min_x, min_y, max_x, max_y)
+        )
+        out.append(
+            f'<image href="{escape(floorplan_url)}" x="{img_x:.1f}" y="{img_y:.1f}" '
+            f'width="{img_max_x - img_x:.1f}" height="{img_max_y - img_y:.1f}" '
+            f'preserveAspectRatio="none" opacity="0.5"/>'
+        )
+    for r in rooms:
+        pts = " ".join(f"{_num(p[0]):.1f},{_num(p[1]):.1f}" for p in r.get("polygon") or [])
+        if pts:
+            out.append(f'<polygon points="{pts}" fill="{ROOM_FILL}" stroke="none"/>')
+
+    # 2) 벽 / 문 / 창문
+    for w in walls:
+        out.append(
+            f'<line x1="{_num(w.get("x1")):.1f}" y1="{_num(w.get("y1")):.1f}" '
+            f'x2="{_num(w.get("x2")):.1f}" y2="{_num(w.get("y2")):.1f}" '
+            f'stroke="{WALL_COLOR}" stroke-width="6" stroke-linecap="square"/>'
+        )
+    for color, openings in ((DOOR_COLOR, doors), (WINDOW_COLOR, windows)):
+        for o in openings:
+            out.append(
+                f'<circle cx="{_num(o.get("x")):.1f}" cy="{_num(o.get("y")):.1f}" '
+                f'r="{max(_num(o.get("width_cm"), 60.0) / 2, 6):.1f}" '
+                f'fill="none" stroke="{color}" stroke-width="3"/>'
+            )
+
+    # 3) 가구 footprint (position = 좌상단, 회전은 중심 기준)
+    for x, y, w, h, item in boxes:
+        cx, cy = x + w / 2, y + h / 2
+        rot = _num(item.rotation_deg)
+        label = escape(str(names.get(item.furniture_id) or item.furniture_id))
+        out.append(f'<g transform="rotate({rot:.1f} {cx:.1f} {cy:.1f})">')
+        out.append(
+            f'<rect x="{x:.1f}" y="{y:.1f}" width="{w:.1f}" height="{h:.1f}" '
+            f'fill="{ITEM_FILL}" fill-opacity="0.7" stroke="{ITEM_STROKE}" stroke-width="2"/>'
+        )
+        out.append(
+            f'<text x="{cx:.1f}" y="{cy:.1f}" font-size="12" fill="#1e1e1e" '
+            f'text-anchor="middle" dominant-baseline="middle">{label}</text>'
+        )
+        out.append("</g>")
+
+    out.append("</svg>")
+    return "\n".join(out)
+
+
+# --------------------------------------------------------
+# 캐시 + 정적 URL
+# --------------------------------------------------------
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:   # 다른 요청/프로세스가 먼저 지움
+        pass
+
+
+def _evict_previews(layout_id: int, keep: str):
+    """keep(방금 쓴 파일)을 제외하고 같은 layout 이전 버전 + 오래된 파일 삭제"""
+    for path in glob.glob(os.path.join(PREVIEW_DIR, f"{layout_id}_*.svg")):
+        if path != keep:
+            _remove(path)
+
+    now = time.time()
+    files = []
+    for entry in os.scandir(PREVIEW_DIR):
+        try:
+            mtime = entry.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        if entry.name.endswith(".tmp"):
+            if now - mtime > PREVIEW_TMP_MAX_AGE:
+                _remove(entry.path)
+        elif now - mtime > PREVIEW_MAX_AGE and entry.path != keep:
+            _remove(entry.path)
+        else:
+            files.append((mtime, entry.path))
+
+    if len(files) > PREVIEW_MAX_FILES:
+        files.sort()
+        for _, path in files[:len(files) - PREVIEW_MAX_FILES]:
+            if path != keep:
+                _remove(path)
+
+
+def render_layout_preview(db, layout_id: int) -> str | None:
+    """
+    layout_id 배치 결과를 SVG로 렌더링하고 정적 URL 반환
+    - 같은 버전 파일이 이미 있으면 렌더링 생략
+    """
+    session = db.query(LayoutSession).filter(LayoutSession.layout_id == layout_id).first()
+    if not session:
+        return None
+
+    items = (
+        db.query(LayoutFurnitureItem)
+        .filter(LayoutFurnitureItem.layout_id == layout_id)
+        .all()
+    )
+
+    file_name = f"{layout_id}_{layout_version(items)}.svg"
+    file_path = os.path.join(PREVIEW_DIR, file_name)
+    url = f"{PREVIEW_URL_PREFIX}/{file_name}"
+
+    if os.path.exists(file_path):
+        record_cache("layout_preview", True)
+        return url
+    record_cache("layout_preview", False)
+
+    floorplan = db.query(Floorplan).filter(Floorplan.fp_id == session.fp_id).first()
+    fp_objects = db.query(FloorplanObject).filter(FloorplanObject.fp_id == session.fp_id).all()
+
+    furniture_ids = {i.furniture_id for i in items if i.furniture_id}
+    names = {}
+    if furniture_ids:
+        rows = (
+            db.query(FurnitureProduct.product_id, FurnitureProduct.name)
+            .filter(FurnitureProduct.product_id.in_(furniture_ids))
+            .all()
+        )
+        names = {pid: name for pid, name in rows}
+
+    svg = render_layout_svg(
+        floorplan.image_url if floorplan else None,
+        fp_objects,
+        items,
+        names,
+    )
+
+    os.makedirs(PREVIEW_DIR, exist_ok=True)
+    with span("file.write", path=file_path, bytes=len(svg)):
+        # 같은 버전을 동시에 렌더링해도 임시 파일이 겹치지 않게 요청마다 고유 이름
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=PREVIEW_DIR, prefix=f"{file_name}.", suffix=".tmp", delete=False,
+        ) as f:
+            f.write(svg)
+        os.replace(f.name, file_path)
+
+    _evict_previews(layout_id, file_path)
+    return url
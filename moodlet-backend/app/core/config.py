@@ -15,6 +15,25 @@ class Settings(BaseSettings):
 
     # 🔹 OpenAI
     OPENAI_API_KEY: str  # ★ 이거 반드시 필요
+    AI_BACKEND: str = "openai"   # "stub" → OpenAI 호출 없이 로컬 stub 응답 (테스트/벤치마크)
+    OPENAI_BASE_URL: str | None = None   # 로컬 fake 서버(bench/fake_openai.py) 등 OpenAI 호환 엔드포인트
+
+    # 🔹 최종 스타일 분석
+    # "local": STYLE_COMPAT/STYLE_OPPOSITE 테이블로 Best/Worst 계산 (AI 호출 없음)
+    # "ai"   : gpt-4o-mini가 Best/Worst 선택 (이전 방식)
+    STYLE_ANALYSIS_MODE: str = "local"
+    STYLE_AI_ENRICH: bool = False          # local 모드에서 서술형 답변을 AI로 prompt에 반영할지
+    STYLE_AI_ENRICH_BUDGET_MS: int = 1500  # enrichment를 기다리는 최대 시간 (넘으면 취소하고 기본 prompt 사용)
+    SURVEY_SPECULATION: bool = True        # 설문 중 스타일이 확정되면 추천/follow-up을 미리 시작
+    SURVEY_SPECULATE_IMAGE: bool = False   # 이미지도 미리 생성할지 (유료 호출 → 설문을 중단한 세션도 비용 발생)
+
+    # 🔹 평면도 점유 격자 (app/ai/layout_planner/occupancy.py)
+    FLOORPLAN_GRID_CM: float = 5.0         # 격자 한 칸 크기(cm). 평면도가 크면 셀 수 상한에 맞춰 자동으로 커짐
+    FLOORPLAN_DEFAULT_CM_PER_PX: float = 1.0  # 분석 결과에 축척(cm_per_px)이 없을 때 1px당 cm
+
+    # 🔹 모델 프롬프트 크기
+    LAYOUT_GEOMETRY_PRECISION_CM: float = 10.0  # 배치 프롬프트 좌표 양자화/단순화 단위 (0 = 기존 JSON 그대로)
+    FLOORPLAN_IMAGE_DETAIL: str = "auto"        # 평면도 vision 입력 detail (low = 고정 저해상도, 토큰 최소)
     
     # 🔹 Google OAuth 설정
     GOOGLE_CLIENT_ID: str
@@ -26,6 +45,11 @@ class Settings(BaseSettings):
     JWT_SECRET: str
     JWT_ALGORITHM: str = "HS256"
 
+    # 🔹 트레이싱 (0.0 = 끔, X-Debug-Trace 헤더가 TRACE_DEBUG_TOKEN과 일치하면 항상 기록)
+    TRACE_SAMPLE_RATE: float = 0.0
+    TRACE_EXPORT_PATH: str | None = "traces/spans.jsonl"
+    TRACE_DEBUG_TOKEN: str | None = None   # 미설정 = 강제 트레이싱 / X-Trace-Tree 비활성
+
     # 🔹 pydantic-settings v2 설정
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -0,0 +1,219 @@
+# app/core/metrics.py
+
+"""
+Prometheus 텍스트 포맷 메트릭 (외부 의존성 없는 최소 구현).
+
+- Counter / Histogram 두 종류만 지원
+- 라벨 값은 선언한 labelnames 순서대로 위치 인자로 전달
+- 요청당 오버헤드: dict 조회 + lock 1회 수준
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.core.tracing import current_span
+
+# 기본 latency 버킷(초) — AI 호출(수 초 ~ 수십 초)까지 커버
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REGISTRY: list = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(labelnames, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_label_str(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels → [버킷별 count..., +Inf count, sum]
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *labels):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[idx] += 1
+            row[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(row)) for labels, row in self._values.items()]
+        for labels, row in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                le = _label_str(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += row[len(self.buckets)]
+            le = _label_str(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.labelnames, labels)} {row[-1]}")
+            lines.append(f"{self.name}_count{_label_str(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+# --------------------------------------------------------
+# 공용 메트릭
+# --------------------------------------------------------
+HTTP_REQUEST_SECONDS = Histogram(
+    "moodlet_http_request_seconds",
+    "HTTP request latency by route",
+    ("method", "route", "status"),
+)
+
+AI_CALL_SECONDS = Histogram(
+    "moodlet_ai_call_seconds",
+    "OpenAI call latency by model and endpoint",
+    ("model", "endpoint"),
+)
+AI_CALL_ERRORS = Counter(
+    "moodlet_ai_call_errors_total",
+    "OpenAI call errors by model and endpoint",
+    ("model", "endpoint"),
+)
+AI_TOKENS = Counter(
+    "moodlet_ai_tokens_total",
+    "OpenAI token usage by model and kind (prompt/completion)",
+    ("model", "kind"),
+)
+AI_DECODE_RESULTS = Counter(
+    "moodlet_ai_decode_total",
+    "Model response decoding by schema and result (ok/repaired/invalid/failed)",
+    ("schema", "result"),
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "moodlet_db_query_seconds",
+    "SQL statement latency by engine",
+    ("engine",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+
+CACHE_REQUESTS = Counter(
+    "moodlet_cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss)",
+    ("cache", "result"),
+)
+
+
+SPECULATION_RESULTS = Counter(
+    "moodlet_speculation_total",
+    "Speculative precompute tasks by kind and result (started/hit/running/miss/failed/expired)",
+    ("kind", "result"),
+)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def record_speculation(kind: str, result: str):
+    SPECULATION_RESULTS.inc(kind, result)
+
+
+def _record_usage(model: str, usage):
+    if usage is None:
+        return
+    # chat.completions: prompt/completion_tokens, responses: input/output_tokens
+    prompt = getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", None) or 0
+    completion = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", None) or 0
+    if prompt:
+        AI_TOKENS.inc(model, "prompt", amount=prompt)
+    if completion:
+        AI_TOKENS.inc(model, "completion", amount=completion)
+
+
+def record_ai_call(model: str, endpoint: str, seconds: float, resp=None, error: bool = False):
+    """OpenAI 호출 1건 결과 기록 (sync / async 호출부 공용)"""
+    AI_CALL_SECONDS.observe(seconds, model, endpoint)
+    if error:
+        AI_CALL_ERRORS.inc(model, endpoint)
+        return
+    usage = getattr(resp, "usage", None)
+    _record_usage(model, usage)
+    s = current_span()
+    if s is not None and usage is not None:
+        s.set(usage=str(usage))
+
+
+def record_ai_decode(schema: str, result: str):
+    AI_DECODE_RESULTS.inc(schema, result)
+
+
+def instrument_engine(engine, name: str):
+    """SQLAlchemy (sync) engine의 SQL 실행 수/시간 기록"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_metrics_start")
+        if starts:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - starts.pop(), name)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("_metrics_start") if context.connection else None
+        if starts:
+            starts.pop()
+
+
+def render_latest(extra_lines: list | None = None) -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    if extra_lines:
+        lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,71 @@
+# app/core/pool_metrics.py
+
+"""
+DB 커넥션 풀 통계.
+
+SQLAlchemy 풀 이벤트로는 "커넥션을 얻기까지 기다린 시간"을 알 수 없어서
+풀 클래스의 _do_get을 감싼 서브클래스로 대기 시간을 측정한다.
+"""
+
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStats:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            data = {
+                "checkouts": self.checkouts,
+                "wait_seconds_total": round(self.wait_total, 6),
+                "wait_seconds_max": round(self.wait_max, 6),
+                "timeouts": self.timeouts,
+            }
+
+        # NullPool(PgBouncer 모드)은 크기 개념이 없음
+        if isinstance(pool, QueuePool):
+            data.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            })
+        return data
+
+
+def timed_pool_class(base, stats: PoolStats):
+    """
+    base 풀 클래스의 checkout 대기 시간을 stats에 기록하는 서브클래스 생성.
+    (dispose/invalidate 때 풀이 재생성돼도 클래스 속성이라 stats 유지)
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = base._do_get(self)
+        except exc.TimeoutError:
+            stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        stats.record_wait(time.perf_counter() - start)
+        return conn
+
+    return type(f"Timed{base.__name__}", (base,), {"_do_get": _do_get})
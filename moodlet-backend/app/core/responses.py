@@ -0,0 +1,35 @@
+# app/core/responses.py
+
+"""
+orjson 기반 JSON 응답.
+
+- 표준 json 인코더 + response_model 재검증 대신 orjson으로 바로 bytes 생성
+- DB에서 온 Decimal(Numeric 컬럼)은 float로 변환
+- content가 이미 bytes면 그대로 전송 (미리 직렬화해 캐시한 payload용)
+
+    @router.get("/...", response_class=FastJSONResponse)
+    def handler(...):
+        return FastJSONResponse(rows)   # Response를 직접 반환 → response_model 검증 생략
+"""
+
+from decimal import Decimal
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -0,0 +1,238 @@
+# app/core/tracing.py
+
+"""
+요청 단위 경량 트레이싱 (프로세스 내부).
+
+- contextvars로 현재 span을 전파 → 라우트 / OpenAI 호출 / SQL / 파일 I/O가
+  같은 요청의 트리에 자동으로 붙음
+- 샘플링되지 않은 요청에서는 span()이 아무 일도 하지 않음 (오버헤드 ≈ ContextVar 조회 1회)
+- 완료된 trace는 백그라운드 스레드가 JSON Lines(OTLP span 필드명)로 파일에 기록
+- 요청 헤더 X-Debug-Trace: <TRACE_DEBUG_TOKEN> → 강제 샘플링 + 응답 헤더 X-Trace-Tree로 span 트리 반환
+  (토큰 미설정이면 비활성, 헤더에는 SQL 문장을 싣지 않고 TREE_HEADER_MAX_LEN으로 자름)
+"""
+
+import hmac
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+DEBUG_HEADER = "x-debug-trace"
+TRACE_ID_HEADER = "X-Trace-Id"
+TRACE_TREE_HEADER = "X-Trace-Tree"
+
+TREE_HEADER_MAX_LEN = 8192
+HEADER_HIDDEN_ATTRS = ("statement",)   # SQL 문장은 파일 exporter에만 기록
+
+_sample_rate = 0.0
+_exporter = None
+_debug_token = None
+
+_current: ContextVar = ContextVar("moodlet_current_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "children")
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None = None, attributes: dict | None = None):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.children = []
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns or time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def child(self, name: str, **attributes) -> "Span":
+        s = Span(name, self.trace_id, self.span_id, attributes)
+        self.children.append(s)
+        return s
+
+    def to_tree(self, depth: int | None = None, hidden: tuple = ()) -> dict:
+        """
+        depth: 이 깊이 아래 자식은 개수("collapsed")만 남김 (None = 전체)
+        hidden: 제외할 attribute 키
+        """
+        node = {"name": self.name, "ms": round(self.duration_ms, 2)}
+        attrs = {k: v for k, v in self.attributes.items() if k not in hidden}
+        if attrs:
+            node["attrs"] = attrs
+        if self.children:
+            if depth is not None and depth <= 0:
+                node["collapsed"] = sum(1 for _ in self.iter_spans()) - 1
+            else:
+                next_depth = None if depth is None else depth - 1
+                node["children"] = [c.to_tree(next_depth, hidden) for c in self.children]
+        return node
+
+    def iter_spans(self):
+        yield self
+        for c in self.children:
+            yield from c.iter_spans()
+
+    def to_otlp(self) -> dict:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns or self.start_ns,
+            "attributes": [
+                {"key": k, "value": {"stringValue": str(v)}}
+                for k, v in self.attributes.items()
+            ],
+        }
+
+
+# --------------------------------------------------------
+# exporter (JSON Lines 파일 — 로컬 collector 대용)
+# --------------------------------------------------------
+class FileSpanExporter:
+    def __init__(self, path: str, max_queue: int = 10000):
+        self.path = path
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, root: Span):
+        try:
+            self._queue.put_nowait(root)
+        except queue.Full:
+            pass   # 밀리면 버림 (요청 경로를 막지 않는 게 우선)
+
+    def _run(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        while True:
+            root = self._queue.get()
+            line = json.dumps(
+                {"resourceSpans": [{"scopeSpans": [{"spans": [s.to_otlp() for s in root.iter_spans()]}]}]},
+                ensure_ascii=False,
+            )
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def configure_tracing(sample_rate: float = 0.0, export_path: str | None = None, debug_token: str | None = None):
+    global _sample_rate, _exporter, _debug_token
+    _sample_rate = sample_rate
+    _exporter = FileSpanExporter(export_path) if export_path else None
+    _debug_token = debug_token or None
+
+
+def debug_requested(header_value: str | None) -> bool:
+    """X-Debug-Trace 헤더가 설정된 토큰과 일치할 때만 True (토큰 미설정 = 항상 False)"""
+    if not _debug_token or not header_value:
+        return False
+    return hmac.compare_digest(header_value.encode(), _debug_token.encode())
+
+
+# --------------------------------------------------------
+# span API
+# --------------------------------------------------------
+def current_span() -> Span | None:
+    return _current.get()
+
+
+@contextmanager
+def trace_request(name: str, force: bool = False):
+    """요청 루트 span. 샘플링되지 않으면 None을 yield"""
+    if not force and (_sample_rate <= 0 or random.random() >= _sample_rate):
+        yield None
+        return
+
+    root = Span(name, uuid.uuid4().hex)
+    token = _current.set(root)
+    try:
+        yield root
+    finally:
+        root.finish()
+        _current.reset(token)
+        if _exporter:
+            _exporter.export(root)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    현재 요청 trace 아래 자식 span 생성
+        with span("analyze_final_style", style=final_style):
+            ...
+    """
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+
+    s = parent.child(name, **attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except Exception as e:
+        s.set(error=repr(e))
+        raise
+    finally:
+        s.finish()
+        _current.reset(token)
+
+
+def instrument_engine_tracing(engine, name: str):
+    """SQL 문마다 span 기록 (현재 trace가 있을 때만)"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        parent = _current.get()
+        if parent is not None:
+            conn.info.setdefault("_trace_spans", []).append(
+                parent.child("sql", engine=name, statement=statement[:200])
+            )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("_trace_spans")
+        if spans:
+            spans.pop().finish()
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        spans = context.connection.info.get("_trace_spans") if context.connection else None
+        if spans:
+            s = spans.pop()
+            s.set(error=repr(context.original_exception))
+            s.finish()
+
+
+def tree_header_value(root: Span, max_len: int = TREE_HEADER_MAX_LEN) -> str:
+    """
+    응답 헤더용 span 트리 (latin-1 안전하게 ASCII 이스케이프)
+    - HEADER_HIDDEN_ATTRS(SQL 문장)는 제외
+    - max_len을 넘으면 깊은 단계부터 접어서 다시 직렬화 → 항상 유효한 JSON
+    """
+    for depth in (None, 3, 2, 1, 0):
+        value = json.dumps(
+            root.to_tree(depth, HEADER_HIDDEN_ATTRS),
+            ensure_ascii=True, separators=(",", ":"), default=str,
+        )
+        if len(value) <= max_len:
+            return value
+    return json.dumps({"name": root.name, "ms": round(root.duration_ms, 2), "truncated": True}, ensure_ascii=True)
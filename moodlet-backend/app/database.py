@@ -1,18 +1,70 @@
 # app/database.py
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import NullPool, QueuePool, AsyncAdaptedQueuePool
+from app.core.pool_metrics import PoolStats, timed_pool_class
+from app.core.metrics import instrument_engine
+from app.core.tracing import instrument_engine_tracing
 from config import settings
 
+# 풀 통계 (/metrics 에서 노출)
+sync_pool_stats = PoolStats("sync")
+async_pool_stats = PoolStats("async")
+
+
+def _pool_kwargs(pool_base, stats: PoolStats) -> dict:
+    """
+    - 일반 모드: 크기 고정 QueuePool + checkout 대기 시간 측정
+    - PgBouncer 모드: 앱 쪽 풀을 끄고 PgBouncer에 맡김 (NullPool)
+    pool_pre_ping 대신 pool_recycle + 끊김 에러 시 풀 무효화(SQLAlchemy 기본 동작)로
+    checkout 마다 추가 왕복이 생기지 않게 함
+    """
+    if settings.DB_PGBOUNCER:
+        return {"poolclass": timed_pool_class(NullPool, stats)}
+
+    return {
+        "poolclass": timed_pool_class(pool_base, stats),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_use_lifo": True,   # 유휴 커넥션이 자연스럽게 정리되도록 최근 커넥션 우선 사용
+    }
+
+
+def _sync_connect_args() -> dict:
+    args = {
+        # 죽은 TCP 연결을 OS 레벨에서 빨리 감지
+        "keepalives": 1,
+        "keepalives_idle": 30,
+        "keepalives_interval": 10,
+        "keepalives_count": 3,
+    }
+    # PgBouncer transaction 모드는 startup option을 지원하지 않음 → 트랜잭션마다 SET LOCAL
+    if not settings.DB_PGBOUNCER:
+        args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+    return args
+
+
 # DB ENGINE
 engine = create_engine(
     settings.DB_URL,
-    echo=True,
+    echo=settings.DB_ECHO,
     future=True,      # optional (2.0 스타일)
-    pool_pre_ping=True,   # 💡 끊어진 커넥션이면 자동으로 새로 연결
-    pool_recycle=1800,
+    connect_args=_sync_connect_args(),
+    **_pool_kwargs(QueuePool, sync_pool_stats),
 )
 
+if settings.DB_PGBOUNCER:
+    @event.listens_for(engine, "begin")
+    def _set_statement_timeout(conn):
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {settings.DB_STATEMENT_TIMEOUT_MS}")
+
+instrument_engine(engine, "sync")
+instrument_engine_tracing(engine, "sync")
+
 # SESSION
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -21,6 +73,45 @@ SessionLocal = sessionmaker(
     future=True
 )
 
+
+# ASYNC ENGINE (asyncpg) — async def 라우트에서 이벤트 루프를 막지 않도록
+def _async_db_url(url: str) -> str:
+    """postgresql:// / postgresql+psycopg2:// → postgresql+asyncpg://"""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+def _async_connect_args() -> dict:
+    if settings.DB_PGBOUNCER:
+        # PgBouncer transaction 모드에서는 prepared statement 캐시 사용 불가
+        return {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+    return {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+
+
+async_engine = create_async_engine(
+    _async_db_url(settings.DB_URL),
+    echo=settings.DB_ECHO,
+    connect_args=_async_connect_args(),
+    **_pool_kwargs(AsyncAdaptedQueuePool, async_pool_stats),
+)
+
+if settings.DB_PGBOUNCER:
+    @event.listens_for(async_engine.sync_engine, "begin")
+    def _set_async_statement_timeout(conn):
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {settings.DB_STATEMENT_TIMEOUT_MS}")
+
+instrument_engine(async_engine.sync_engine, "async")
+instrument_engine_tracing(async_engine.sync_engine, "async")
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,   # commit 후에도 PK 등 속성 접근 시 추가 쿼리 없음
+)
+
 # BASE
 Base = declarative_base()
 
@@ -30,4 +121,17 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def pool_snapshot() -> dict:
+    """sync / async 풀 상태 (checked-out, overflow, 대기 시간 등)"""
+    return {
+        "sync": sync_pool_stats.snapshot(engine.pool),
+        "async": async_pool_stats.snapshot(async_engine.sync_engine.pool),
+    }
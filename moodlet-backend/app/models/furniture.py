@@ -1,6 +1,7 @@
 from sqlalchemy import (
-    Column, BigInteger, Text, Numeric, TIMESTAMP, ForeignKey, JSON, func
+    Column, BigInteger, Text, Numeric, TIMESTAMP, ForeignKey, JSON, Index, func
 )
+from sqlalchemy.orm import relationship
 from app.database import Base
 
 
@@ -29,6 +30,28 @@ class FurnitureProduct(Base):
     lowest_price = Column(BigInteger)
     highest_price = Column(BigInteger)
 
+    # 쇼핑몰별 가격 (상세 조회 시 joinedload)
+    prices = relationship(
+        "FurniturePrice",
+        order_by="FurniturePrice.mall_price_value",
+        passive_deletes=True,
+    )
+
+    # 카테고리 목록 keyset 페이지네이션용 (category, 정렬 컬럼, product_id)
+    # DESC 정렬은 같은 인덱스를 역방향으로 탐색 (NULL 구간은 furniture_service._paginate에서 따로 조회)
+    __table_args__ = (
+        Index("ix_furniture_product_category_score", "category", "score", "product_id"),
+        Index("ix_furniture_product_category_price", "category", "lowest_price", "product_id"),
+        Index("ix_furniture_product_category_created", "category", "created_at", "product_id"),
+        # 패싯 검색 필터용
+        Index("ix_furniture_product_category_width", "category", "width"),
+        Index("ix_furniture_product_material", "material"),
+        Index("ix_furniture_product_color", "color"),
+        Index("ix_furniture_product_style_id", "style_id"),
+        # 카탈로그 적재 upsert 자연키
+        Index("ux_furniture_product_detail_url", "detail_url", unique=True),
+    )
+
 
 class FurniturePrice(Base):
     __tablename__ = "furniture_price"
@@ -43,6 +66,22 @@ class FurniturePrice(Base):
     ship_fee = Column(Text)
     mall_url = Column(Text)
 
+    # 원문 텍스트("129,000원", "무료배송")를 적재 시 파싱한 정수 값 (원)
+    mall_price_value = Column(BigInteger)
+    ship_fee_value = Column(BigInteger)
+
+    __table_args__ = (
+        # 카탈로그 적재 upsert 자연키
+        Index("ux_furniture_price_product_mall", "product_id", "mall_name", unique=True),
+        # 상품별 최저가 / 배송비 포함 최저가 조회용
+        Index("ix_furniture_price_product_price", "product_id", "mall_price_value"),
+        Index(
+            "ix_furniture_price_product_total",
+            "product_id",
+            (mall_price_value + func.coalesce(ship_fee_value, 0)),
+        ),
+    )
+
 
 class FurnitureEmbedding(Base):
     __tablename__ = "furniture_embedding"
@@ -53,3 +92,16 @@ class FurnitureEmbedding(Base):
     ), primary_key=True)
 
     embedding = Column(Text)  # 실제 pgvector는 DDL에서 VECTOR(512) 선언됨
+
+
+class FurnitureEmbeddingQueue(Base):
+    """이미지가 새로 들어오거나 바뀐 상품 → 임베딩 재계산 대기열"""
+    __tablename__ = "furniture_embedding_queue"
+
+    product_id = Column(BigInteger, ForeignKey(
+        "furniture_product.product_id",
+        ondelete="CASCADE"
+    ), primary_key=True)
+
+    image_url = Column(Text)
+    queued_at = Column(TIMESTAMP, server_default=func.now())
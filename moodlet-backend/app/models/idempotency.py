@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Text, JSON, TIMESTAMP, func
+from app.database import Base
+
+
+class IdempotencyRecord(Base):
+    """재시도/중복 요청에 그대로 돌려줄 완료된 응답 (scope:key 단위)"""
+    __tablename__ = "idempotency_record"
+
+    idem_key = Column(Text, primary_key=True)        # "{scope}:{key}"
+    scope = Column(Text, nullable=False)             # final-analysis, layout.start, floorplan.upload
+    request_hash = Column(Text, nullable=False)      # 같은 key가 다른 요청 본문에 쓰였는지 확인용
+    response_json = Column(JSON, nullable=False)
+    created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
@@ -1,12 +1,22 @@
-from fastapi import APIRouter, UploadFile, File, Depends
+from fastapi import APIRouter, UploadFile, File, Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
+import hashlib
 import os
 
-from app.database import get_db
+from app.database import get_db, get_async_db
+from app.core.tracing import span
 from app.models.floorplan import Floorplan
 from app.models.floorplan import FloorplanObject
 from app.ai.layout_planner.detector import analyze_floorplan_with_gpt
+from app.ai.layout_planner.gpt_layout_planner import build_floorplan_struct
+from app.ai.layout_planner.occupancy import build_and_save, get_occupancy
+from app.services.catalog_fit import DEFAULT_FIT_LIMIT, MAX_FIT_LIMIT, fit_for_floorplan
+from app.services.furniture_service import CATEGORY_MAPPING
+from app.services.idempotency import fingerprint, run_once, validate_key
 
 router = APIRouter()
 
@@ -16,75 +26,148 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
 @router.post("/floorplan/upload")
-async def upload_floorplan(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    filename = f"{datetime.now().timestamp()}_{file.filename}"
+async def upload_floorplan(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+):
+    content = await file.read()
+
+    # Idempotency-Key가 있으면 같은 key 재시도에 첫 결과(fp_id)를 그대로 반환 (파일 저장/분석 생략)
+    if idempotency_key:
+        request_hash = fingerprint(file.filename, hashlib.sha256(content).hexdigest())
+        return await run_once(
+            db, "floorplan.upload", validate_key(idempotency_key), request_hash,
+            lambda: _process_floorplan(file.filename, content, db),
+        )
+    return await _process_floorplan(file.filename, content, db)
+
+
+async def _process_floorplan(original_name: str, content: bytes, db: AsyncSession) -> dict:
+    filename = f"{datetime.now().timestamp()}_{original_name}"
     filepath = os.path.join(UPLOAD_DIR, filename)
 
     # 1) 저장
-    with open(filepath, "wb") as f:
-        f.write(await file.read())
+    with span("file.write", path=filepath, bytes=len(content)):
+        with open(filepath, "wb") as f:
+            f.write(content)
 
     image_url = f"/static/{filename}"
 
-    # 2) 분석
-    result = analyze_floorplan_with_gpt(filepath)
-
-    # 3) floorplan 저장
-    fp = Floorplan(image_url=image_url, meta_json=result)
-    db.add(fp)
-    db.commit()
-    db.refresh(fp)
-
-    # 4) floorplan_object 저장
-    objects = []
-
-    # walls
-    for w in result.get("walls", []):
-        objects.append(FloorplanObject(
-            fp_id=fp.fp_id,
-            type="wall",
-            position_json=w,
-        ))
-
-    # doors/windows
-    for d in result.get("doors", []):
-        objects.append(FloorplanObject(
-            fp_id=fp.fp_id,
-            type="door",
-            position_json=d,
-        ))
-
-    for win in result.get("windows", []):
-        objects.append(FloorplanObject(
-            fp_id=fp.fp_id,
-            type="window",
-            position_json=win,
-        ))
-
-    # 방 타입
-    for room in result.get("rooms", []):
-        objects.append(FloorplanObject(
-            fp_id=fp.fp_id,
-            type="room",
-            position_json=room,
-        ))
-
-    for obj in objects:
-        db.add(obj)
-
-    db.commit()
+    # 2) 분석 → 3) 저장. 어느 단계든 실패하면 commit 전이므로 세션 종료 시 롤백되고,
+    #    저장한 파일도 지움 → DB/디스크에 반쪽짜리 평면도가 남지 않음
+    try:
+        result = await analyze_floorplan_with_gpt(filepath)
+
+        # floorplan + floorplan_object 한 트랜잭션
+        # 부모는 INSERT ... RETURNING fp_id, 자식은 executemany 한 번
+        with span("floorplan.save") as s:
+            fp_id = (
+                await db.execute(
+                    insert(Floorplan)
+                    .values(image_url=image_url, meta_json=result)
+                    .returning(Floorplan.fp_id)
+                )
+            ).scalar_one()
+
+            rows = floorplan_object_rows(fp_id, result)
+            if rows:
+                await db.execute(insert(FloorplanObject), rows)
+            await db.commit()
+            if s is not None:
+                s.set(objects=len(rows))
+    except BaseException:
+        os.remove(filepath)
+        raise
+
+    # 4) 후처리: 점유 격자 + 거리장 (실패해도 업로드는 성공, 첫 조회 때 다시 생성)
+    try:
+        await run_in_threadpool(build_and_save, fp_id, result)
+    except Exception as e:
+        print(f"[WARN] 점유 격자 생성 실패 (fp_id={fp_id}): {e}")
 
     return {
         "message": "ok",
-        "fp_id": fp.fp_id,
-        "objects": len(objects)
+        "fp_id": fp_id,
+        "objects": len(rows)
     }
 
 
+# 분석 결과 key → floorplan_object.type
+OBJECT_TYPES = (
+    ("walls", "wall"),
+    ("doors", "door"),
+    ("windows", "window"),
+    ("rooms", "room"),      # 방 타입
+)
+
+
+def floorplan_object_rows(fp_id: int, result: dict) -> list[dict]:
+    """분석 결과 → bulk insert용 floorplan_object 행 목록"""
+    return [
+        {"fp_id": fp_id, "type": obj_type, "position_json": obj}
+        for key, obj_type in OBJECT_TYPES
+        for obj in result.get(key, [])
+    ]
+
+
 @router.get("/floorplan/json/{fp_id}")
 def get_floorplan_json(fp_id: int, db: Session = Depends(get_db)):
     fp = db.query(Floorplan).filter(Floorplan.fp_id == fp_id).first()
     if not fp:
         return {"error": "not found"}
 
-    return fp.meta_json
\ No newline at end of file
+    return fp.meta_json
+
+
+@router.get("/floorplan/clearance/{fp_id}")
+def get_floorplan_clearance(fp_id: int, x: float, y: float, db: Session = Depends(get_db)):
+    """
+    드래그 스냅/배치 검증용 점 조회 (점유 격자 O(1) lookup, x / y는 평면도 px 좌표)
+    - free: 벽/문/창문 영역 밖인지
+    - clearance_cm: 가장 가까운 벽/문/창문까지 거리
+    - room: 해당 점이 속한 방 타입
+    """
+    grid = get_occupancy(fp_id, lambda: _floorplan_struct(db, fp_id))
+    if grid is None:
+        raise HTTPException(404, "floorplan geometry not found")
+
+    return {
+        "fp_id": fp_id,
+        "free": grid.is_free(x, y),
+        "clearance_cm": grid.clearance_cm(x, y),
+        "room": grid.room_type_at(x, y),
+    }
+
+
+@router.get("/floorplan/fit/{fp_id}")
+def get_floorplan_fit(
+    fp_id: int,
+    main: str | None = None,
+    sub: str | None = None,
+    limit: int = Query(DEFAULT_FIT_LIMIT, ge=1, le=MAX_FIT_LIMIT),
+    db: Session = Depends(get_db),
+):
+    """
+    방별로 들어가는 가구 (category별 score 순 상위 limit개)
+    - orientations: x(그대로) / y(90° 회전) / wall(빈 벽 구간에 붙여서)
+    - total: 해당 category에서 들어가는 전체 상품 수
+    main / sub를 생략하면 전체 category, geometry가 없으면 rooms = []
+    """
+    if main and main not in CATEGORY_MAPPING:
+        raise HTTPException(400, f"invalid main category: {main}")
+
+    struct = _floorplan_struct(db, fp_id)
+    grid = get_occupancy(fp_id, lambda: struct)
+    rooms = fit_for_floorplan(db, struct, main, sub, limit, grid)
+    return {"fp_id": fp_id, "rooms": rooms}
+
+
+def _floorplan_struct(db: Session, fp_id: int) -> dict:
+    """floorplan_object 행 → 구조 + 분석 결과의 축척(cm_per_px)"""
+    objects = db.query(FloorplanObject).filter(FloorplanObject.fp_id == fp_id).all()
+    struct = build_floorplan_struct(objects)
+    meta = db.query(Floorplan.meta_json).filter(Floorplan.fp_id == fp_id).scalar()
+    if isinstance(meta, dict) and meta.get("cm_per_px"):
+        struct["cm_per_px"] = meta["cm_per_px"]
+    return struct
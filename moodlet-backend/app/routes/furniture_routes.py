@@ -1,18 +1,124 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from app.core.responses import FastJSONResponse
 from app.database import get_db
-from app.services.furniture_service import get_furniture, get_furniture_detail
-from app.schemas.furniture import FurnitureProductSimpleResponse, FurnitureProductDetailResponse
+from app.services.furniture_service import (
+    simple_dicts,
+    get_furniture,
+    get_furniture_detail,
+    count_furniture,
+    search_furniture,
+    get_price_comparison,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+)
+from app.schemas.furniture import (
+    FurnitureProductSimpleResponse,
+    FurnitureProductDetailResponse,
+    FurnitureSearchResponse,
+    MallPriceComparison,
+)
 
 router = APIRouter(prefix="/furniture", tags=["Furniture"])
 
-@router.get("/", response_model=list[FurnitureProductSimpleResponse])
-def fetch_furniture(main: str, sub: str | None = None, db: Session = Depends(get_db)):
-    return get_furniture(db, main, sub)
+@router.get(
+    "/",
+    response_model=list[FurnitureProductSimpleResponse],
+    response_class=FastJSONResponse,
+)
+def fetch_furniture(
+    main: str,
+    sub: str | None = None,
+    sort: Literal["score", "price", "created_at"] = "score",
+    order: Literal["asc", "desc"] = "desc",
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    with_total: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    목록은 기존처럼 배열로 반환하고, 페이지 정보는 헤더로 전달
+    - X-Next-Cursor : 다음 페이지 cursor (없으면 마지막 페이지)
+    - X-Total-Count : with_total=true 일 때 전체 개수 (큰 카테고리는 플래너 추정치, COUNT_CACHE_TTL초 캐시)
+    """
+    try:
+        rows, next_cursor = get_furniture(db, main, sub, sort, order, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if with_total:
+        headers["X-Total-Count"] = str(count_furniture(db, main, sub))
+
+    # DB에서 읽은 값 그대로 직렬화 (response_model 재검증 생략)
+    return FastJSONResponse(simple_dicts(rows), headers=headers)
+
+@router.get("/search", response_model=FurnitureSearchResponse, response_class=FastJSONResponse)
+def search(
+    main: str | None = None,
+    sub: str | None = None,
+    min_width: float | None = None,
+    max_width: float | None = None,
+    min_depth: float | None = None,
+    max_depth: float | None = None,
+    min_height: float | None = None,
+    max_height: float | None = None,
+    min_price: int | None = None,
+    max_price: int | None = None,
+    material: list[str] = Query([]),
+    color: list[str] = Query([]),
+    style_id: list[int] = Query([]),
+    bed_size_code: list[str] = Query([]),
+    sort: Literal["score", "price", "created_at"] = "score",
+    order: Literal["asc", "desc"] = "desc",
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    범위 필터(치수/가격) + 집합 필터(재질/색상/스타일) 검색
+    - 예: 벽 길이 180cm에 들어가는 소파 → main=sofa&max_width=180
+    - facets: 필터별 선택지와 개수
+    """
+    ranges = {
+        "width": (min_width, max_width),
+        "depth": (min_depth, max_depth),
+        "height": (min_height, max_height),
+        "price": (min_price, max_price),
+    }
+    sets = {
+        "material": material,
+        "color": color,
+        "style_id": style_id,
+        "bed_size_code": bed_size_code,
+    }
+
+    try:
+        rows, next_cursor, facets = search_furniture(
+            db, main, sub, ranges, sets, sort, order, limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return FastJSONResponse({
+        "items": simple_dicts(rows),
+        "next_cursor": next_cursor,
+        "facets": facets,
+    })
 
 @router.get("/{product_id}", response_model=FurnitureProductDetailResponse)
 def fetch_detail(product_id: int, db: Session = Depends(get_db)):
     result = get_furniture_detail(db, product_id)
     if not result:
         raise HTTPException(status_code=404, detail="Product not found")
-    return result
\ No newline at end of file
+    return result
+
+
+@router.get("/{product_id}/prices", response_model=list[MallPriceComparison])
+def fetch_price_comparison(product_id: int, db: Session = Depends(get_db)):
+    """쇼핑몰별 가격 비교 (배송비 포함 총액 오름차순, 첫 번째가 최저 총액)"""
+    return get_price_comparison(db, product_id)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from authlib.integrations.starlette_client import OAuth, OAuthError
+from functools import lru_cache
 from starlette.requests import Request
 from starlette.responses import RedirectResponse
 
@@ -14,14 +14,22 @@ from app.core.security import get_current_user
 
 router = APIRouter(prefix="/auth/google", tags=["auth"])
 
-oauth = OAuth()
-oauth.register(
-    name="google",
-    client_id=settings.GOOGLE_CLIENT_ID,
-    client_secret=settings.GOOGLE_CLIENT_SECRET,
-    server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
-    client_kwargs={"scope": "openid email profile"},
-)
+
+@lru_cache(maxsize=1)
+def get_oauth():
+    """Authlib import + Google 클라이언트 등록은 첫 로그인 요청 때 한 번만"""
+    from authlib.integrations.starlette_client import OAuth
+
+    oauth = OAuth()
+    oauth.register(
+        name="google",
+        client_id=settings.GOOGLE_CLIENT_ID,
+        client_secret=settings.GOOGLE_CLIENT_SECRET,
+        server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
+        client_kwargs={"scope": "openid email profile"},
+    )
+    return oauth
+
 
 @router.get("/me")
 def read_me(current_user: User = Depends(get_current_user)):
@@ -30,13 +38,15 @@ def read_me(current_user: User = Depends(get_current_user)):
 @router.get("/login")
 async def google_login(request: Request):
     redirect_uri = settings.GOOGLE_REDIRECT_URI  # 예: "http://localhost:8000/auth/google/callback"
-    return await oauth.google.authorize_redirect(request, redirect_uri)
+    return await get_oauth().google.authorize_redirect(request, redirect_uri)
 
 
 @router.get("/callback")
 async def google_callback(request: Request, db: Session = Depends(get_db)):
+    from authlib.integrations.starlette_client import OAuthError
+
     try:
-        token = await oauth.google.authorize_access_token(request)
+        token = await get_oauth().google.authorize_access_token(request)
     except OAuthError as e:
         raise HTTPException(status_code=400, detail=f"Google login error: {e.error}")
 
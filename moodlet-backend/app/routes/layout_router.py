@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
+from sqlalchemy import update
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-from app.database import get_db
+from app.core.responses import FastJSONResponse
+from app.database import get_db, get_async_db
+from app.services.idempotency import fingerprint, run_once, validate_key
 import random
 from pydantic import BaseModel
 
@@ -10,12 +14,26 @@ from app.models.furniture import FurnitureProduct
 from app.models.floorplan import Floorplan,  FloorplanObject
 from app.models.floorplan import LayoutSession
 
-from app.ai.layout_planner.gpt_layout_planner import run_gpt_layout
+from app.ai.layout_planner.gpt_layout_planner import run_gpt_layout, generate_preview_image
 
 router = APIRouter()
 
 @router.post("/layout/start")
-async def start_layout(data: dict, db: Session = Depends(get_db)):
+async def start_layout(
+    data: dict,
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+):
+    # Idempotency-Key가 있으면 같은 key 재시도에 첫 결과(layout_id)를 그대로 반환
+    if idempotency_key:
+        return await run_once(
+            db, "layout.start", validate_key(idempotency_key), fingerprint(data),
+            lambda: _start_layout(data, db),
+        )
+    return await _start_layout(data, db)
+
+
+async def _start_layout(data: dict, db: AsyncSession) -> dict:
     fp_id = data["fp_id"]
     furniture_ids = data["furniture_ids"]
 
@@ -27,50 +45,42 @@ async def start_layout(data: dict, db: Session = Depends(get_db)):
         model_used="gpt-4o"
     )
     db.add(session)
-    db.commit()
-    db.refresh(session)
-
-    # 2) GPT Layout Planner 실행
-    result = run_gpt_layout(db, fp_id, furniture_ids)
-
-    # 3) 결과 저장
-    for r in result:
-        item = LayoutFurnitureItem(
-            layout_id=session.layout_id,
-            furniture_id=r["furniture_id"],
-            position_json=r["position"],
-            size_json=r["size"],
-            rotation_deg=r["rotation"],
-            confidence=r["confidence"],
-            z_index=r["z_index"],
+    await db.commit()
+    layout_id = session.layout_id
+
+    try:
+        # 2) GPT Layout Planner 실행 (모델 호출 동안은 트랜잭션 없음)
+        result = await run_gpt_layout(db, fp_id, furniture_ids)
+
+        # 3) 결과 저장
+        for r in result:
+            item = LayoutFurnitureItem(
+                layout_id=layout_id,
+                furniture_id=r["furniture_id"],
+                position_json=r["position"],
+                size_json=r["size"],
+                rotation_deg=r["rotation"],
+                confidence=r["confidence"],
+                z_index=r["z_index"],
+            )
+            db.add(item)
+
+        # 4) 상태 변경
+        session.status = "SUCCESS"
+        session.completed_at = datetime.now()
+        await db.commit()
+    except Exception:
+        # 실패한 배치가 PROCESSING으로 남지 않도록
+        await db.rollback()
+        await db.execute(
+            update(LayoutSession)
+            .where(LayoutSession.layout_id == layout_id)
+            .values(status="FAILED", completed_at=datetime.now())
         )
-        db.add(item)
-
-    # 4) 상태 변경
-    session.status = "SUCCESS"
-    session.completed_at = datetime.now()
-    db.commit()
-
-    return {"layout_id": session.layout_id}
-
-@router.get("/layout/result/{layout_id}")
-async def get_layout_result(layout_id: int, db: Session = Depends(get_db)):
-    items = db.query(LayoutFurnitureItem).filter(
-        LayoutFurnitureItem.layout_id == layout_id
-    ).all()
+        await db.commit()
+        raise
 
-    return {
-        "items": [
-            {
-                "lf_id": i.lf_id,
-                "furniture_id": i.furniture_id,
-                "position": i.position_json,
-                "size": i.size_json,
-                "rotation": i.rotation_deg,
-            }
-            for i in items
-        ]
-    }
+    return {"layout_id": layout_id}
 
 class LayoutRequest(BaseModel):
     fp_id: int
@@ -181,8 +191,6 @@ from app.schemas.layout import LayoutRunRequest
 from sqlalchemy import and_
 from datetime import datetime
 
-router = APIRouter()
-
 @router.post("/layout/run")
 def run_layout(request: LayoutRunRequest, db: Session = Depends(get_db)):
 
@@ -219,11 +227,11 @@ def run_layout(request: LayoutRunRequest, db: Session = Depends(get_db)):
     }
 
 
-@router.get("/layout/result/{layout_id}")
+@router.get("/layout/result/{layout_id}", response_class=FastJSONResponse)
 def get_layout_result(layout_id: int, db: Session = Depends(get_db)):
     session = db.query(LayoutSession).filter(LayoutSession.layout_id == layout_id).first()
     if not session:
-        return {"error": "layout not found"}
+        return FastJSONResponse({"error": "layout not found"})
 
     floorplan = db.query(Floorplan).filter(Floorplan.fp_id == session.fp_id).first()
 
@@ -233,19 +241,41 @@ def get_layout_result(layout_id: int, db: Session = Depends(get_db)):
         .all()
     )
 
-    output = []
-    for it in items:
-        furniture = db.query(FurnitureProduct).filter(FurnitureProduct.product_id == it.furniture_id).first()
-        output.append({
+    # 가구 이름은 IN 쿼리 한 번으로
+    furniture_ids = {it.furniture_id for it in items if it.furniture_id}
+    names = {}
+    if furniture_ids:
+        names = dict(
+            db.query(FurnitureProduct.product_id, FurnitureProduct.name)
+            .filter(FurnitureProduct.product_id.in_(furniture_ids))
+            .all()
+        )
+
+    output = [
+        {
             "furniture_id": it.furniture_id,
-            "name": furniture.name if furniture else None,
+            "name": names.get(it.furniture_id),
             "position": it.position_json,
             "size": it.size_json,
             "rotation": float(it.rotation_deg or 0),
-        })
+        }
+        for it in items
+    ]
 
-    return {
+    return FastJSONResponse({
         "layout_id": layout_id,
         "image_url": floorplan.image_url,  # 🔥 추가
         "items": output
-    }
\ No newline at end of file
+    })
+
+@router.get("/layout/preview/{layout_id}")
+def get_layout_preview(layout_id: int, db: Session = Depends(get_db)):
+    """배치 결과 프리뷰(SVG) 정적 URL 반환 — 배치가 바뀌지 않았으면 캐시 재사용"""
+    preview_url = generate_preview_image(db, layout_id)
+    if not preview_url:
+        raise HTTPException(404, detail="layout not found")
+
+    return {
+        "layout_id": layout_id,
+        "preview_url": preview_url,
+    }
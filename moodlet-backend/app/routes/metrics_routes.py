@@ -0,0 +1,45 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import render_latest
+from app.database import pool_snapshot
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# pool_snapshot 키 → Prometheus gauge 이름
+POOL_GAUGES = {
+    "size": "moodlet_db_pool_size",
+    "checked_out": "moodlet_db_pool_checked_out",
+    "checked_in": "moodlet_db_pool_checked_in",
+    "overflow": "moodlet_db_pool_overflow",
+    "checkouts": "moodlet_db_pool_checkouts_total",
+    "wait_seconds_total": "moodlet_db_pool_wait_seconds_total",
+    "wait_seconds_max": "moodlet_db_pool_wait_seconds_max",
+    "timeouts": "moodlet_db_pool_timeouts_total",
+}
+
+
+def _pool_lines() -> list:
+    snapshot = pool_snapshot()
+    lines = []
+    for key, metric in POOL_GAUGES.items():
+        kind = "counter" if metric.endswith("_total") else "gauge"
+        lines.append(f"# TYPE {metric} {kind}")
+        for pool_name, stats in snapshot.items():
+            if key in stats:
+                lines.append(f'{metric}{{pool="{pool_name}"}} {stats[key]}')
+    return lines
+
+
+@router.get("", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus scrape 엔드포인트 (라우트/AI 호출/DB/캐시/커넥션 풀)"""
+    return PlainTextResponse(render_latest(_pool_lines()), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/db-pool")
+def get_db_pool_metrics():
+    """DB 커넥션 풀 상태 — 풀 포화(checked_out, overflow, 대기 시간/timeout) 확인용"""
+    return pool_snapshot()
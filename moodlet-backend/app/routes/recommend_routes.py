@@ -1,27 +1,103 @@
-from fastapi import APIRouter, Depends, HTTPException
+import time
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
+from app.core.metrics import record_cache
+from app.core.responses import FastJSONResponse, dumps
 from app.database import get_db
 from app.models.survey import SessionStyleResult
 from app.models.furniture import FurnitureProduct
 from app.models.style_theme import StyleTheme
+from app.schemas.recommend import BundleRequest
+from app.services import speculation
+from app.services.bundle_optimizer import MAX_BUNDLE_CATEGORIES, optimize_bundles
+from app.services.furniture_service import (
+    BLEND_MAX_PER_STYLE,
+    RECOMMEND_PER_CATEGORY,
+    blended_recommendations,
+    recommendation_snapshot,
+)
 
 
 router = APIRouter(prefix="/recommendations", tags=["Recommendations"])
 
+# 테마 화면 payload는 카탈로그 적재 때만 바뀜 → 직렬화된 bytes를 TTL 동안 재사용
+THEME_CACHE_TTL = 600
+THEME_CACHE_MAX = 1024   # category는 임의 문자열이 들어올 수 있으므로 개수 상한
+_theme_cache: dict[tuple, tuple[float, bytes]] = {}
+
+
+def _cached_json(key: tuple, build) -> bytes:
+    """build()가 HTTPException을 던지면(404 등) 캐시하지 않음"""
+    now = time.monotonic()
+    cached = _theme_cache.get(key)
+    if cached and now - cached[0] < THEME_CACHE_TTL:
+        record_cache("theme_payload", True)
+        return cached[1]
+    record_cache("theme_payload", False)
+
+    body = dumps(build())
+    if len(_theme_cache) >= THEME_CACHE_MAX:
+        _theme_cache.clear()
+    _theme_cache[key] = (now, body)
+    return body
+
 
 # ============================================================
 # 1) 설문 기반 추천 (카테고리별 TOP 6)
 # ============================================================
-@router.post("/from-survey")
-def recommend_from_survey(session_id: int, db: Session = Depends(get_db)):
+@router.post("/from-survey", response_class=FastJSONResponse)
+def recommend_from_survey(
+    session_id: int,
+    blend: bool = False,
+    max_per_style: int = Query(BLEND_MAX_PER_STYLE, ge=1, le=RECOMMEND_PER_CATEGORY),
+    db: Session = Depends(get_db),
+):
     """
     session_style_result 기반 추천 API
     - rank_no 1 → 메인 스타일
     - 해당 style_id 가구를 category별 6개 추천(score DESC)
+    - blend=true: 메인 + Best Match 스타일 전체를 스타일 score로 가중해 섞음
+      (한 스타일은 category당 최대 max_per_style개)
     """
+    extra = {}
+    if blend:
+        # 1) 스타일 순위 전체 조회
+        styles = _ranked_styles(db, session_id)
+        style_id = styles[0][0]
+        for sid, _ in styles:
+            speculation.claim_done(("recommend", sid))
+
+        # 2) 스타일별 스냅샷(캐시)을 k-way merge
+        category_results = blended_recommendations(db, styles, max_per_style)
+        extra["styles"] = [{"style_id": sid, "weight": weight} for sid, weight in styles]
+    else:
+        # 1) 최종 스타일 조회
+        style_id = _final_style_id(db, session_id)
+        speculation.claim_done(("recommend", style_id))
+
+        # 2) style_id 기준 category별 top 6 (조기 결정 시 speculation이 미리 채워둔 캐시 재사용)
+        category_results = recommendation_snapshot(db, style_id)
+
+    if not category_results:
+        return FastJSONResponse({
+            "session_id": session_id,
+            "style_id": style_id,
+            **extra,
+            "categories": {},
+            "message": "⚠ 해당 스타일 추천 가구가 없습니다."
+        })
+
+    return FastJSONResponse({
+        "session_id": session_id,
+        "style_id": style_id,
+        **extra,
+        "categories": category_results
+    })
 
-    # 1) 최종 스타일 조회
+
+def _final_style_id(db: Session, session_id: int) -> int:
     result = (
         db.query(SessionStyleResult)
         .filter_by(session_id=session_id, rank_no=1)
@@ -29,75 +105,67 @@ def recommend_from_survey(session_id: int, db: Session = Depends(get_db)):
     )
     if not result:
         raise HTTPException(404, detail="⚠ final-analysis가 먼저 필요합니다.")
+    return result.style_id
 
-    style_id = result.style_id
 
-    # 2) style_id 기준 category만 추출
-    categories = (
-        db.query(FurnitureProduct.category)
-        .filter(FurnitureProduct.style_id == style_id)
-        .distinct()
+def _ranked_styles(db: Session, session_id: int) -> list[tuple[int, float]]:
+    """[(style_id, score)] rank_no 순 (첫 번째가 최종 스타일)"""
+    rows = (
+        db.query(SessionStyleResult.style_id, SessionStyleResult.score)
+        .filter_by(session_id=session_id)
+        .order_by(SessionStyleResult.rank_no)
         .all()
     )
-    if not categories:
-        return {
-            "session_id": session_id,
-            "style_id": style_id,
-            "categories": {},
-            "message": "⚠ 해당 스타일 추천 가구가 없습니다."
-        }
-
-    # 3) category 별 top 6
-    category_results = {}
-    for (category,) in categories:
-
-        items = (
-            db.query(FurnitureProduct)
-            .filter(
-                FurnitureProduct.style_id == style_id,
-                FurnitureProduct.category == category
-            )
-            .order_by(
-                FurnitureProduct.score.desc(),
-                FurnitureProduct.created_at.desc()
-            )
-            .limit(6)
-            .all()
-        )
+    if not rows:
+        raise HTTPException(404, detail="⚠ final-analysis가 먼저 필요합니다.")
+    return [(style_id, float(score)) for style_id, score in rows]
 
-        if items:
-            category_results[category] = [
-                {
-                    "product_id": p.product_id,
-                    "name": p.name,
-                    "image_url": p.image_url,
-                    "detail_url": p.detail_url,
-                    "category": p.category,
-                    "lowest_price": int(p.lowest_price) if getattr(p, "lowest_price", None) else None,  # 🔥 가격 필드 반영
-                    "score": float(p.score) if p.score else None
-                }
-                for p in items
-            ]
 
-    return {
-        "session_id": session_id,
+# ============================================================
+# 1-2) 예산 내 풀 세트 추천 (category별 1개씩)
+# ============================================================
+@router.post("/bundles", response_class=FastJSONResponse)
+def recommend_bundles(payload: BundleRequest, db: Session = Depends(get_db)):
+    """
+    예: 소파 + 침대 + 책상을 200만원 안에서 → score(+스타일 보너스) 합이 큰 상위 k개 조합
+    - 후보: 최종 스타일 + STYLE_COMPAT 스타일 가구 (가격 있는 상품만)
+    - limits: category별 최대 width / depth (평면도 빈 벽 길이 등)
+    - missing: 조건에 맞는 후보가 하나도 없는 category
+    """
+    if len(set(payload.categories)) > MAX_BUNDLE_CATEGORIES:
+        raise HTTPException(400, detail=f"category는 최대 {MAX_BUNDLE_CATEGORIES}개까지 가능합니다.")
+
+    style_id = _final_style_id(db, payload.session_id)
+    result = optimize_bundles(
+        db,
+        style_id,
+        payload.categories,
+        payload.budget,
+        payload.k,
+        {c: limit.model_dump() for c, limit in payload.limits.items()},
+    )
+    return FastJSONResponse({
+        "session_id": payload.session_id,
         "style_id": style_id,
-        "categories": category_results
-    }
-
+        "budget": payload.budget,
+        **result,
+    })
 
 
 # ============================================================
 # 2) 테마 상세 정보 + 카테고리 목록
 # ============================================================
-@router.get("/themes/{themeId}")
+@router.get("/themes/{themeId}", response_class=FastJSONResponse)
 def get_theme_detail(themeId: int, db: Session = Depends(get_db)):
     """
     테마 상세 화면 API
     - themeId → style_theme 조회
     - 해당 style 가구 카테고리 목록 반환
     """
+    return FastJSONResponse(_cached_json(("theme", themeId), lambda: _theme_detail(db, themeId)))
+
 
+def _theme_detail(db: Session, themeId: int) -> dict:
     theme = db.query(StyleTheme).filter(StyleTheme.style_id == themeId).first()
     if not theme:
         raise HTTPException(404, detail="❗존재하지 않는 테마 ID")
@@ -119,13 +187,18 @@ def get_theme_detail(themeId: int, db: Session = Depends(get_db)):
 # ============================================================
 # 3) 특정 테마 + 카테고리 TOP 6 가구 조회
 # ============================================================
-@router.get("/themes/{themeId}/{category}")
+@router.get("/themes/{themeId}/{category}", response_class=FastJSONResponse)
 def get_theme_category_items(themeId: int, category: str, db: Session = Depends(get_db)):
     """
     테마 상세 페이지에서 -> 카테고리 선택 시 호출
     6개씩 보여주며 score DESC 우선순위
     """
+    return FastJSONResponse(
+        _cached_json(("theme_items", themeId, category), lambda: _theme_category_items(db, themeId, category))
+    )
+
 
+def _theme_category_items(db: Session, themeId: int, category: str) -> dict:
     # 1) 테마 유효성 체크
     theme = db.query(StyleTheme).filter(StyleTheme.style_id == themeId).first()
     if not theme:
@@ -1,22 +1,38 @@
 # app/routes/survey_routes.py
 
+import json
 from typing import List, Dict, Any, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import AsyncSessionLocal, get_db, get_async_db
+from app.core.config import settings
+from app.core.tracing import span
 
 from app.services.ai_client import (
     generate_followup_questions,
+    stream_followup_questions,
     analyze_final_style,
+    analyze_final_style_local,
+    build_image_prompt,
     generate_image,
 )
 
 from app.models.style_types import STYLE_LABELS  # 코드 → 한글 라벨
 from app.services.style_mapping import STYLE_MAP   # style_code → style_id 매핑
-from app.services.survey_logic import pick_final_style
+from app.services.survey_logic import (
+    CHOICE_QUESTIONS,
+    decided_final_style,
+    final_style_candidates,
+    pick_final_style,
+)
+from app.services import speculation
+from app.services.idempotency import fingerprint, run_once
 
 from app.models.survey import (
     SurveyGlobalQuestion,
@@ -78,6 +94,21 @@ class FollowupResponse(BaseModel):
     questions: List[FollowupQuestionOut]
 
 
+class EarlyDecisionRequest(BaseModel):
+    session_id: Optional[int] = None
+    choiceAnswers: Dict[str, Any]
+
+
+class EarlyDecisionResponse(BaseModel):
+    session_id: Optional[int] = None
+    decided: bool
+    finalStyle: Optional[str] = None
+    finalStyleLabel: Optional[str] = None
+    remaining: int
+    candidates: Dict[str, float]
+    speculating: List[str]
+
+
 class AnswerItem(BaseModel):
     qinst_id: int
     answer: Any
@@ -103,6 +134,7 @@ class SurveyFinalResponse(BaseModel):
     worstStyle: Optional[str] = None
     worstStyleLabel: Optional[str] = None
     prompt: str
+    aiPrompt: Optional[str] = None   # AI 분석(ai 모드 / enrichment)이 만든 prompt, 없으면 None
     image: Optional[str] = None
 
 
@@ -124,6 +156,24 @@ def _to_question_out(row: SurveyGlobalQuestion) -> QuestionOut:
     )
 
 
+def _add_ai_questions(db: AsyncSession, session_id: int, questions: list):
+    for idx, q in enumerate(questions, start=1):
+        db.add(
+            SessionQuestion(
+                session_id=session_id,
+                source="AI",
+                code=q["id"],
+                type="TEXT",
+                order_no=100 + idx,
+                question_text=q["text"],
+            )
+        )
+
+
+def _sse(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
 # ---------------------------------------------------------
 # 1) 설문 폼 조회 GET /survey/forms/{code}
 # ---------------------------------------------------------
@@ -237,50 +287,158 @@ def save_session_answers(
 # ---------------------------------------------------------
 
 @router.post("/followup", response_model=FollowupResponse)
-async def followup_questions(payload: FollowupRequest, db: Session = Depends(get_db)):
-    ai_questions = await generate_followup_questions(payload.choiceAnswers)
+async def followup_questions(payload: FollowupRequest, db: AsyncSession = Depends(get_async_db)):
+    ai_questions = None
+    if payload.session_id:
+        ai_questions = await speculation.claim(
+            ("followup", payload.session_id, speculation.answers_key(payload.choiceAnswers))
+        )
+    if ai_questions is None:
+        ai_questions = await generate_followup_questions(payload.choiceAnswers)
     out = [FollowupQuestionOut(id=q["id"], text=q["text"]) for q in ai_questions]
 
     if payload.session_id:
-        session = (
-            db.query(SurveySession)
-            .filter_by(session_id=payload.session_id)
-            .first()
-        )
+        session = await db.get(SurveySession, payload.session_id)
         if not session:
             raise HTTPException(404, "Session not found")
 
-        for idx, q in enumerate(out, start=1):
-            db.add(
-                SessionQuestion(
-                    session_id=session.session_id,
-                    source="AI",
-                    code=q.id,
-                    type="TEXT",
-                    order_no=100 + idx,
-                    question_text=q.text,
-                )
-            )
-        db.commit()
+        _add_ai_questions(db, session.session_id, [q.model_dump() for q in out])
+        await db.commit()
 
     return FollowupResponse(session_id=payload.session_id, questions=out)
 
 
+@router.post("/followup/stream")
+async def followup_questions_stream(payload: FollowupRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    /followup 스트리밍 버전 (Server-Sent Events)
+    - event: question  data: {"id", "text"}          질문 객체가 완성되는 즉시 1개씩
+    - event: done      data: {"session_id", "count"}  SessionQuestion 저장까지 끝난 뒤
+    - event: error     data: {"detail"}              모델 응답을 질문으로 읽지 못한 경우
+    """
+    if payload.session_id and not await db.get(SurveySession, payload.session_id):
+        raise HTTPException(404, "Session not found")
+
+    async def questions():
+        if payload.session_id:
+            ready = await speculation.claim(
+                ("followup", payload.session_id, speculation.answers_key(payload.choiceAnswers))
+            )
+            if ready is not None:
+                for q in ready:
+                    yield q
+                return
+        async for q in stream_followup_questions(payload.choiceAnswers):
+            yield q
+
+    async def events():
+        out = []
+        try:
+            async for q in questions():
+                out.append(q)
+                yield _sse("question", q)
+        except Exception as e:
+            print(f"[WARN] follow-up 스트리밍 실패: {e}")
+            yield _sse("error", {"detail": "follow-up 질문 생성에 실패했습니다."})
+            return
+
+        # 의존성 세션은 응답 시작 시점에 정리될 수 있으므로 저장은 별도 세션으로
+        if payload.session_id and out:
+            async with AsyncSessionLocal() as save_db:
+                _add_ai_questions(save_db, payload.session_id, out)
+                await save_db.commit()
+
+        yield _sse("done", {"session_id": payload.session_id, "count": len(out)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ---------------------------------------------------------
+# 4-1) 조기 결정 확인 + 뒤 단계 선행 작업 (설문 진행 중 호출)
+# ---------------------------------------------------------
+
+@router.post("/early-decision", response_model=EarlyDecisionResponse)
+async def early_decision(payload: EarlyDecisionRequest):
+    """
+    지금까지의 choiceAnswers로 최종 스타일이 이미 확정됐는지 확인
+    - 남은 문항의 모든 완성 조합(최대 3^7)에서 결과가 하나뿐이면 decided
+    - decided면 이미지 생성 / 추천 스냅샷 / follow-up 질문을 백그라운드로 미리 시작
+      → final-analysis, followup, from-survey가 결과를 그대로 가져감
+    """
+    with span("early_decision"):
+        candidates = final_style_candidates(payload.choiceAnswers)
+        final_style = decided_final_style(payload.choiceAnswers)
+
+    total = sum(candidates.values())
+    speculating = []
+    if final_style and settings.SURVEY_SPECULATION:
+        with span("speculate", style=final_style):
+            speculating = speculation.speculate_for_survey(
+                payload.session_id, final_style, payload.choiceAnswers
+            )
+
+    return EarlyDecisionResponse(
+        session_id=payload.session_id,
+        decided=final_style is not None,
+        finalStyle=final_style,
+        finalStyleLabel=STYLE_LABELS.get(final_style, final_style) if final_style else None,
+        remaining=sum(1 for q in CHOICE_QUESTIONS if payload.choiceAnswers.get(q) not in ("A", "B", "C")),
+        candidates={style: count / total for style, count in candidates.items()},
+        speculating=speculating,
+    )
+
+
 # ---------------------------------------------------------
 # 5) 최종 분석 (옵션 B 완성본)
 # ---------------------------------------------------------
 
 @router.post("/final-analysis", response_model=SurveyFinalResponse)
-async def final_analysis(payload: SurveyFinalRequest, db: Session = Depends(get_db)):
+async def final_analysis(payload: SurveyFinalRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    session_id가 있으면 (session_id, choiceAnswers, textAnswers) fingerprint 기준 멱등
+    - 재시도/중복 요청은 저장된 응답을 그대로 반환 (AI 분석, 이미지 생성, 결과 재저장 없음)
+    - 동시에 들어온 중복 요청은 진행 중인 계산 하나를 함께 기다림
+    """
+    if not payload.session_id:
+        return await _compute_final_analysis(payload, db)
 
-    # 1) 규칙 기반 최종 스타일 계산 (⚡ AI가 아니라 survey_logic)
-    final_style = pick_final_style(payload.choiceAnswers)
+    key = fingerprint(payload.session_id, payload.choiceAnswers, payload.textAnswers)
+
+    async def compute():
+        return (await _compute_final_analysis(payload, db)).model_dump()
+
+    return SurveyFinalResponse(**await run_once(db, "final-analysis", key, key, compute))
 
-    # 2) AI는 bestMatch + worst + prompt만 작성
-    analysis = await analyze_final_style(
-        final_style,            # 이미 확정된 메인 스타일
-        payload.textAnswers,    # 서술형 답변
-    )
+
+async def _compute_final_analysis(payload: SurveyFinalRequest, db: AsyncSession) -> SurveyFinalResponse:
+
+    # 1) 규칙 기반 최종 스타일 계산 (⚡ AI가 아니라 survey_logic)
+    with span("pick_final_style"):
+        final_style = pick_final_style(payload.choiceAnswers)
+
+    # 2) bestMatch + worst + prompt
+    #    local: 궁합 테이블 + 점수 벡터 (AI 왕복 없음) / ai: gpt-4o-mini
+    with span("analyze_final_style", style=final_style, mode=settings.STYLE_ANALYSIS_MODE):
+        if settings.STYLE_ANALYSIS_MODE == "ai":
+            analysis = await analyze_final_style(
+                final_style,            # 이미 확정된 메인 스타일
+                payload.textAnswers,    # 서술형 답변
+            )
+        else:
+            # 기본 prompt로 미리 만든 이미지가 있으면 enrichment 생략 (prompt가 바뀌면 재사용 불가)
+            speculative_image = bool(payload.session_id) and speculation.pending(
+                ("image", payload.session_id, build_image_prompt(final_style))
+            )
+            analysis = await analyze_final_style_local(
+                final_style,
+                payload.choiceAnswers,
+                payload.textAnswers,
+                allow_enrich=not speculative_image,
+            )
 
     best_styles = analysis.get("bestMatchStyles", []) or []
     worst_style = analysis.get("worstStyle")
@@ -294,44 +452,53 @@ async def final_analysis(payload: SurveyFinalRequest, db: Session = Depends(get_
     # 4) 이미지 생성
     image_url = None
     try:
-        image_url = await generate_image(prompt)
+        with span("generate_image") as s:
+            if payload.session_id:
+                image_url = await speculation.claim(("image", payload.session_id, prompt))
+                if s is not None:
+                    s.set(speculative=image_url is not None)
+            if image_url is None:
+                image_url = await generate_image(prompt)
     except Exception as e:
         print(f"[WARN] 이미지 생성 실패: {e}")
 
     # 5) DB 저장
     if payload.session_id:
-        db.query(SessionStyleResult).filter_by(
-            session_id=payload.session_id
-        ).delete()
-
-        final_style_id = STYLE_MAP.get(final_style)
-        rank = 1
-
-        if final_style_id:
-            db.add(
-                SessionStyleResult(
-                    session_id=payload.session_id,
-                    style_id=final_style_id,
-                    score=1.0,
-                    rank_no=rank,
+        with span("save_style_result"):
+            await db.execute(
+                delete(SessionStyleResult).where(
+                    SessionStyleResult.session_id == payload.session_id
                 )
             )
-            rank += 1
 
-        for s in best_styles:
-            sid = STYLE_MAP.get(s)
-            if sid and sid != final_style_id:
+            final_style_id = STYLE_MAP.get(final_style)
+            rank = 1
+
+            if final_style_id:
                 db.add(
                     SessionStyleResult(
                         session_id=payload.session_id,
-                        style_id=sid,
-                        score=0.8,
+                        style_id=final_style_id,
+                        score=1.0,
                         rank_no=rank,
                     )
                 )
                 rank += 1
 
-        db.commit()
+            for s in best_styles:
+                sid = STYLE_MAP.get(s)
+                if sid and sid != final_style_id:
+                    db.add(
+                        SessionStyleResult(
+                            session_id=payload.session_id,
+                            style_id=sid,
+                            score=0.8,
+                            rank_no=rank,
+                        )
+                    )
+                    rank += 1
+
+            await db.commit()
 
     # 6) 응답 반환
     return SurveyFinalResponse(
@@ -343,5 +510,6 @@ async def final_analysis(payload: SurveyFinalRequest, db: Session = Depends(get_
         worstStyle=worst_style,
         worstStyleLabel=worst_label,
         prompt=prompt,
+        aiPrompt=analysis.get("aiPrompt"),
         image=image_url,
     )
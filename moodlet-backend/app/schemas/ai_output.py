@@ -0,0 +1,87 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
+
+
+### ------------------------
+###  모델 응답(JSON) 검증용 스키마
+###  - 필드가 빠져도 기본값으로 채우고, 모르는 필드는 그대로 통과
+### ------------------------
+class _AIOutput(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+
+### ------------------------
+### Follow-Up 질문
+### ------------------------
+class FollowupQuestionItem(_AIOutput):
+    id: Optional[str] = None
+    text: str = ""
+
+
+class FollowupQuestionsOutput(_AIOutput):
+    questions: List[FollowupQuestionItem]
+
+
+### ------------------------
+### 최종 스타일 분석
+### ------------------------
+class StyleAnalysisOutput(_AIOutput):
+    bestMatchStyles: List[str] = Field(default_factory=list)
+    worstStyle: Optional[str] = None
+    prompt: Optional[str] = None
+
+
+### ------------------------
+### 평면도 구조
+### ------------------------
+class WallOut(_AIOutput):
+    x1: float
+    y1: float
+    x2: float
+    y2: float
+
+
+class OpeningOut(_AIOutput):
+    x: float
+    y: float
+    width_cm: Optional[float] = None
+
+
+class RegionOut(_AIOutput):
+    type: Optional[str] = None
+    polygon: List[List[float]] = Field(default_factory=list)
+
+
+class FloorplanStructureOutput(_AIOutput):
+    walls: List[WallOut] = Field(default_factory=list)
+    doors: List[OpeningOut] = Field(default_factory=list)
+    windows: List[OpeningOut] = Field(default_factory=list)
+    rooms: List[RegionOut] = Field(default_factory=list)
+    built_in: List[RegionOut] = Field(default_factory=list)
+    cm_per_px: Optional[float] = None   # 치수선/문 폭으로 추정한 축척 (모르면 None)
+
+
+### ------------------------
+### 가구 배치
+### ------------------------
+class PointOut(_AIOutput):
+    x: float
+    y: float
+
+
+class SizeOut(_AIOutput):
+    w: Optional[float] = None
+    h: Optional[float] = None
+
+
+class LayoutItemOutput(_AIOutput):
+    furniture_id: int
+    position: PointOut
+    size: Optional[SizeOut] = None
+    rotation: float = 0
+    confidence: Optional[float] = None
+    z_index: int = 0
+
+
+class LayoutPlanOutput(_AIOutput):
+    items: List[LayoutItemOutput]
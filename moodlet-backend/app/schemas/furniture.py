@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 from datetime import datetime
 
@@ -13,8 +13,7 @@ class FurnitureProductSimpleResponse(BaseModel):
     lowest_price: Optional[int] = None
     highest_price: Optional[int] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
         
 class ShoppingMallPrice(BaseModel):
     mall_name: Optional[str] = None
@@ -22,8 +21,10 @@ class ShoppingMallPrice(BaseModel):
     ship_fee: Optional[str] = None
     mall_url: Optional[str] = None
 
-    class Config:
-        orm_mode = True
+    mall_price_value: Optional[int] = None
+    ship_fee_value: Optional[int] = None
+
+    model_config = ConfigDict(from_attributes=True)
         
 class FurnitureProductDetailResponse(BaseModel):
     product_id: int
@@ -45,5 +46,19 @@ class FurnitureProductDetailResponse(BaseModel):
 
     prices: list[ShoppingMallPrice] = []
 
-    class Config:
-        orm_mode = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class MallPriceComparison(ShoppingMallPrice):
+    total_price: Optional[int] = None
+
+
+class FacetCount(BaseModel):
+    value: int | str
+    count: int
+
+
+class FurnitureSearchResponse(BaseModel):
+    items: list[FurnitureProductSimpleResponse]
+    next_cursor: Optional[str] = None
+    facets: dict[str, list[FacetCount]] = {}
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
 
 
@@ -31,3 +31,20 @@ class ThemeDetail(BaseModel):
     name: str
     description: Optional[str]
     categories: List[str]
+
+
+### -----------------------------------------
+### 예산 내 풀 세트 추천
+### POST /recommendations/bundles
+### -----------------------------------------
+class BundleDimensionLimit(BaseModel):
+    max_width: Optional[float] = None
+    max_depth: Optional[float] = None
+
+
+class BundleRequest(BaseModel):
+    session_id: int
+    budget: int = Field(..., gt=0)
+    categories: List[str] = Field(..., min_length=1)
+    limits: Dict[str, BundleDimensionLimit] = {}
+    k: int = Field(5, ge=1, le=20)
@@ -1,9 +1,12 @@
 # app/services/ai_client.py
 
-from openai import OpenAI
 from app.core.config import settings
+from app.core.tracing import span
+from app.schemas.ai_output import FollowupQuestionItem, FollowupQuestionsOutput, StyleAnalysisOutput
+from app.services.ai_decoding import chat_stream_items, chat_structured
+from app.services.ai_gateway import get_gateway
+import asyncio
 import json
-import re
 import base64
 import os
 import uuid
@@ -13,14 +16,12 @@ from app.models.style_types import (
     ALL_STYLES,
     STYLE_DETAILED_INFO,
 )
-
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
+from app.services.survey_logic import pick_best_worst
 
 # --------------------------------------------------------
 # 1) 개인화된 follow-up 질문 생성 (변경 없음)
 # --------------------------------------------------------
-async def generate_followup_questions(user_choice_answers: dict) -> list:
+def _followup_messages(user_choice_answers: dict) -> list:
     prompt = f"""
 너는 인테리어 취향 분석을 위한 follow-up 질문 생성 전문가다.
 
@@ -37,48 +38,71 @@ async def generate_followup_questions(user_choice_answers: dict) -> list:
 서술형 질문 3개를 생성하라.
 
 🔽 JSON만 반환:
-[
-  {{"id":"T1","text":"..."}},
-  {{"id":"T2","text":"..."}},
-  {{"id":"T3","text":"..."}}
-]
+{{
+  "questions": [
+    {{"id":"T1","text":"..."}},
+    {{"id":"T2","text":"..."}},
+    {{"id":"T3","text":"..."}}
+  ]
+}}
 """
+    return [
+        {"role": "system", "content": "출력은 반드시 JSON 객체만 반환하세요."},
+        {"role": "user", "content": prompt}
+    ]
+
 
-    resp = client.chat.completions.create(
+async def generate_followup_questions(user_choice_answers: dict) -> list:
+    data = await chat_structured(
+        FollowupQuestionsOutput,
+        list_key="questions",
         model="gpt-4o-mini",
         temperature=0.5,
-        messages=[
-            {"role": "system", "content": "출력은 반드시 JSON 배열만 반환하세요."},
-            {"role": "user", "content": prompt}
-        ]
+        messages=_followup_messages(user_choice_answers),
     )
 
-    raw = resp.choices[0].message.content or ""
+    return [
+        {"id": item.id or f"T{idx}", "text": item.text}
+        for idx, item in enumerate(data.questions, start=1)
+    ]
 
-    try:
-        data = json.loads(raw)
-    except:
-        match = re.search(r'\[.*\]', raw, re.DOTALL)
-        if not match:
-            raise Exception(f"AI 응답에서 JSON 배열을 찾지 못했습니다: {raw}")
-        data = json.loads(match.group(0))
 
-    normalized = []
-    for idx, item in enumerate(data, start=1):
-        if isinstance(item, dict):
-            normalized.append({
-                "id": item.get("id") or f"T{idx}",
-                "text": item.get("text") or ""
-            })
-        else:
-            normalized.append({"id": f"T{idx}", "text": str(item)})
-
-    return normalized
+async def stream_followup_questions(user_choice_answers: dict):
+    """generate_followup_questions 스트리밍 버전 — 질문 객체가 완성될 때마다 {"id", "text"} yield"""
+    idx = 0
+    async for item in chat_stream_items(
+        FollowupQuestionItem,
+        FollowupQuestionsOutput,
+        "questions",
+        model="gpt-4o-mini",
+        temperature=0.5,
+        messages=_followup_messages(user_choice_answers),
+    ):
+        idx += 1
+        yield {"id": item.id or f"T{idx}", "text": item.text}
 
 
 # --------------------------------------------------------
 # 2) 최종 스타일 기반 Best/Worst + Prompt 생성 (옵션 B)
 # --------------------------------------------------------
+def build_image_prompt(final_style: str) -> str:
+    """STYLE_DETAILED_INFO 기반 이미지 생성 prompt"""
+    style_info = STYLE_DETAILED_INFO.get(final_style)
+    if not style_info:
+        raise Exception(f"STYLE_DETAILED_INFO 누락: {final_style}")
+
+    return (
+        f"{style_info['roomMood']}, "
+        f"colors: {style_info['colors']}, "
+        f"materials: {style_info['materials']}, "
+        f"lighting: {style_info['lighting']}, "
+        f"furniture: {style_info['furniture']}, "
+        f"decor: {style_info['decor']}, "
+        f"composition: {style_info['composition']}, "
+        f"ultra high quality interior render, 4K, photorealistic"
+    )
+
+
 async def analyze_final_style(final_style: str, text_answers: dict) -> dict:
     """
     옵션 B:
@@ -122,7 +146,8 @@ finalStyle = "{final_style}"
 }}
 """
 
-    resp = client.chat.completions.create(
+    data = await chat_structured(
+        StyleAnalysisOutput,
         model="gpt-4o-mini",
         temperature=0.25,
         messages=[
@@ -131,50 +156,72 @@ finalStyle = "{final_style}"
         ]
     )
 
-    raw = resp.choices[0].message.content or ""
-
-    try:
-        data = json.loads(raw)
-    except:
-        match = re.search(r'\{.*\}', raw, re.DOTALL)
-        if not match:
-            raise Exception(f"AI JSON 파싱 실패: {raw}")
-        data = json.loads(match.group(0))
-
     # ----------------------------------------------------
     # 스타일 코드 유효성 필터링
     # ----------------------------------------------------
-    best = [s for s in data.get("bestMatchStyles", []) if s in ALL_STYLES]
-    worst = data.get("worstStyle")
+    best = [s for s in data.bestMatchStyles if s in ALL_STYLES]
+    worst = data.worstStyle
     if worst not in ALL_STYLES:
         worst = None
 
     # ----------------------------------------------------
     # STYLE_DETAILED_INFO 기반 자동 prompt 강화
     # ----------------------------------------------------
-    style_info = STYLE_DETAILED_INFO.get(final_style)
-    if not style_info:
-        raise Exception(f"STYLE_DETAILED_INFO 누락: {final_style}")
+    # AI 생성 prompt가 있다면 보조적으로 포함해도 되고 무시해도 됨
+    final_prompt = build_image_prompt(final_style)
 
-    auto_prompt = (
-        f"{style_info['roomMood']}, "
-        f"colors: {style_info['colors']}, "
-        f"materials: {style_info['materials']}, "
-        f"lighting: {style_info['lighting']}, "
-        f"furniture: {style_info['furniture']}, "
-        f"decor: {style_info['decor']}, "
-        f"composition: {style_info['composition']}, "
-        f"ultra high quality interior render, 4K, photorealistic"
-    )
+    return {
+        "finalStyle": final_style,
+        "bestMatchStyles": best,
+        "worstStyle": worst,
+        "prompt": final_prompt,
+        "aiPrompt": data.prompt,
+    }
 
-    # AI 생성 prompt가 있다면 보조적으로 포함해도 되고 무시해도 됨
-    final_prompt = auto_prompt
+
+async def analyze_final_style_local(
+    final_style: str,
+    choice_answers: dict,
+    text_answers: dict,
+    allow_enrich: bool = True,
+) -> dict:
+    """
+    AI 호출 없이 Best/Worst + prompt 계산 (survey_logic.pick_best_worst)
+    - STYLE_AI_ENRICH=true 이면 서술형 답변 반영용 AI 호출을 병렬로 시작하고
+      STYLE_AI_ENRICH_BUDGET_MS 안에 끝난 경우에만 그 prompt를 덧붙임
+    - allow_enrich=False: 기본 prompt로 미리 만든 이미지가 있을 때 (prompt가 바뀌면 재사용 불가)
+    """
+    if final_style not in ALL_STYLES:
+        raise Exception(f"final_style이 ALL_STYLES에 속하지 않습니다: {final_style}")
+
+    enrich = None
+    if allow_enrich and settings.STYLE_AI_ENRICH and any((v or "").strip() for v in text_answers.values()):
+        enrich = asyncio.create_task(analyze_final_style(final_style, text_answers))
+
+    best, worst = pick_best_worst(final_style, choice_answers)
+    prompt = build_image_prompt(final_style)
+    ai_prompt = None
+
+    if enrich is not None:
+        with span("style_ai_enrich", budget_ms=settings.STYLE_AI_ENRICH_BUDGET_MS) as s:
+            done, _ = await asyncio.wait({enrich}, timeout=settings.STYLE_AI_ENRICH_BUDGET_MS / 1000)
+            if not done:
+                enrich.cancel()
+                if s is not None:
+                    s.set(result="timeout")
+            elif enrich.exception() is None:
+                ai_prompt = enrich.result().get("aiPrompt")
+                if ai_prompt:
+                    prompt = f"{prompt}, {ai_prompt}"
+            else:
+                print(f"[WARN] 스타일 enrichment 실패: {enrich.exception()}")
 
     return {
         "finalStyle": final_style,
         "bestMatchStyles": best,
         "worstStyle": worst,
-        "prompt": final_prompt
+        "prompt": prompt,
+        "aiPrompt": ai_prompt,
     }
 
 
@@ -184,7 +231,7 @@ finalStyle = "{final_style}"
 STATIC_DIR = "static/images"
 
 async def generate_image(prompt: str) -> str:
-    img = client.images.generate(
+    img = await get_gateway().images(
         model="gpt-image-1-mini",
         prompt=prompt,
         size="1024x1024"
@@ -198,8 +245,9 @@ async def generate_image(prompt: str) -> str:
 
     os.makedirs(STATIC_DIR, exist_ok=True)
 
-    with open(file_path, "wb") as f:
-        f.write(img_bytes)
+    with span("file.write", path=file_path, bytes=len(img_bytes)):
+        with open(file_path, "wb") as f:
+            f.write(img_bytes)
 
     return f"/static/images/{file_name}"
 
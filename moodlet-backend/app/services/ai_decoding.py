@@ -0,0 +1,301 @@
+# app/services/ai_decoding.py
+
+"""
+모델 응답 → 검증된 Pydantic 객체 변환 레이어.
+
+1) 요청 시 JSON 모드(response_format / text.format = json_object) 사용
+2) json.loads 실패 시 재호출 전에 로컬 복구 시도
+   - ```json 코드펜스 제거, 앞뒤 설명 문장 제거 (괄호 짝 맞춰 첫 JSON 값만 추출)
+   - 스마트 큰따옴표, 끝 쉼표, Python 리터럴(True/False/None) 교정
+   - 토큰 한도로 잘린 응답은 열린 문자열/괄호를 닫아서 복구
+3) 스키마 검증까지 실패한 경우에만 1회 재호출 (coalesce 없이)
+4) 스트리밍: 배열 원소(객체)가 닫히는 즉시 꺼내서 검증 (JSONArrayStream)
+"""
+
+import json
+import re
+
+from pydantic import BaseModel, ValidationError
+
+from app.core.metrics import record_ai_decode
+from app.services.ai_gateway import get_gateway
+
+MAX_RETRIES = 1
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_PY_LITERAL_RE = re.compile(r"\b(True|False|None)\b")
+_STRING_RE = re.compile(r'"(?:\\.|[^"\\])*"')
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "„": '"'})
+
+
+class AIResponseError(Exception):
+    """복구/재시도 후에도 스키마에 맞지 않는 모델 응답"""
+
+    def __init__(self, message: str, raw: str):
+        super().__init__(f"{message}: {raw[:500]}")
+        self.raw = raw
+
+
+# --------------------------------------------------------
+# 1) JSON 텍스트 추출 / 복구
+# --------------------------------------------------------
+def _first_json_span(text: str) -> str | None:
+    """
+    첫 '{' 또는 '[' 부터 짝이 맞는 닫는 괄호까지 (문자열 내부 괄호는 무시).
+    greedy 정규식(\\{.*\\})과 달리 뒤에 붙은 설명 문장의 괄호를 먹지 않음.
+    끝까지 닫히지 않으면 잘린 응답으로 보고 나머지 전체를 반환.
+    """
+    start = next((i for i, ch in enumerate(text) if ch in "{["), None)
+    if start is None:
+        return None
+
+    depth = 0
+    in_str = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_str:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return text[start:]
+
+
+def _close_truncated(text: str) -> str:
+    """열린 문자열 / 괄호를 역순으로 닫아줌"""
+    stack = []
+    in_str = False
+    escaped = False
+    for ch in text:
+        if in_str:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+
+    if in_str:
+        text += '"'
+    text = text.rstrip().rstrip(",:")
+    return text + "".join(reversed(stack))
+
+
+def _outside_strings(text: str, fix) -> str:
+    """문자열 리터럴은 그대로 두고 나머지 구간에만 fix 적용"""
+    parts = _STRING_RE.split(text)
+    strings = _STRING_RE.findall(text)
+    out = [fix(parts[0])]
+    for string, rest in zip(strings, parts[1:]):
+        out.append(string)
+        out.append(fix(rest))
+    return "".join(out)
+
+
+def _fix_tokens(segment: str) -> str:
+    segment = _PY_LITERAL_RE.sub(lambda m: _PY_LITERALS[m.group(1)], segment)
+    return _TRAILING_COMMA_RE.sub(r"\1", segment)
+
+
+def _repair(text: str) -> str:
+    text = text.translate(_SMART_QUOTES)
+    text = _close_truncated(text)
+    return _outside_strings(text, _fix_tokens)
+
+
+def parse_json_loose(raw: str):
+    """
+    (값, repaired) 반환. 어떤 단계로도 JSON이 안 나오면 ValueError
+    """
+    raw = (raw or "").strip()
+    try:
+        return json.loads(raw), False
+    except ValueError:
+        pass
+
+    fenced = _FENCE_RE.search(raw)
+    candidate = _first_json_span(fenced.group(1) if fenced else raw)
+    if candidate is None:
+        raise ValueError("JSON 값을 찾지 못함")
+
+    try:
+        return json.loads(candidate), True
+    except ValueError:
+        pass
+    return json.loads(_repair(candidate)), True
+
+
+def decode_output(raw: str, schema: type[BaseModel], list_key: str | None = None) -> tuple[BaseModel, bool]:
+    """
+    raw 텍스트 → schema 인스턴스
+    list_key: 최상위가 배열로 와도 {list_key: [...]}로 감싸서 검증
+              (예전 프롬프트 형식 / JSON 모드 미지원 모델 대응)
+    """
+    data, repaired = parse_json_loose(raw)
+    if list_key and isinstance(data, list):
+        data = {list_key: data}
+        repaired = True
+    return schema.model_validate(data), repaired
+
+
+class JSONArrayStream:
+    """
+    조각으로 들어오는 텍스트에서 첫 JSON 배열의 객체 원소를 완성되는 대로 꺼냄
+        parser = JSONArrayStream()
+        async for delta in stream:
+            for obj in parser.feed(delta):
+                ...
+    {"questions": [...]} / [...] 둘 다 첫 '[' 를 대상 배열로 봄.
+    이미 읽은 부분은 다시 스캔하지 않음 (전체 O(n)).
+    """
+
+    def __init__(self):
+        self.text = ""          # 누적 원문 (스트림 종료 후 parse_json_loose 복구용)
+        self.skipped = 0        # 닫혔지만 JSON으로 읽지 못한 원소 수
+        self._pos = 0
+        self._depth = None      # 대상 배열 기준 깊이 (배열 시작 전 None, 닫힌 뒤 0)
+        self._in_str = False
+        self._escaped = False
+        self._obj_start = None
+
+    @property
+    def closed(self) -> bool:
+        return self._depth == 0
+
+    def feed(self, chunk: str) -> list:
+        self.text += chunk
+        out = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_str:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_str = False
+            elif ch == '"':
+                self._in_str = True
+            elif self._depth is None:
+                if ch == "[":
+                    self._depth = 1
+            elif self._depth == 0:
+                break
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 2 and ch == "{":
+                    self._obj_start = i
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and ch == "}" and self._obj_start is not None:
+                    try:
+                        out.append(json.loads(text[self._obj_start:i + 1]))
+                    except ValueError:
+                        self.skipped += 1
+                    self._obj_start = None
+        self._pos = len(text)
+        return out
+
+
+# --------------------------------------------------------
+# 2) 요청 + 검증 + (필요 시) 재호출
+# --------------------------------------------------------
+async def _decode_with_retry(request, text_of, schema: type[BaseModel], list_key: str | None):
+    name = schema.__name__
+    raw = ""
+    for attempt in range(MAX_RETRIES + 1):
+        # 첫 시도는 single-flight 공유, 재시도는 같은 실패 응답을 다시 받지 않도록 단독 호출
+        resp = await request(coalesce=attempt == 0)
+        raw = text_of(resp) or ""
+        try:
+            parsed, repaired = decode_output(raw, schema, list_key)
+        except (ValueError, ValidationError):
+            record_ai_decode(name, "invalid")
+            continue
+        record_ai_decode(name, "repaired" if repaired else "ok")
+        return parsed
+
+    record_ai_decode(name, "failed")
+    raise AIResponseError(f"{name} 형식의 응답을 얻지 못했습니다", raw)
+
+
+async def chat_structured(schema: type[BaseModel], list_key: str | None = None, **params) -> BaseModel:
+    """chat.completions + JSON 모드"""
+    params.setdefault("response_format", {"type": "json_object"})
+
+    async def request(coalesce: bool):
+        return await get_gateway().chat(coalesce=coalesce, **params)
+
+    return await _decode_with_retry(
+        request, lambda r: r.choices[0].message.content, schema, list_key
+    )
+
+
+async def responses_structured(schema: type[BaseModel], list_key: str | None = None, **params) -> BaseModel:
+    """responses API(vision) + JSON 모드"""
+    params.setdefault("text", {"format": {"type": "json_object"}})
+
+    async def request(coalesce: bool):
+        return await get_gateway().responses(coalesce=coalesce, **params)
+
+    return await _decode_with_retry(request, lambda r: r.output_text, schema, list_key)
+
+
+async def chat_stream_items(
+    item_schema: type[BaseModel],
+    schema: type[BaseModel],
+    list_key: str,
+    **params,
+):
+    """
+    chat 스트리밍 + JSON 모드 → 배열 원소를 item_schema로 검증해 완성되는 대로 yield
+    - 스트림에서 원소를 하나도 못 건졌으면 전체 텍스트를 decode_output(schema)로 복구
+    - 그래도 실패하면 AIResponseError (스트림은 재호출하지 않음)
+    """
+    params.setdefault("response_format", {"type": "json_object"})
+    name = schema.__name__
+    parser = JSONArrayStream()
+    emitted = 0
+
+    async for delta in get_gateway().stream_chat(**params):
+        for obj in parser.feed(delta):
+            try:
+                item = item_schema.model_validate(obj)
+            except ValidationError:
+                parser.skipped += 1
+                continue
+            emitted += 1
+            yield item
+
+    if emitted:
+        record_ai_decode(name, "repaired" if parser.skipped else "ok")
+        return
+
+    try:
+        parsed, _ = decode_output(parser.text, schema, list_key)
+    except (ValueError, ValidationError):
+        record_ai_decode(name, "failed")
+        raise AIResponseError(f"{name} 형식의 응답을 얻지 못했습니다", parser.text)
+    record_ai_decode(name, "repaired")
+    for item in getattr(parsed, list_key):
+        yield item
@@ -0,0 +1,335 @@
+# app/services/ai_gateway.py
+
+"""
+모든 OpenAI 호출이 거쳐가는 단일 게이트웨이.
+
+- 클라이언트(커넥션 풀) 소유: AsyncOpenAI 하나를 프로세스 전체가 공유
+- single-flight: 같은 요청(endpoint + 파라미터)이 동시에 들어오면 한 번만 호출하고 결과 공유
+- 모델별 분당 요청 수 / 토큰 예산: 초과 시 호출 전에 대기
+- backend 교체 가능: 테스트/벤치마크에서는 StubBackend로 OpenAI 없이 동작
+- 메트릭(latency/토큰/에러) + 트레이싱 span 기록
+- chat 스트리밍(stream_chat): 텍스트 조각 단위로 전달 (single-flight 대상 아님)
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import deque
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.core.metrics import record_ai_call
+from app.core.tracing import span
+
+# 모델별 (분당 요청 수, 분당 토큰 수) — None이면 제한 없음
+MODEL_BUDGETS = {
+    "gpt-4o-mini": (500, 200_000),
+    "gpt-4o": (100, 30_000),
+    "gpt-image-1-mini": (20, None),
+}
+
+BUDGET_WINDOW_SEC = 60.0
+
+
+# --------------------------------------------------------
+# backend
+# --------------------------------------------------------
+class OpenAIBackend:
+    """실제 OpenAI API (AsyncOpenAI — 이벤트 루프를 막지 않음)"""
+
+    def __init__(self, api_key: str | None = None, base_url: str | None = None):
+        self._api_key = api_key
+        self._base_url = base_url
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=self._api_key, base_url=self._base_url)
+        return self._client
+
+    async def call(self, endpoint: str, params: dict):
+        if endpoint == "chat":
+            return await self.client.chat.completions.create(**params)
+        if endpoint == "responses":
+            return await self.client.responses.create(**params)
+        if endpoint == "images":
+            return await self.client.images.generate(**params)
+        raise ValueError(f"unknown endpoint: {endpoint}")
+
+    async def stream(self, endpoint: str, params: dict):
+        """chunk(choices[0].delta.content, usage)를 내보내는 async iterator 반환"""
+        if endpoint != "chat":
+            raise ValueError(f"streaming not supported: {endpoint}")
+        return await self.client.chat.completions.create(
+            **params, stream=True, stream_options={"include_usage": True}
+        )
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+# 1x1 투명 PNG
+_STUB_PNG_B64 = (
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+
+
+def _stub_chat_content(params: dict) -> str:
+    """프롬프트 형태만 보고 스키마(app/schemas/ai_output.py)에 맞는 기본 응답 생성"""
+    text = json.dumps(params.get("messages", []), ensure_ascii=False)
+    if "follow-up" in text:
+        return json.dumps(
+            {"questions": [{"id": f"T{i}", "text": f"stub question {i}"} for i in range(1, 4)]}
+        )
+    if "배치" in text:
+        return json.dumps({"items": []})
+    return json.dumps({"bestMatchStyles": [], "worstStyle": None, "prompt": "stub prompt"})
+
+
+class StubBackend:
+    """
+    OpenAI 없이 SDK 응답 모양만 흉내내는 로컬 backend.
+    chat_handler(params) -> str 를 넘기면 chat 응답 내용을 바꿀 수 있음.
+    """
+
+    def __init__(self, chat_handler=None, latency: float = 0.0):
+        self.chat_handler = chat_handler or _stub_chat_content
+        self.latency = latency
+        self.calls = []
+
+    async def call(self, endpoint: str, params: dict):
+        self.calls.append((endpoint, params))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        usage = SimpleNamespace(prompt_tokens=0, completion_tokens=0)
+        if endpoint == "chat":
+            message = SimpleNamespace(content=self.chat_handler(params), role="assistant")
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+        if endpoint == "responses":
+            return SimpleNamespace(output_text='{"walls": [], "doors": [], "windows": [], "rooms": []}', usage=None)
+        if endpoint == "images":
+            return SimpleNamespace(data=[SimpleNamespace(b64_json=_STUB_PNG_B64)], usage=None)
+        raise ValueError(f"unknown endpoint: {endpoint}")
+
+    async def stream(self, endpoint: str, params: dict):
+        if endpoint != "chat":
+            raise ValueError(f"streaming not supported: {endpoint}")
+        self.calls.append((endpoint, {**params, "stream": True}))
+        return self._chunks(self.chat_handler(params))
+
+    async def _chunks(self, content: str, size: int = 16):
+        """content를 size 글자씩 나눠 chunk로 (latency는 조각 수로 나눠 분산)"""
+        pieces = [content[i:i + size] for i in range(0, len(content), size)] or [""]
+        for piece in pieces:
+            if self.latency:
+                await asyncio.sleep(self.latency / len(pieces))
+            delta = SimpleNamespace(content=piece, role="assistant")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        yield SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=0, completion_tokens=0))
+
+    async def aclose(self):
+        pass
+
+
+# --------------------------------------------------------
+# 모델별 예산
+# --------------------------------------------------------
+class ModelBudget:
+    """최근 60초 슬라이딩 윈도우 기준 요청 수 / 토큰 수 제한"""
+
+    def __init__(self, rpm: int | None, tpm: int | None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._events: deque = deque()   # [timestamp, tokens]
+
+    def _trim(self, now: float):
+        while self._events and now - self._events[0][0] >= BUDGET_WINDOW_SEC:
+            self._events.popleft()
+
+    async def acquire(self, est_tokens: int) -> list:
+        while True:
+            now = time.monotonic()
+            self._trim(now)
+            used_tokens = sum(e[1] for e in self._events)
+            req_ok = self.rpm is None or len(self._events) < self.rpm
+            # 윈도우가 비어 있으면 예산보다 큰 단일 요청도 통과 (영원히 대기 방지)
+            tok_ok = self.tpm is None or not self._events or used_tokens + est_tokens <= self.tpm
+            if req_ok and tok_ok:
+                entry = [now, est_tokens]
+                self._events.append(entry)
+                return entry
+            wait = BUDGET_WINDOW_SEC - (now - self._events[0][0])
+            await asyncio.sleep(max(wait, 0.05))
+
+    @staticmethod
+    def settle(entry: list, actual_tokens: int | None):
+        """실제 사용량으로 보정"""
+        if actual_tokens is not None:
+            entry[1] = actual_tokens
+
+
+def _estimate_tokens(params: dict) -> int:
+    return len(json.dumps(params, ensure_ascii=False, default=str)) // 3
+
+
+def _usage_tokens(resp) -> int | None:
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return None
+    total = getattr(usage, "total_tokens", None)
+    if total is not None:
+        return total
+    prompt = getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", None) or 0
+    completion = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", None) or 0
+    return prompt + completion
+
+
+# --------------------------------------------------------
+# gateway
+# --------------------------------------------------------
+_OWNER_CANCELLED = object()
+
+
+class AIGateway:
+    def __init__(self, backend=None, budgets: dict | None = None):
+        self.backend = backend or OpenAIBackend(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+        )
+        self._budgets = {
+            model: ModelBudget(rpm, tpm)
+            for model, (rpm, tpm) in (budgets if budgets is not None else MODEL_BUDGETS).items()
+        }
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def _key(endpoint: str, params: dict) -> str:
+        raw = json.dumps([endpoint, params], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def call(self, endpoint: str, coalesce: bool = True, **params):
+        """
+        endpoint: "chat" | "responses" | "images"
+        params  : OpenAI SDK에 그대로 넘길 인자 (model 포함)
+        """
+        if not coalesce:
+            return await self._call(endpoint, params)
+
+        key = self._key(endpoint, params)
+        # 먼저 시작한 요청(owner)이 취소되면 대기자는 취소를 물려받지 않고 다시 시도
+        # (첫 번째로 깨어난 대기자가 새 owner, 나머지는 그 호출에 합류)
+        while (inflight := self._inflight.get(key)) is not None:
+            with span("ai.coalesced", endpoint=endpoint, model=params.get("model")):
+                result = await asyncio.shield(inflight)
+            if result is not _OWNER_CANCELLED:
+                return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._call(endpoint, params)
+        except asyncio.CancelledError:
+            # owner만의 취소(enrichment 예산 초과, speculation TTL 등) → 대기자에게는 재시도 신호
+            future.set_result(_OWNER_CANCELLED)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 기다리는 쪽이 없으면 "Future exception was never retrieved" 경고 방지
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _call(self, endpoint: str, params: dict):
+        model = params.get("model", "unknown")
+        budget = self._budgets.get(model)
+        entry = None
+        if budget is not None:
+            entry = await budget.acquire(_estimate_tokens(params))
+
+        start = time.perf_counter()
+        with span(f"openai.{endpoint}", model=model):
+            try:
+                resp = await self.backend.call(endpoint, params)
+            except Exception:
+                record_ai_call(model, endpoint, time.perf_counter() - start, error=True)
+                raise
+            record_ai_call(model, endpoint, time.perf_counter() - start, resp=resp)
+
+        if entry is not None:
+            budget.settle(entry, _usage_tokens(resp))
+        return resp
+
+    async def stream_chat(self, model: str, messages: list, **params):
+        """
+        chat.completions 스트리밍 → 텍스트 조각을 도착 순서대로 yield
+        - 예산은 시작 전에 확보, 사용량은 마지막 chunk(include_usage)로 보정
+        - span은 스트림 연결까지만 (yield를 넘어서 contextvar를 유지하지 않음)
+        """
+        params = {"model": model, "messages": messages, **params}
+        budget = self._budgets.get(model)
+        entry = None
+        if budget is not None:
+            entry = await budget.acquire(_estimate_tokens(params))
+
+        start = time.perf_counter()
+        usage = None
+        try:
+            with span("openai.chat.stream", model=model):
+                stream = await self.backend.stream("chat", params)
+            async for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception:
+            record_ai_call(model, "chat.stream", time.perf_counter() - start, error=True)
+            raise
+
+        resp = SimpleNamespace(usage=usage)
+        record_ai_call(model, "chat.stream", time.perf_counter() - start, resp=resp)
+        if entry is not None:
+            budget.settle(entry, _usage_tokens(resp))
+
+    async def chat(self, model: str, messages: list, **params):
+        return await self.call("chat", model=model, messages=messages, **params)
+
+    async def responses(self, model: str, input: list, **params):
+        return await self.call("responses", model=model, input=input, **params)
+
+    async def images(self, model: str, prompt: str, **params):
+        return await self.call("images", model=model, prompt=prompt, **params)
+
+    async def aclose(self):
+        await self.backend.aclose()
+
+
+_gateway: AIGateway | None = None
+
+
+def get_gateway() -> AIGateway:
+    global _gateway
+    if _gateway is None:
+        backend = StubBackend() if settings.AI_BACKEND == "stub" else None
+        _gateway = AIGateway(backend=backend)
+    return _gateway
+
+
+def set_gateway(gateway: AIGateway | None):
+    """테스트/벤치마크에서 backend를 바꿀 때 사용"""
+    global _gateway
+    _gateway = gateway
+
+
+async def close_gateway():
+    if _gateway is not None:
+        await _gateway.aclose()
@@ -0,0 +1,215 @@
+# app/services/bundle_optimizer.py
+
+"""
+예산 안에서 category별 1개씩 고르는 "풀 세트" 추천 (multiple-choice knapsack).
+
+    가치 = score + 스타일 보너스 (최종 스타일 SAME_STYLE_BONUS / STYLE_COMPAT 스타일 COMPAT_STYLE_BONUS)
+    제약 = 가격 합 ≤ budget (+ category별 최대 width / depth는 후보 조회 단계에서 필터)
+
+1) 후보 가지치기 (k-지배): 더 싸거나 같은 가격에 가치가 더 높은 상품이 k개 이상이면
+   그 상품은 상위 k개 조합 어디에도 들어갈 수 없음 → 제거
+2) branch-and-bound DFS
+   - 후보가 적은 category부터, category 안에서는 가치 내림차순으로 탐색
+   - 상한 = 현재 가치 + 남은 category 최대 가치 합 ≤ k번째 조합 가치면 중단
+   - 남은 category 최저가 합이 남은 예산을 넘으면 건너뜀
+   - MAX_NODES를 넘으면 그때까지의 최선 반환 (exact = False)
+"""
+
+import heapq
+import time
+
+from sqlalchemy.orm import Session
+
+from app.core.tracing import span
+from app.models.furniture import FurnitureProduct
+from app.models.style_types import ALL_STYLES, STYLE_COMPAT
+from app.services.style_mapping import STYLE_MAP
+
+SAME_STYLE_BONUS = 0.3
+COMPAT_STYLE_BONUS = 0.15
+
+DEFAULT_BUNDLES = 5
+MAX_BUNDLE_CATEGORIES = 8
+MAX_NODES = 200_000
+
+# style_id → 스타일 코드 (ALL_STYLES 순서 = style_theme 1~8)
+STYLE_CODES = {STYLE_MAP[code]: code for code in ALL_STYLES}
+
+
+def style_bonuses(style_id: int) -> dict[int, float]:
+    """후보로 쓸 style_id → 보너스 (최종 스타일 + 궁합 좋은 스타일)"""
+    bonuses = {style_id: SAME_STYLE_BONUS}
+    for code in STYLE_COMPAT.get(STYLE_CODES.get(style_id), []):
+        bonuses.setdefault(STYLE_MAP[code], COMPAT_STYLE_BONUS)
+    return bonuses
+
+
+def prune_dominated(candidates: list[tuple], k: int) -> list[tuple]:
+    """
+    candidates: [(price, value, payload)]
+    가격 오름차순으로 보면서 지금까지 본 상위 k개 가치보다 높을 때만 남김
+    """
+    kept = []
+    best: list[float] = []   # 지금까지 가치 상위 k개 (min-heap)
+    for item in sorted(candidates, key=lambda c: (c[0], -c[1])):
+        value = item[1]
+        if len(best) < k:
+            heapq.heappush(best, value)
+        elif value > best[0]:
+            heapq.heapreplace(best, value)
+        else:
+            continue
+        kept.append(item)
+    return kept
+
+
+def best_bundles(groups: list[list[tuple]], budget: int, k: int = DEFAULT_BUNDLES,
+                 max_nodes: int = MAX_NODES) -> tuple[list[tuple], bool]:
+    """
+    groups: category별 [(price, value, payload)] — category마다 정확히 1개 선택
+    반환: ([(total_value, total_price, [payload, ...])] 가치 내림차순, exact)
+    payload 순서는 groups 순서와 같음
+    """
+    if not groups or any(not g for g in groups):
+        return [], True
+
+    pruned = [prune_dominated(g, k) for g in groups]
+    # 후보가 적은 category부터 → 위쪽 분기 수가 작아 가지치기가 빨리 걸림
+    order = sorted(range(len(pruned)), key=lambda i: len(pruned[i]))
+    levels = [sorted(pruned[i], key=lambda c: -c[1]) for i in order]
+
+    n = len(levels)
+    max_value_after = [0.0] * (n + 1)
+    min_price_after = [0] * (n + 1)
+    for depth in range(n - 1, -1, -1):
+        max_value_after[depth] = max_value_after[depth + 1] + levels[depth][0][1]
+        min_price_after[depth] = min_price_after[depth + 1] + min(c[0] for c in levels[depth])
+
+    top: list[tuple] = []   # (value, seq, price, picks) min-heap
+    picks = [None] * n
+    nodes = 0
+    seq = 0
+    exact = True
+
+    def dfs(depth: int, spent: int, value: float):
+        nonlocal nodes, seq, exact
+        if depth == n:
+            seq += 1
+            entry = (value, seq, spent, list(picks))
+            if len(top) < k:
+                heapq.heappush(top, entry)
+            elif entry > top[0]:
+                heapq.heapreplace(top, entry)
+            return
+
+        for price, item_value, payload in levels[depth]:
+            if len(top) == k and value + item_value + max_value_after[depth + 1] <= top[0][0]:
+                break   # 가치 내림차순이므로 뒤는 모두 상한 미달
+            if spent + price + min_price_after[depth + 1] > budget:
+                continue
+            nodes += 1
+            if nodes > max_nodes:
+                exact = False
+                return
+            picks[depth] = payload
+            dfs(depth + 1, spent + price, value + item_value)
+            if not exact:
+                return
+
+    dfs(0, 0, 0.0)
+
+    # picks를 원래 groups 순서로 되돌림
+    position = {g: d for d, g in enumerate(order)}
+    bundles = [
+        (value, spent, [chosen[position[g]] for g in range(n)])
+        for value, _, spent, chosen in sorted(top, key=lambda e: (-e[0], e[2]))
+    ]
+    return bundles, exact
+
+
+def _candidate_groups(db: Session, categories: list[str], budget: int,
+                      bonuses: dict[int, float], limits: dict[str, dict]) -> list[list[tuple]]:
+    """category별 후보 (가격 있고 예산 이하, 치수 제한 통과) — 전체 category를 한 번에 조회"""
+    filters = [
+        FurnitureProduct.category.in_(categories),
+        FurnitureProduct.style_id.in_(list(bonuses)),
+        FurnitureProduct.lowest_price.isnot(None),
+        FurnitureProduct.lowest_price <= budget,
+    ]
+    rows = (
+        db.query(
+            FurnitureProduct.product_id,
+            FurnitureProduct.name,
+            FurnitureProduct.image_url,
+            FurnitureProduct.detail_url,
+            FurnitureProduct.category,
+            FurnitureProduct.lowest_price,
+            FurnitureProduct.score,
+            FurnitureProduct.style_id,
+            FurnitureProduct.width,
+            FurnitureProduct.depth,
+        )
+        .filter(*filters)
+        .all()
+    )
+
+    groups = {c: [] for c in categories}
+    for r in rows:
+        limit = limits.get(r.category) or {}
+        if limit.get("max_width") is not None and (r.width is None or r.width > limit["max_width"]):
+            continue
+        if limit.get("max_depth") is not None and (r.depth is None or r.depth > limit["max_depth"]):
+            continue
+        score = float(r.score) if r.score is not None else 0.0
+        price = int(r.lowest_price)
+        groups[r.category].append((
+            price,
+            score + bonuses[r.style_id],
+            {
+                "product_id": r.product_id,
+                "name": r.name,
+                "image_url": r.image_url,
+                "detail_url": r.detail_url,
+                "category": r.category,
+                "lowest_price": price,
+                "score": float(r.score) if r.score is not None else None,
+                "style_id": r.style_id,
+            },
+        ))
+    return [groups[c] for c in categories]
+
+
+def optimize_bundles(db: Session, style_id: int, categories: list[str], budget: int,
+                     k: int = DEFAULT_BUNDLES, limits: dict[str, dict] | None = None) -> dict:
+    """
+    limits = {"sofa": {"max_width": 200, "max_depth": None}, ...}
+    후보가 없는 category가 있으면 bundles = [] + missing에 category 표시
+    """
+    categories = list(dict.fromkeys(categories))
+    bonuses = style_bonuses(style_id)
+
+    with span("bundle.candidates", categories=len(categories)):
+        groups = _candidate_groups(db, categories, budget, bonuses, limits or {})
+
+    missing = [c for c, g in zip(categories, groups) if not g]
+    if missing:
+        return {"bundles": [], "exact": True, "missing": missing, "elapsed_ms": 0.0}
+
+    started = time.perf_counter()
+    with span("bundle.search", candidates=sum(len(g) for g in groups)):
+        bundles, exact = best_bundles(groups, budget, k)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        "bundles": [
+            {
+                "total_price": spent,
+                "total_value": round(value, 4),
+                "items": items,
+            }
+            for value, spent, items in bundles
+        ],
+        "exact": exact,
+        "missing": [],
+        "elapsed_ms": round(elapsed_ms, 2),
+    }
@@ -0,0 +1,376 @@
+# app/services/catalog_fit.py
+
+"""
+평면도 방 크기 기준 가구 사전 필터 (배치 전에 "이 방에 들어가는 상품"만 보여주기).
+
+- 카탈로그의 product_id / category / width / depth / height / score를 NumPy 배열로 한 번 적재
+  (category → score DESC → product_id 순으로 정렬해 두어 category별 연속 구간 = 이미 순위순)
+- 방마다 category 구간에 대해 비교 연산 한 번씩으로 방향별 적합 여부 계산
+    x    : width가 방 가로(x축) 방향
+    y    : 90° 회전 (width가 방 세로 방향)
+    wall : 문/창문을 뺀 빈 벽 구간에 등을 대고 (width ≤ 벽 구간, depth ≤ 벽에서 맞은편까지)
+- 외접 사각형 비교는 1차 필터, 점유 격자가 있으면 방의 빈 셀(벽/문/창문 제외)에
+  실제로 들어가는지 OccupancyGrid.free_widths로 최종 확인 (ㄱ자 방 등 외접 사각형보다 좁은 방)
+- x / y 중 하나라도 들어가는 상품만 남기고, 구간 앞에서부터 limit개 = score 순 상위
+- 치수가 없는 상품은 확인할 수 없으므로 제외 (height는 없으면 통과)
+
+카탈로그 적재(ingest_catalog.py)는 별도 프로세스이므로 CATALOG_TTL마다 다시 읽음.
+평면도 좌표는 px → occupancy.cm_per_px로 cm 변환 후 계산.
+"""
+
+import math
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.ai.layout_planner.occupancy import OccupancyGrid, cm_per_px
+from app.core.metrics import record_cache
+from app.core.tracing import span
+from app.models.furniture import FurnitureProduct
+from app.services.furniture_service import CATEGORY_MAPPING, SIMPLE_COLUMNS, simple_dicts
+
+CATALOG_TTL = 600
+
+# 가구 주변 여유 (벽/다른 가구와 완전히 맞닿지 않게)
+FIT_MARGIN_CM = 10.0
+CEILING_HEIGHT_CM = 230.0
+# 문/창문 중심이 벽에서 이 거리 안이면 그 벽의 개구부로 봄
+OPENING_SNAP_CM = 30.0
+DEFAULT_DOOR_CM = 80.0
+DEFAULT_WINDOW_CM = 60.0
+
+ORIENT_X = 1
+ORIENT_Y = 2
+ORIENT_WALL = 4
+ORIENT_NAMES = ((ORIENT_X, "x"), (ORIENT_Y, "y"), (ORIENT_WALL, "wall"))
+
+DEFAULT_FIT_LIMIT = 20
+MAX_FIT_LIMIT = 100
+
+
+def _num(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+# --------------------------------------------------------
+# 카탈로그 배열
+# --------------------------------------------------------
+class CatalogArrays:
+    """category → score DESC → product_id 순으로 정렬된 열 배열"""
+
+    def __init__(self, product_ids, categories, width, depth, height, score):
+        n = len(product_ids)
+        cat_names, cat_codes = np.unique(np.asarray(categories, dtype=object).astype(str), return_inverse=True)
+        score = np.asarray(score, dtype=np.float64)
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+
+        # lexsort: 마지막 키가 1순위. score NULL은 맨 뒤
+        order = np.lexsort((product_ids, -np.nan_to_num(score, nan=-np.inf), cat_codes))
+        self.product_ids = product_ids[order]
+        self.width = np.asarray(width, dtype=np.float32)[order]
+        self.depth = np.asarray(depth, dtype=np.float32)[order]
+        self.height = np.asarray(height, dtype=np.float32)[order]
+        self.score = score[order]
+
+        codes = cat_codes[order]
+        starts = np.searchsorted(codes, np.arange(len(cat_names)), side="left")
+        ends = np.append(starts[1:], n)
+        self.slices = {
+            str(name): (int(s), int(e)) for name, s, e in zip(cat_names, starts, ends)
+        }
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    @classmethod
+    def from_rows(cls, rows) -> "CatalogArrays":
+        """(product_id, category, width, depth, height, score) 행 목록 → 배열 (NULL 치수/score는 nan)"""
+        if not rows:
+            return cls([], [], [], [], [], [])
+        ids, categories, width, depth, height, score = zip(*rows)
+        return cls(
+            ids,
+            categories,
+            np.array(width, dtype=np.float64),
+            np.array(depth, dtype=np.float64),
+            np.array(height, dtype=np.float64),
+            np.array(score, dtype=np.float64),
+        )
+
+
+_catalog: tuple[float, CatalogArrays] | None = None
+_catalog_lock = threading.Lock()
+
+
+def load_catalog(db: Session) -> CatalogArrays:
+    """필요한 6개 컬럼만 한 번에 읽어 배열로 (CATALOG_TTL 동안 프로세스 안에서 재사용)"""
+    global _catalog
+    cached = _catalog
+    if cached and time.monotonic() - cached[0] < CATALOG_TTL:
+        record_cache("catalog_fit", True)
+        return cached[1]
+
+    # 동시에 만료를 본 요청들이 모두 전체 카탈로그를 읽지 않도록
+    with _catalog_lock:
+        cached = _catalog
+        if cached and time.monotonic() - cached[0] < CATALOG_TTL:
+            record_cache("catalog_fit", True)
+            return cached[1]
+        record_cache("catalog_fit", False)
+
+        with span("catalog_fit.load") as s:
+            rows = db.execute(
+                select(
+                    FurnitureProduct.product_id,
+                    FurnitureProduct.category,
+                    FurnitureProduct.width,
+                    FurnitureProduct.depth,
+                    FurnitureProduct.height,
+                    FurnitureProduct.score,
+                ).where(FurnitureProduct.category.isnot(None))
+            ).all()
+            catalog = CatalogArrays.from_rows(rows)
+            if s is not None:
+                s.set(products=len(catalog))
+
+        _catalog = (time.monotonic(), catalog)
+        return catalog
+
+
+def invalidate_catalog():
+    global _catalog
+    _catalog = None
+
+
+# --------------------------------------------------------
+# 방 치수
+# --------------------------------------------------------
+def _openings(struct: dict, scale: float) -> list[tuple[float, float, float]]:
+    return [
+        (_num(o.get("x")) * scale, _num(o.get("y")) * scale, _num(o.get("width_cm"), default))
+        for key, default in (("doors", DEFAULT_DOOR_CM), ("windows", DEFAULT_WINDOW_CM))
+        for o in struct.get(key) or []
+    ]
+
+
+def _free_spans(p0, p1, polygon, openings) -> list[tuple[float, float]]:
+    """
+    방 polygon의 변 p0→p1에서 개구부를 뺀 빈 구간들 → [(길이, 맞은편까지 깊이), ...]
+    깊이 = polygon 꼭짓점 중 변에서 가장 먼 거리 (직사각형 방이면 맞은편 벽)
+    """
+    dx, dy = p1[0] - p0[0], p1[1] - p0[1]
+    length = math.hypot(dx, dy)
+    if length == 0:
+        return []
+    ux, uy = dx / length, dy / length
+
+    depth = max(abs((x - p0[0]) * uy - (y - p0[1]) * ux) for x, y in polygon)
+
+    cuts = []
+    for x, y, width in openings:
+        t = (x - p0[0]) * ux + (y - p0[1]) * uy
+        off = abs((x - p0[0]) * uy - (y - p0[1]) * ux)
+        if off <= OPENING_SNAP_CM and -width / 2 < t < length + width / 2:
+            cuts.append((t - width / 2, t + width / 2))
+    cuts.sort()
+
+    spans = []
+    pos = 0.0
+    for lo, hi in cuts:
+        if lo > pos:
+            spans.append((min(lo, length) - pos, depth))
+        pos = max(pos, hi)
+        if pos >= length:
+            break
+    if pos < length:
+        spans.append((length - pos, depth))
+    return spans
+
+
+def room_dimensions(struct: dict, grid: OccupancyGrid | None = None) -> list[dict]:
+    """
+    방별 {index, type, width_cm, depth_cm, spans, free_widths, cell_cm}
+    - width_cm / depth_cm: polygon 외접 사각형 (x / y 방향)
+    - spans: 빈 벽 구간 (길이, 깊이) — 다른 구간에 완전히 포함되는 것은 제거
+    - free_widths / cell_cm: 점유 격자 기준 빈 셀 사각형 폭 (grid가 없으면 None)
+    방 정보가 없으면 벽 전체 범위를 방 하나로 봄
+    """
+    rooms = []
+    for idx, room in enumerate(struct.get("rooms") or []):
+        polygon = [(_num(p[0]), _num(p[1])) for p in room.get("polygon") or [] if len(p) >= 2]
+        if len(polygon) >= 3:
+            rooms.append((idx, room.get("type") or "room", polygon))
+
+    if not rooms:
+        xs = [_num(w.get(k)) for w in struct.get("walls") or [] for k in ("x1", "x2")]
+        ys = [_num(w.get(k)) for w in struct.get("walls") or [] for k in ("y1", "y2")]
+        if not xs:
+            return []
+        x0, x1, y0, y1 = min(xs), max(xs), min(ys), max(ys)
+        rooms.append((None, "room", [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]))
+
+    scale = cm_per_px(struct)
+    openings = _openings(struct, scale)
+    result = []
+    for idx, room_type, polygon_px in rooms:
+        polygon = [(x * scale, y * scale) for x, y in polygon_px]
+        xs = [p[0] for p in polygon]
+        ys = [p[1] for p in polygon]
+        spans = []
+        for k in range(len(polygon)):
+            spans += _free_spans(polygon[k], polygon[(k + 1) % len(polygon)], polygon, openings)
+
+        # (길이, 깊이) 둘 다 더 큰 구간이 있으면 판정에 영향 없음
+        spans.sort(reverse=True)
+        pareto = []
+        for length, depth in spans:
+            if not pareto or depth > pareto[-1][1]:
+                pareto.append((length, depth))
+
+        free_widths = None
+        if grid is not None:
+            bbox_px = (min(p[0] for p in polygon_px), min(p[1] for p in polygon_px),
+                       max(p[0] for p in polygon_px), max(p[1] for p in polygon_px))
+            free_widths = grid.free_widths(idx, bbox_px)
+
+        result.append({
+            "index": idx,
+            "type": room_type,
+            "width_cm": max(xs) - min(xs),
+            "depth_cm": max(ys) - min(ys),
+            "spans": pareto,
+            "free_widths": free_widths,
+            "cell_cm": grid.cell_px * grid.cm_per_px if grid is not None else None,
+        })
+    return result
+
+
+# --------------------------------------------------------
+# 적합 판정
+# --------------------------------------------------------
+def _grid_fits(free_widths: np.ndarray, cell_cm: float, size_x, size_y) -> np.ndarray:
+    """size_x × size_y(cm) 사각형이 들어가는 빈 셀 영역이 있는지 (셀 단위 올림, nan은 False)"""
+    rows = np.minimum(np.nan_to_num(np.ceil(size_y / cell_cm), nan=np.inf), len(free_widths) - 1)
+    return free_widths[rows.astype(np.int64)] >= np.ceil(size_x / cell_cm)
+
+
+def fit_flags(catalog: CatalogArrays, start: int, end: int, room: dict,
+              margin: float = FIT_MARGIN_CM, ceiling: float = CEILING_HEIGHT_CM) -> np.ndarray:
+    """catalog[start:end] 상품별 ORIENT_* 비트 (0이면 안 들어감)"""
+    w = catalog.width[start:end] + margin
+    d = catalog.depth[start:end] + margin
+    tall_ok = ~(catalog.height[start:end] > ceiling)   # nan(높이 없음)은 통과
+
+    room_w, room_d = room["width_cm"], room["depth_cm"]
+    fits_x = (w <= room_w) & (d <= room_d) & tall_ok
+    fits_y = (d <= room_w) & (w <= room_d) & tall_ok
+
+    # 외접 사각형을 통과한 상품만 실제 빈 셀 영역으로 다시 확인
+    free_widths = room.get("free_widths")
+    if free_widths is not None:
+        fits_x &= _grid_fits(free_widths, room["cell_cm"], w, d)
+        fits_y &= _grid_fits(free_widths, room["cell_cm"], d, w)
+
+    fits_wall = np.zeros(end - start, dtype=bool)
+    for length, depth in room["spans"]:
+        fits_wall |= (w <= length) & (d <= depth)
+
+    flags = fits_x * np.uint8(ORIENT_X) | fits_y * np.uint8(ORIENT_Y)
+    # 벽 배치는 자유 배치가 가능한 상품에만 표시
+    return flags | ((flags > 0) & fits_wall) * np.uint8(ORIENT_WALL)
+
+
+def _orientations(flag: int) -> list[str]:
+    return [name for bit, name in ORIENT_NAMES if flag & bit]
+
+
+def resolve_categories(main: str | None, sub: str | None) -> list[str]:
+    if sub:
+        return [sub]
+    if main:
+        return list(CATEGORY_MAPPING.get(main, []))
+    return [c for subs in CATEGORY_MAPPING.values() for c in subs]
+
+
+def fit_catalog(catalog: CatalogArrays, rooms: list[dict], categories: list[str],
+                limit: int = DEFAULT_FIT_LIMIT) -> list[dict]:
+    """
+    방별 {room, categories: {category: [(index, flags, total)]}} — DB 조회 없는 순수 계산
+    index는 catalog 배열 위치, total은 해당 category에서 들어가는 상품 수
+    """
+    result = []
+    for room in rooms:
+        per_category = {}
+        for category in categories:
+            bounds = catalog.slices.get(category)
+            if bounds is None:
+                continue
+            start, end = bounds
+            flags = fit_flags(catalog, start, end, room)
+            hits = np.flatnonzero(flags)
+            per_category[category] = {
+                "total": int(hits.size),
+                "items": [(start + int(i), int(flags[i])) for i in hits[:limit]],
+            }
+        result.append({"room": room, "categories": per_category})
+    return result
+
+
+def fit_for_floorplan(db: Session, struct: dict, main: str | None = None, sub: str | None = None,
+                      limit: int = DEFAULT_FIT_LIMIT, grid: OccupancyGrid | None = None) -> list[dict]:
+    """
+    평면도 구조 → 방별 category별 들어가는 상품 (score 순 상위 limit개)
+    grid(점유 격자)가 있으면 방의 실제 빈 영역으로 최종 확인
+    상품 표시 정보는 남은 product_id만 IN 조회 한 번
+    """
+    catalog = load_catalog(db)
+    rooms = room_dimensions(struct, grid)
+    limit = max(1, min(limit, MAX_FIT_LIMIT))
+
+    with span("catalog_fit.fit", rooms=len(rooms), products=len(catalog)):
+        fitted = fit_catalog(catalog, rooms, resolve_categories(main, sub), limit)
+
+    ids = {
+        int(catalog.product_ids[idx])
+        for entry in fitted
+        for cat in entry["categories"].values()
+        for idx, _ in cat["items"]
+    }
+    products = {}
+    if ids:
+        rows = db.query(*SIMPLE_COLUMNS).filter(FurnitureProduct.product_id.in_(ids)).all()
+        products = {p["product_id"]: p for p in simple_dicts(rows)}
+
+    response = []
+    for entry in fitted:
+        room = entry["room"]
+        categories = {}
+        for category, cat in entry["categories"].items():
+            items = []
+            for idx, flag in cat["items"]:
+                product = products.get(int(catalog.product_ids[idx]))
+                if product is None:   # 캐시 적재 이후 삭제된 상품
+                    continue
+                items.append({
+                    **product,
+                    "width": float(catalog.width[idx]),
+                    "depth": float(catalog.depth[idx]),
+                    "orientations": _orientations(flag),
+                })
+            categories[category] = {"total": cat["total"], "items": items}
+
+        response.append({
+            "room": room["index"],
+            "type": room["type"],
+            "width_cm": round(room["width_cm"], 1),
+            "depth_cm": round(room["depth_cm"], 1),
+            "longest_free_wall_cm": round(max((s[0] for s in room["spans"]), default=0.0), 1),
+            "categories": categories,
+        })
+    return response
@@ -0,0 +1,334 @@
+# app/services/catalog_ingest.py
+
+"""
+상품 카탈로그 적재 파이프라인.
+
+CSV / JSONL 피드를 한 줄씩 읽어 batch 단위로
+  1) 임시 staging 테이블에 COPY
+  2) detail_url(자연키) 기준 upsert — 값이 바뀐 행만 UPDATE
+  3) furniture_price upsert + lowest_price / highest_price 재계산
+  4) 이미지가 새로 들어오거나 바뀐 상품은 furniture_embedding_queue에 등록
+하는 흐름. batch 크기만큼만 메모리에 올리므로 수십만 행도 일정한 메모리로 처리.
+"""
+
+import csv
+import io
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+from app.services.furniture_service import parse_price
+
+PRODUCT_COLUMNS = [
+    "detail_url",
+    "name",
+    "image_url",
+    "category",
+    "width",
+    "depth",
+    "height",
+    "bed_size_code",
+    "material",
+    "color",
+    "style_id",
+    "score",
+    "lowest_price",
+    "highest_price",
+]
+
+PRICE_COLUMNS = [
+    "detail_url",
+    "mall_name",
+    "mall_price",
+    "ship_fee",
+    "mall_url",
+    "mall_price_value",
+    "ship_fee_value",
+]
+
+# upsert 시 비교/갱신할 컬럼
+# - 자연키 제외
+# - lowest/highest_price는 신규 INSERT 때만 피드 값 사용, 이후엔 furniture_price 기준 재계산
+PRODUCT_UPDATE_COLUMNS = [
+    c for c in PRODUCT_COLUMNS
+    if c not in ("detail_url", "lowest_price", "highest_price")
+]
+PRICE_UPDATE_COLUMNS = ["mall_price", "ship_fee", "mall_url", "mall_price_value", "ship_fee_value"]
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+@dataclass
+class IngestStats:
+    read: int = 0
+    skipped: int = 0
+    upserted: int = 0
+    prices: int = 0
+    embeddings_queued: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.read / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"read={self.read} upserted={self.upserted} prices={self.prices} "
+            f"embeddings_queued={self.embeddings_queued} skipped={self.skipped} "
+            f"elapsed={self.elapsed:.1f}s ({self.rows_per_sec:,.0f} rows/s)"
+        )
+
+
+# --------------------------------------------------------
+# 1) 피드 읽기 (스트리밍)
+# --------------------------------------------------------
+def read_feed(path: str) -> Iterator[dict]:
+    """확장자가 .jsonl/.ndjson이면 JSON Lines, 그 외는 CSV(헤더 포함)"""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def _batches(records: Iterable[dict], size: int) -> Iterator[list]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _blank_to_none(value):
+    if value is None:
+        return None
+    if isinstance(value, str) and not value.strip():
+        return None
+    return value
+
+
+def _price_rows(record: dict) -> list:
+    """
+    JSONL: record["prices"] = [{mall_name, mall_price, ship_fee, mall_url}, ...]
+    CSV  : mall_name / mall_price / ship_fee / mall_url 컬럼이 있으면 1행
+    """
+    prices = record.get("prices")
+    if prices is None and _blank_to_none(record.get("mall_name")):
+        prices = [record]
+
+    rows = []
+    for p in prices or []:
+        mall_name = _blank_to_none(p.get("mall_name"))
+        if not mall_name:
+            continue
+        rows.append([
+            record["detail_url"],
+            mall_name,
+            _blank_to_none(p.get("mall_price")),
+            _blank_to_none(p.get("ship_fee")),
+            _blank_to_none(p.get("mall_url")),
+            parse_price(_blank_to_none(p.get("mall_price"))),
+            parse_price(_blank_to_none(p.get("ship_fee"))),
+        ])
+    return rows
+
+
+def _to_copy_buffer(rows: list) -> io.StringIO:
+    """COPY ... (FORMAT csv) 입력 — 따옴표 없는 빈 칸은 NULL"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(["" if v is None else v for v in row])
+    buf.seek(0)
+    return buf
+
+
+# --------------------------------------------------------
+# 2) staging + upsert SQL
+# --------------------------------------------------------
+STAGE_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS stage_product (
+    seq           BIGINT,
+    detail_url    TEXT,
+    name          TEXT,
+    image_url     TEXT,
+    category      TEXT,
+    width         NUMERIC(10, 2),
+    depth         NUMERIC(10, 2),
+    height        NUMERIC(10, 2),
+    bed_size_code TEXT,
+    material      TEXT,
+    color         TEXT,
+    style_id      BIGINT,
+    score         NUMERIC(10, 4),
+    lowest_price  BIGINT,
+    highest_price BIGINT
+) ON COMMIT DELETE ROWS;
+
+CREATE TEMP TABLE IF NOT EXISTS stage_price (
+    seq              BIGINT,
+    detail_url       TEXT,
+    mall_name        TEXT,
+    mall_price       TEXT,
+    ship_fee         TEXT,
+    mall_url         TEXT,
+    mall_price_value BIGINT,
+    ship_fee_value   BIGINT
+) ON COMMIT DELETE ROWS;
+"""
+
+# 새로 들어오거나 이미지가 바뀐 상품 (upsert 전에 비교)
+CHANGED_IMAGES_SQL = """
+SELECT DISTINCT s.detail_url
+FROM stage_product s
+LEFT JOIN furniture_product p ON p.detail_url = s.detail_url
+WHERE s.image_url IS NOT NULL
+  AND p.image_url IS DISTINCT FROM s.image_url
+"""
+
+_cols = ", ".join(PRODUCT_COLUMNS)
+_updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in PRODUCT_UPDATE_COLUMNS)
+_old = ", ".join(f"furniture_product.{c}" for c in PRODUCT_UPDATE_COLUMNS)
+_new = ", ".join(f"EXCLUDED.{c}" for c in PRODUCT_UPDATE_COLUMNS)
+
+# 같은 batch 안의 중복 detail_url은 마지막 행만 사용
+UPSERT_PRODUCT_SQL = f"""
+INSERT INTO furniture_product ({_cols})
+SELECT DISTINCT ON (detail_url) {_cols}
+FROM stage_product
+ORDER BY detail_url, seq DESC
+ON CONFLICT (detail_url) DO UPDATE SET {_updates}
+WHERE ({_old}) IS DISTINCT FROM ({_new})
+"""
+
+_price_cols = ", ".join(PRICE_COLUMNS[1:])
+_price_updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in PRICE_UPDATE_COLUMNS)
+_price_old = ", ".join(f"furniture_price.{c}" for c in PRICE_UPDATE_COLUMNS)
+_price_new = ", ".join(f"EXCLUDED.{c}" for c in PRICE_UPDATE_COLUMNS)
+
+UPSERT_PRICE_SQL = f"""
+INSERT INTO furniture_price (product_id, {_price_cols})
+SELECT DISTINCT ON (p.product_id, s.mall_name) p.product_id, {", ".join(f"s.{c}" for c in PRICE_COLUMNS[1:])}
+FROM stage_price s
+JOIN furniture_product p ON p.detail_url = s.detail_url
+ORDER BY p.product_id, s.mall_name, s.seq DESC
+ON CONFLICT (product_id, mall_name) DO UPDATE SET {_price_updates}
+WHERE ({_price_old}) IS DISTINCT FROM ({_price_new})
+"""
+
+# 이번 batch에 가격이 들어온 상품만 최저/최고가 재계산
+REFRESH_PRICE_RANGE_SQL = """
+UPDATE furniture_product p
+SET lowest_price = agg.low, highest_price = agg.high
+FROM (
+    SELECT fp.product_id,
+           MIN(fp.mall_price_value) AS low,
+           MAX(fp.mall_price_value) AS high
+    FROM furniture_price fp
+    WHERE fp.product_id IN (
+        SELECT p2.product_id
+        FROM stage_price s
+        JOIN furniture_product p2 ON p2.detail_url = s.detail_url
+    )
+    GROUP BY fp.product_id
+) agg
+WHERE p.product_id = agg.product_id
+  AND (p.lowest_price, p.highest_price) IS DISTINCT FROM (agg.low, agg.high)
+"""
+
+ENQUEUE_EMBEDDING_SQL = """
+INSERT INTO furniture_embedding_queue (product_id, image_url)
+SELECT p.product_id, p.image_url
+FROM furniture_product p
+WHERE p.detail_url = ANY(%s)
+ON CONFLICT (product_id) DO UPDATE
+SET image_url = EXCLUDED.image_url, queued_at = now()
+"""
+
+
+# --------------------------------------------------------
+# 3) batch 적재
+# --------------------------------------------------------
+def _load_batch(conn, batch: list, seq_start: int, stats: IngestStats):
+    product_rows = []
+    price_rows = []
+
+    for offset, record in enumerate(batch):
+        record["detail_url"] = _blank_to_none(record.get("detail_url"))
+        if not record["detail_url"] or not _blank_to_none(record.get("name")):
+            stats.skipped += 1
+            continue
+
+        seq = seq_start + offset
+        product_rows.append([seq] + [_blank_to_none(record.get(c)) for c in PRODUCT_COLUMNS])
+        price_rows.extend([seq] + row for row in _price_rows(record))
+
+    if not product_rows:
+        return
+
+    with conn.cursor() as cur:
+        cur.execute(STAGE_DDL)
+        cur.copy_expert(
+            f"COPY stage_product (seq, {', '.join(PRODUCT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            _to_copy_buffer(product_rows),
+        )
+        if price_rows:
+            cur.copy_expert(
+                f"COPY stage_price (seq, {', '.join(PRICE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                _to_copy_buffer(price_rows),
+            )
+
+        cur.execute(CHANGED_IMAGES_SQL)
+        changed_images = [r[0] for r in cur.fetchall()]
+
+        cur.execute(UPSERT_PRODUCT_SQL)
+        stats.upserted += cur.rowcount
+
+        if price_rows:
+            cur.execute(UPSERT_PRICE_SQL)
+            stats.prices += cur.rowcount
+            cur.execute(REFRESH_PRICE_RANGE_SQL)
+
+        if changed_images:
+            cur.execute(ENQUEUE_EMBEDDING_SQL, (changed_images,))
+            stats.embeddings_queued += cur.rowcount
+
+    conn.commit()
+
+
+def ingest_catalog(
+    engine,
+    records: Iterable[dict],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress=print,
+) -> IngestStats:
+    """
+    records를 batch_size씩 적재. batch마다 commit 하므로
+    중간에 실패해도 이전 batch까지는 반영된 상태로 남음.
+    """
+    stats = IngestStats()
+    conn = engine.raw_connection()
+    try:
+        for batch in _batches(records, batch_size):
+            _load_batch(conn, batch, stats.read, stats)
+            stats.read += len(batch)
+            if progress:
+                progress(f"[ingest] {stats.summary()}")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return stats
@@ -1,5 +1,15 @@
-from sqlalchemy.orm import Session
+import base64
+import heapq
+import json
+import re
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import bindparam, func, select, text, tuple_, union_all, update
+from sqlalchemy.orm import Session, joinedload
 from app.models.furniture import FurnitureProduct,FurniturePrice
+from app.core.metrics import record_cache
 
 CATEGORY_MAPPING = {
     "bed": ["bed_frame", "mattress"],
@@ -12,31 +22,369 @@ CATEGORY_MAPPING = {
 }
 
 
-def get_furniture(db: Session, main: str, sub: str | None = None):
+# 목록 화면(FurnitureProductSimpleResponse)에 필요한 컬럼만 조회
+SIMPLE_COLUMNS = (
+    FurnitureProduct.product_id,
+    FurnitureProduct.name,
+    FurnitureProduct.image_url,
+    FurnitureProduct.detail_url,
+    FurnitureProduct.category,
+    FurnitureProduct.lowest_price,
+    FurnitureProduct.highest_price,
+)
+
+SIMPLE_FIELDS = tuple(c.key for c in SIMPLE_COLUMNS)
+
+
+def simple_dicts(rows) -> list[dict]:
+    """_paginate 결과 Row → 목록 응답용 dict (뒤에 붙은 sort_value는 zip에서 잘림)"""
+    return [dict(zip(SIMPLE_FIELDS, row)) for row in rows]
+
+
+# 정렬 키 → (컬럼, cursor 값 복원 함수)
+SORT_COLUMNS = {
+    "score": (FurnitureProduct.score, Decimal),
+    "price": (FurnitureProduct.lowest_price, int),
+    "created_at": (FurnitureProduct.created_at, datetime.fromisoformat),
+}
+
+DEFAULT_PAGE_SIZE = 60
+MAX_PAGE_SIZE = 200
+
+# 카테고리별 전체 개수 캐시 (플래너 추정치를 TTL 동안 재사용)
+COUNT_CACHE_TTL = 300
+# 추정치가 이보다 작으면 정확한 COUNT(*) (작은 범위는 세는 비용도 작고 추정 오차가 눈에 띔)
+COUNT_EXACT_BELOW = 10_000
+
+_ESTIMATE_SQL = text(
+    "EXPLAIN (FORMAT JSON) SELECT 1 FROM furniture_product WHERE category IN :categories"
+).bindparams(bindparam("categories", expanding=True))
+_count_cache: dict[tuple, tuple[float, int]] = {}
+
+
+def _category_filter(main: str, sub: str | None):
+    # 세부 카테고리로 필터링 (예: bed_frame만 조회)
+    if sub:
+        return FurnitureProduct.category == sub
+    # main-category에 해당하는 모든 sub-category 제품 조회
+    return FurnitureProduct.category.in_(CATEGORY_MAPPING[main])
+
+
+def encode_cursor(sort_value, product_id: int) -> str:
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    elif isinstance(sort_value, Decimal):
+        sort_value = str(sort_value)
+    raw = json.dumps([sort_value, product_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    """잘못된 cursor면 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, product_id = json.loads(base64.urlsafe_b64decode(padded))
+        if sort_value is not None:
+            sort_value = SORT_COLUMNS[sort][1](sort_value)
+        return sort_value, int(product_id)
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {cursor}") from e
+
+
+def _category_list(main: str, sub: str | None) -> list[str]:
+    return [sub] if sub else CATEGORY_MAPPING[main]
+
+
+def _estimate_count(db: Session, categories: list[str]) -> int:
+    """category 통계(pg_statistic) 기반 플래너 행 수 추정 — 테이블을 읽지 않음"""
+    plan = db.execute(_ESTIMATE_SQL, {"categories": categories}).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_furniture(db: Session, main: str, sub: str | None = None) -> int:
+    """
+    카테고리별 전체 개수 추정치 (COUNT_CACHE_TTL 동안 캐시)
+    - 플래너 추정(EXPLAIN) 값, COUNT_EXACT_BELOW 미만이면 정확한 COUNT(*)
+    """
+    if main not in CATEGORY_MAPPING:
+        return 0
+
+    key = (main, sub)
+    now = time.monotonic()
+    cached = _count_cache.get(key)
+    if cached and now - cached[0] < COUNT_CACHE_TTL:
+        record_cache("furniture_count", True)
+        return cached[1]
+    record_cache("furniture_count", False)
+
+    total = _estimate_count(db, _category_list(main, sub))
+    if total < COUNT_EXACT_BELOW:
+        total = (
+            db.query(FurnitureProduct.product_id)
+              .filter(_category_filter(main, sub))
+              .count()
+        )
+    _count_cache[key] = (now, total)
+    return total
+
+
+# 설문 추천 스냅샷: style_id별 category TOP N (카탈로그 적재 때만 바뀜)
+RECOMMEND_PER_CATEGORY = 6
+RECOMMEND_CACHE_TTL = 600
+_recommend_cache: dict[int, tuple[float, dict]] = {}
+
+
+def recommendation_snapshot(db: Session, style_id: int) -> dict[str, list[dict]]:
+    """
+    style_id 가구를 category별 RECOMMEND_PER_CATEGORY개씩 (score DESC, created_at DESC)
+    RECOMMEND_CACHE_TTL 동안 캐시 → 설문 조기 결정 시 미리 채워둘 수 있음
+    """
+    return recommendation_snapshots(db, [style_id])[style_id]
+
+
+def recommendation_snapshots(db: Session, style_ids: list[int]) -> dict[int, dict[str, list[dict]]]:
+    """
+    여러 style_id의 스냅샷 → {style_id: snapshot}
+    캐시에 없는 style_id만 모아 ROW_NUMBER() 한 번으로 (style_id, category)별 TOP N 조회
+    """
+    now = time.monotonic()
+    result = {}
+    missing = []
+    for style_id in dict.fromkeys(style_ids):
+        cached = _recommend_cache.get(style_id)
+        if cached and now - cached[0] < RECOMMEND_CACHE_TTL:
+            record_cache("recommend_snapshot", True)
+            result[style_id] = cached[1]
+        else:
+            record_cache("recommend_snapshot", False)
+            missing.append(style_id)
+
+    if not missing:
+        return result
+
+    rank_no = func.row_number().over(
+        partition_by=(FurnitureProduct.style_id, FurnitureProduct.category),
+        order_by=(FurnitureProduct.score.desc(), FurnitureProduct.created_at.desc()),
+    ).label("rank_no")
+    ranked = (
+        select(
+            FurnitureProduct.style_id,
+            FurnitureProduct.product_id,
+            FurnitureProduct.name,
+            FurnitureProduct.image_url,
+            FurnitureProduct.detail_url,
+            FurnitureProduct.category,
+            FurnitureProduct.lowest_price,
+            FurnitureProduct.score,
+            rank_no,
+        )
+        .where(FurnitureProduct.style_id.in_(missing), FurnitureProduct.category.isnot(None))
+        .subquery()
+    )
+    rows = db.execute(
+        select(ranked)
+        .where(ranked.c.rank_no <= RECOMMEND_PER_CATEGORY)
+        .order_by(ranked.c.style_id, ranked.c.category, ranked.c.rank_no)
+    ).all()
+
+    snapshots = {style_id: {} for style_id in missing}
+    for p in rows:
+        snapshots[p.style_id].setdefault(p.category, []).append({
+            "product_id": p.product_id,
+            "name": p.name,
+            "image_url": p.image_url,
+            "detail_url": p.detail_url,
+            "category": p.category,
+            "lowest_price": int(p.lowest_price) if p.lowest_price else None,
+            "score": float(p.score) if p.score else None,
+        })
+
+    for style_id, snapshot in snapshots.items():
+        _recommend_cache[style_id] = (now, snapshot)
+    result.update(snapshots)
+    return result
+
+
+# 혼합 추천: 스타일별 스냅샷(이미 score 순)을 스타일 가중치로 k-way merge
+BLEND_MAX_PER_STYLE = 4
+
+
+def blend_rankings(ranked: list[tuple[float, int, list[dict]]], limit: int,
+                   max_per_style: int | None = None) -> list[dict]:
+    """
+    ranked: [(스타일 가중치, style_id, score 내림차순 상품 목록)]
+    → 가중 점수(가중치 × score) 내림차순 상위 limit개
+    - 목록마다 이미 정렬돼 있으므로 heapq.merge로 앞에서부터 필요한 만큼만 읽음
+    - 같은 product_id는 가중 점수가 가장 높은 첫 번째만
+    - max_per_style: 한 스타일에서 가져오는 최대 개수 (취향이 섞인 사용자에게 다양성 보장)
+      상한 때문에 limit개를 못 채우면 상한에 걸렸던 상품으로 가중 점수 순서대로 채움
+    """
+    def stream(order: int, weight: float, style_id: int, items: list[dict]):
+        for pos, item in enumerate(items):
+            # (정렬 키, 목록 순서, 위치)까지만 비교되도록 → dict 비교 없음
+            yield -weight * (item.get("score") or 0.0), order, pos, style_id, item
+
+    merged = heapq.merge(*(
+        stream(order, weight, style_id, items)
+        for order, (weight, style_id, items) in enumerate(ranked)
+    ))
+
+    picked = []
+    capped = []
+    seen = set()
+    per_style: dict[int, int] = {}
+    for entry in merged:
+        neg_score, _, _, style_id, item = entry
+        if item["product_id"] in seen:
+            continue
+        if max_per_style is not None and per_style.get(style_id, 0) >= max_per_style:
+            capped.append(entry)
+            continue
+        seen.add(item["product_id"])
+        per_style[style_id] = per_style.get(style_id, 0) + 1
+        picked.append({**item, "style_id": style_id, "blend_score": round(-neg_score, 4)})
+        if len(picked) >= limit:
+            return picked
+
+    # 상한에 걸려 모자란 자리 채우기 (스타일이 하나뿐이거나 다른 스타일 상품이 부족할 때)
+    if not capped:
+        return picked
+    for neg_score, _, _, style_id, item in capped:
+        if len(picked) >= limit:
+            break
+        if item["product_id"] in seen:
+            continue
+        seen.add(item["product_id"])
+        picked.append({**item, "style_id": style_id, "blend_score": round(-neg_score, 4)})
+    return sorted(picked, key=lambda p: -p["blend_score"])
+
+
+def blended_recommendations(db: Session, styles: list[tuple[int, float]],
+                            max_per_style: int | None = BLEND_MAX_PER_STYLE) -> dict[str, list[dict]]:
+    """
+    styles: [(style_id, 가중치)] (session_style_result rank 순)
+    스타일별 스냅샷(캐시) 사용, 캐시에 없는 스타일은 recommendation_snapshots 한 번으로 조회
+    """
+    by_style = recommendation_snapshots(db, [style_id for style_id, _ in styles])
+    snapshots = [(weight, style_id, by_style[style_id]) for style_id, weight in styles]
+
+    categories = []
+    for _, _, snapshot in snapshots:
+        categories += [c for c in snapshot if c not in categories]
+
+    result = {}
+    for category in categories:
+        items = blend_rankings(
+            [(weight, style_id, snapshot.get(category, [])) for weight, style_id, snapshot in snapshots],
+            RECOMMEND_PER_CATEGORY,
+            max_per_style,
+        )
+        if items:
+            result[category] = items
+    return result
+
+
+def _page_rows(db: Session, filters: list, categories: list[str] | None,
+               column, keys: tuple, descending: bool, limit: int) -> list:
+    """
+    keys 순서로 정렬된 한 구간 조회
+    - category가 여러 개면 category별 (category, 정렬 컬럼, product_id) 인덱스 range scan을
+      UNION ALL로 합친 뒤 다시 정렬 (category IN (...)은 인덱스 순서대로 읽을 수 없음)
+    """
+    def ordered(cols):
+        return [c.desc() if descending else c.asc() for c in cols]
+
+    def branch(extra: list):
+        return (
+            select(*SIMPLE_COLUMNS, column.label("sort_value"))
+            .where(*filters, *extra)
+            .order_by(*ordered(keys))
+            .limit(limit)
+        )
+
+    if not categories or len(categories) == 1:
+        extra = [FurnitureProduct.category == categories[0]] if categories else []
+        return db.execute(branch(extra)).all()
+
+    merged = union_all(*(
+        select(branch([FurnitureProduct.category == c]).subquery()) for c in categories
+    )).subquery()
+    merged_keys = [merged.c.sort_value if k is column else merged.c[k.key] for k in keys]
+    return db.execute(select(merged).order_by(*ordered(merged_keys)).limit(limit)).all()
+
+
+def _paginate(db: Session, filters: list, sort: str, order: str, limit: int, cursor: str | None,
+              categories: list[str] | None = None):
+    """
+    공통 keyset 페이지 조회 → (rows, next_cursor)
+    - rows는 ORM 객체가 아닌 SIMPLE_COLUMNS만 담은 Row 튜플
+    - next_cursor가 None이면 마지막 페이지
+    - 정렬 값이 있는 구간을 (sort 컬럼, product_id) row 비교로 먼저 읽고,
+      NULL 구간(NULLS LAST)은 모자란 만큼만 product_id 순으로 이어서 읽음
+      → 두 구간 모두 (category, sort 컬럼, product_id) 인덱스를 정/역방향으로 그대로 탐색
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"invalid sort: {sort}")
+
+    column = SORT_COLUMNS[sort][0]
+    descending = order != "asc"
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    product_id = FurnitureProduct.product_id
+
+    sort_value = after_id = None
+    if cursor:
+        sort_value, after_id = decode_cursor(cursor, sort)
+
+    # 한 개 더 읽어서 다음 페이지 존재 여부 판단
+    rows = []
+    if cursor is None or sort_value is not None:
+        keyset = [column.isnot(None)]
+        if cursor:
+            row, bound = tuple_(column, product_id), tuple_(sort_value, after_id)
+            keyset.append(row < bound if descending else row > bound)
+        rows = _page_rows(db, filters + keyset, categories, column, (column, product_id),
+                          descending, limit + 1)
+
+    if len(rows) <= limit:
+        keyset = [column.is_(None)]
+        if after_id is not None and sort_value is None:
+            keyset.append(product_id < after_id if descending else product_id > after_id)
+        rows += _page_rows(db, filters + keyset, categories, column, (product_id,),
+                           descending, limit + 1 - len(rows))
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.sort_value, last.product_id)
+
+    return rows, next_cursor
+
+
+def get_furniture(
+    db: Session,
+    main: str,
+    sub: str | None = None,
+    sort: str = "score",
+    order: str = "desc",
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+):
     """
     main = bed, sofa, table ...
     sub  = bed_frame, mattress, sofa_table ...
+
+    (rows, next_cursor) 반환
     """
 
     # 유효한 main 카테고리인지 체크
     if main not in CATEGORY_MAPPING:
-        return []
+        return [], None
 
-    # 세부 카테고리로 필터링 (예: bed_frame만 조회)
-    if sub:
-        return (
-            db.query(FurnitureProduct)
-              .filter(FurnitureProduct.category == sub)
-              .all()
-        )
+    return _paginate(db, [], sort, order, limit, cursor, _category_list(main, sub))
 
-    # main-category에 해당하는 모든 sub-category 제품 조회
-    return (
-        db.query(FurnitureProduct)
-          .filter(FurnitureProduct.category.in_(CATEGORY_MAPPING[main]))
-          .all()
-    )
-    
 def get_furniture_by_id(db: Session, product_id: int):
     return (
         db.query(FurnitureProduct)
@@ -45,20 +393,252 @@ def get_furniture_by_id(db: Session, product_id: int):
     )
     
 def get_furniture_detail(db: Session, product_id: int):
-    product = (
+    """상품 + 쇼핑몰 가격을 JOIN 한 번으로 조회"""
+    return (
         db.query(FurnitureProduct)
+          .options(joinedload(FurnitureProduct.prices))
           .filter(FurnitureProduct.product_id == product_id)
           .first()
     )
 
-    if not product:
+
+# --------------------------------------------------------
+# 가격 정규화 (텍스트 → 정수)
+# --------------------------------------------------------
+FREE_SHIPPING_WORDS = ("무료", "free")
+
+# 금액 토큰: "129,000", "1.5만" (+ 원)
+_AMOUNT = r"(\d[\d,]*(?:\.\d+)?)\s*(만)?\s*원?"
+_AMOUNT_RE = re.compile(_AMOUNT)
+# "5만원 이상 무료"의 5만원은 배송비가 아니라 무료 기준 금액
+_THRESHOLD_RE = re.compile(_AMOUNT + r"\s*(?:이상|초과)", re.IGNORECASE)
+
+
+def parse_price(raw) -> int | None:
+    """
+    "129,000원" → 129000, "1.5만원" → 15000, "무료배송" → 0, 숫자 없음 → None
+    - 첫 번째 금액만 사용: "3,000원 (제주 5,000원)" → 3000
+    - "조건부 무료 (3,000원)"처럼 금액이 있으면 무료 문구와 상관없이 그 금액
+    - "N원 이상/초과 무료"의 N은 기준 금액이므로 제외: "50,000원 이상 무료" → 0
+    """
+    if raw is None:
         return None
+    if isinstance(raw, (int, float, Decimal)):
+        return int(raw)
+
+    text = str(raw).strip()
+    match = _AMOUNT_RE.search(_THRESHOLD_RE.sub(" ", text))
+    if match:
+        amount = Decimal(match.group(1).replace(",", "") or "0")
+        if match.group(2):
+            amount *= 10000
+        return int(amount)
+    if any(word in text.lower() for word in FREE_SHIPPING_WORDS):
+        return 0
+    return None
+
 
-    prices = (
-        db.query(FurniturePrice)
-          .filter(FurniturePrice.product_id == product_id)
-          .all()
+def apply_price_values(price: FurniturePrice) -> FurniturePrice:
+    """FurniturePrice의 텍스트 가격을 정수 컬럼에 채움 (적재 시 호출)"""
+    price.mall_price_value = parse_price(price.mall_price)
+    price.ship_fee_value = parse_price(price.ship_fee)
+    return price
+
+
+def refresh_price_ranges(db: Session, product_ids):
+    """furniture_price 기준으로 여러 상품의 lowest_price / highest_price를 UPDATE … FROM 한 번에 재계산"""
+    agg = (
+        select(
+            FurniturePrice.product_id,
+            func.min(FurniturePrice.mall_price_value).label("low"),
+            func.max(FurniturePrice.mall_price_value).label("high"),
+        )
+        .where(FurniturePrice.product_id.in_(list(product_ids)))
+        .group_by(FurniturePrice.product_id)
+        .subquery()
     )
+    db.execute(
+        update(FurnitureProduct)
+        .where(FurnitureProduct.product_id == agg.c.product_id)
+        .values(lowest_price=agg.c.low, highest_price=agg.c.high)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def backfill_price_values(db: Session, batch_size: int = 1000) -> int:
+    """
+    정수 컬럼이 비어 있는 기존 가격 행을 일괄 파싱 (한 번만 실행하면 됨)
+    배치마다 가격 범위 재계산 + commit → 트랜잭션/세션이 전체 테이블만큼 커지지 않음
+    """
+    updated = 0
+    last_id = 0
+
+    while True:
+        rows = (
+            db.query(FurniturePrice)
+              .filter(
+                  FurniturePrice.price_id > last_id,
+                  FurniturePrice.mall_price_value.is_(None),
+              )
+              .order_by(FurniturePrice.price_id.asc())
+              .limit(batch_size)
+              .all()
+        )
+        if not rows:
+            break
+
+        product_ids = set()
+        for row in rows:
+            apply_price_values(row)
+            product_ids.add(row.product_id)
+        last_id = rows[-1].price_id
+        updated += len(rows)
+        db.flush()
+
+        refresh_price_ranges(db, product_ids)
+        db.commit()
+        db.expunge_all()
+
+    return updated
+
+
+def _total_price():
+    return FurniturePrice.mall_price_value + func.coalesce(FurniturePrice.ship_fee_value, 0)
+
+
+def get_price_comparison(db: Session, product_id: int):
+    """쇼핑몰별 가격 비교 — 배송비 포함 총액 오름차순"""
+    total = _total_price()
+    return (
+        db.query(
+            FurniturePrice.mall_name,
+            FurniturePrice.mall_price,
+            FurniturePrice.ship_fee,
+            FurniturePrice.mall_url,
+            FurniturePrice.mall_price_value,
+            FurniturePrice.ship_fee_value,
+            total.label("total_price"),
+        )
+        .filter(
+            FurniturePrice.product_id == product_id,
+            FurniturePrice.mall_price_value.isnot(None),
+        )
+        .order_by(total.asc())
+        .all()
+    )
+
+
+def get_cheapest_offer(db: Session, product_id: int):
+    """배송비 포함 최저 총액 쇼핑몰 (없으면 None)"""
+    offers = get_price_comparison(db, product_id)
+    return offers[0] if offers else None
+
+
+# --------------------------------------------------------
+# 패싯 검색 (치수/가격 범위 + 재질/색상/스타일 집합 필터)
+# --------------------------------------------------------
+RANGE_COLUMNS = {
+    "width": FurnitureProduct.width,
+    "depth": FurnitureProduct.depth,
+    "height": FurnitureProduct.height,
+    "price": FurnitureProduct.lowest_price,
+}
+
+FACET_COLUMNS = {
+    "category": FurnitureProduct.category,
+    "material": FurnitureProduct.material,
+    "color": FurnitureProduct.color,
+    "style_id": FurnitureProduct.style_id,
+    "bed_size_code": FurnitureProduct.bed_size_code,
+}
+
+FACET_LIMIT = 20
+
+# 패싯 개수는 cursor와 무관 → 필터 조합별로 TTL 동안 재사용 (다음 페이지에서는 다시 집계하지 않음)
+FACET_CACHE_TTL = 300
+FACET_CACHE_MAX = 1024   # 필터 조합은 임의로 만들 수 있으므로 개수 상한
+_facet_cache: dict[str, tuple[float, dict]] = {}
+
+
+def _facets(db: Session, base_filters: list, set_filters: dict) -> dict:
+    facets = {}
+    for key, column in FACET_COLUMNS.items():
+        other_filters = [f for k, f in set_filters.items() if k != key]
+        counts = (
+            db.query(column, func.count())
+              .filter(*base_filters, *other_filters, column.isnot(None))
+              .group_by(column)
+              .order_by(func.count().desc())
+              .limit(FACET_LIMIT)
+              .all()
+        )
+        facets[key] = [{"value": value, "count": count} for value, count in counts]
+    return facets
+
+
+def search_furniture(
+    db: Session,
+    main: str | None = None,
+    sub: str | None = None,
+    ranges: dict | None = None,
+    sets: dict | None = None,
+    sort: str = "score",
+    order: str = "desc",
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+):
+    """
+    ranges = {"width": (min, max), "price": (None, 300000), ...}
+    sets   = {"material": ["원목"], "style_id": [2, 3], ...}
+
+    (rows, next_cursor, facets) 반환
+    - facets[key]는 해당 key 자신의 필터만 뺀 조건에서의 값별 개수
+      (선택한 재질 외의 다른 재질 개수도 함께 보여주기 위함)
+    - facets는 필터 조합별로 FACET_CACHE_TTL 동안 캐시 (첫 페이지에서 집계, 다음 페이지는 재사용)
+    """
+    base_filters = []
+    categories = None
+
+    if main:
+        if main not in CATEGORY_MAPPING:
+            return [], None, {}
+        categories = _category_list(main, sub)
+    elif sub:
+        categories = [sub]
+
+    for key, (low, high) in (ranges or {}).items():
+        column = RANGE_COLUMNS[key]
+        if low is not None:
+            base_filters.append(column >= low)
+        if high is not None:
+            base_filters.append(column <= high)
+
+    set_filters = {
+        key: FACET_COLUMNS[key].in_(values)
+        for key, values in (sets or {}).items()
+        if values
+    }
+
+    rows, next_cursor = _paginate(
+        db, base_filters + list(set_filters.values()), sort, order, limit, cursor, categories
+    )
+    if categories:
+        base_filters.append(FurnitureProduct.category.in_(categories))
+
+    cache_key = json.dumps([
+        categories,
+        sorted((ranges or {}).items()),
+        sorted((key, sorted(map(str, values))) for key, values in (sets or {}).items() if values),
+    ], default=str)
+    now = time.monotonic()
+    cached = _facet_cache.get(cache_key)
+    if cached and now - cached[0] < FACET_CACHE_TTL:
+        record_cache("furniture_facets", True)
+        return rows, next_cursor, cached[1]
+    record_cache("furniture_facets", False)
 
-    product.prices = prices
-    return product
\ No newline at end of file
+    facets = _facets(db, base_filters, set_filters)
+    if len(_facet_cache) >= FACET_CACHE_MAX:
+        _facet_cache.clear()
+    _facet_cache[cache_key] = (now, facets)
+    return rows, next_cursor, facets
@@ -0,0 +1,134 @@
+# app/services/idempotency.py
+
+"""
+재시도에 안전한(멱등) 엔드포인트용 응답 저장소.
+
+- key별로 완료된 응답을 idempotency_record 테이블에 저장 → 같은 key 재요청은 그대로 반환
+- 같은 프로세스에서 같은 key가 동시에 들어오면 첫 요청의 계산을 함께 기다림 (single-flight)
+- 같은 key가 다른 요청 본문으로 오면 422 (클라이언트 key 재사용 실수, 진행 중인 요청과 비교해도 같음)
+- 기록 조회 후 트랜잭션을 바로 끝냄 → compute()(AI 호출 등) 동안 풀 커넥션을 잡고 있지 않음
+- 먼저 온 요청이 취소되면 기다리던 중복 요청 중 하나가 이어서 계산
+- IDEMPOTENCY_TTL이 지난 기록은 무시하고 다시 계산한 결과로 덮어씀
+- 계산이 예외로 끝나면 저장하지 않음 → 재시도 시 다시 계산
+
+    result = await run_once(db, "layout.start", key, fingerprint(data), compute)
+"""
+
+import asyncio
+import hashlib
+import json
+from datetime import timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import record_cache
+from app.core.tracing import span
+from app.models.idempotency import IdempotencyRecord
+
+IDEMPOTENCY_TTL = timedelta(hours=24)
+MAX_KEY_LENGTH = 255
+
+# idem_key → (request_hash, 첫 요청의 결과 future)
+_inflight: dict[str, tuple[str, asyncio.Future]] = {}
+_OWNER_CANCELLED = object()
+
+KEY_REUSED = "Idempotency-Key가 다른 요청에 이미 사용되었습니다."
+
+
+def fingerprint(*parts) -> str:
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def validate_key(key: str) -> str:
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(400, f"Idempotency-Key는 1~{MAX_KEY_LENGTH}자여야 합니다.")
+    return key
+
+
+async def _load(db: AsyncSession, idem_key: str):
+    """(request_hash, response_json) 또는 None. 조회 트랜잭션은 여기서 끝냄"""
+    row = (
+        await db.execute(
+            select(IdempotencyRecord.request_hash, IdempotencyRecord.response_json).where(
+                IdempotencyRecord.idem_key == idem_key,
+                IdempotencyRecord.created_at >= func.now() - IDEMPOTENCY_TTL,
+            )
+        )
+    ).first()
+    # autobegin된 읽기 트랜잭션 종료 → 커넥션을 풀에 반환 (idle in transaction 방지)
+    await db.rollback()
+    return row
+
+
+async def _store(db: AsyncSession, scope: str, idem_key: str, request_hash: str, response: dict):
+    stmt = insert(IdempotencyRecord).values(
+        idem_key=idem_key,
+        scope=scope,
+        request_hash=request_hash,
+        response_json=response,
+    )
+    # 만료된 기록 덮어쓰기 / 다른 워커가 먼저 저장한 경우 그대로 둠
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyRecord.idem_key],
+        set_={
+            "request_hash": stmt.excluded.request_hash,
+            "response_json": stmt.excluded.response_json,
+            "created_at": func.now(),
+        },
+        where=IdempotencyRecord.created_at < func.now() - IDEMPOTENCY_TTL,
+    )
+    await db.execute(stmt)
+    await db.commit()
+
+
+async def run_once(db: AsyncSession, scope: str, key: str, request_hash: str, compute) -> dict:
+    """
+    compute(): JSON으로 저장 가능한 dict를 돌려주는 코루틴 함수
+    반환값은 처음 계산한 응답 (재요청이면 저장된 응답)
+    """
+    idem_key = f"{scope}:{key}"
+
+    while (inflight := _inflight.get(idem_key)) is not None:
+        inflight_hash, inflight_future = inflight
+        if inflight_hash != request_hash:
+            raise HTTPException(422, KEY_REUSED)
+        record_cache("idempotency", True)
+        with span("idempotency.wait", scope=scope):
+            result = await asyncio.shield(inflight_future)
+        if result is not _OWNER_CANCELLED:
+            return result
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[idem_key] = (request_hash, future)
+    try:
+        with span("idempotency.load", scope=scope):
+            stored = await _load(db, idem_key)
+        if stored is not None:
+            if stored.request_hash != request_hash:
+                raise HTTPException(422, KEY_REUSED)
+            record_cache("idempotency", True)
+            result = stored.response_json
+        else:
+            record_cache("idempotency", False)
+            result = await compute()
+            with span("idempotency.store", scope=scope):
+                await _store(db, scope, idem_key, request_hash, result)
+    except asyncio.CancelledError:
+        # 첫 요청만의 취소(클라이언트 연결 끊김 등) → 대기자 중 하나가 이어서 계산
+        future.set_result(_OWNER_CANCELLED)
+        raise
+    except BaseException as e:
+        future.set_exception(e)
+        # 기다리는 쪽이 없으면 "Future exception was never retrieved" 경고 방지
+        future.exception()
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        _inflight.pop(idem_key, None)
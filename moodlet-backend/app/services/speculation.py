@@ -0,0 +1,159 @@
+# app/services/speculation.py
+
+"""
+설문 중 조기 결정(survey_logic.decided_final_style) 시점에 미리 돌려두는 작업.
+
+- 키별로 asyncio.Task 1개만 유지 (같은 키로 다시 요청하면 기존 작업 재사용)
+- 실제 요청(final-analysis / followup)에서 claim(key)로 가져감 → 1회용
+  캐시만 채우는 작업(recommend)은 sync 라우트에서 claim_done(key)로 가져감
+- 끝났든 아니든 SPECULATION_TTL이 지나면 폐기 (진행 중이면 취소)
+- 실패한 작업은 claim에서 None → 호출부가 원래 경로로 다시 수행
+
+키
+    ("image", session_id, prompt)        세션별 이미지 (prompt가 달라지면 자연히 miss, SURVEY_SPECULATE_IMAGE일 때만)
+    ("followup", session_id, answers)    follow-up 질문 (응답 전체가 같아야 재사용)
+    ("recommend", style_id)              추천 스냅샷 (furniture_service 캐시를 채워둠)
+                                         최종 + STYLE_COMPAT 스타일 → 혼합 추천(blend)도 캐시에서
+"""
+
+import asyncio
+import contextvars
+import json
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import record_speculation
+from app.database import SessionLocal
+from app.models.style_types import STYLE_COMPAT
+from app.services.ai_client import build_image_prompt, generate_followup_questions, generate_image
+from app.services.furniture_service import recommendation_snapshot
+from app.services.style_mapping import STYLE_MAP
+from app.services.survey_logic import CHOICE_QUESTIONS
+
+SPECULATION_TTL = 600
+SPECULATION_MAX = 512
+
+_tasks: dict[tuple, tuple[float, asyncio.Task]] = {}
+
+
+def answers_key(choice_answers: dict) -> str:
+    return json.dumps(choice_answers, sort_keys=True, ensure_ascii=False)
+
+
+def _evict_expired(now: float):
+    for key, (started, task) in list(_tasks.items()):
+        if now - started >= SPECULATION_TTL:
+            del _tasks[key]
+            if not task.done():
+                task.cancel()
+            record_speculation(key[0], "expired")
+
+
+def _log_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[WARN] speculation 실패: {task.exception()}")
+
+
+def start(key: tuple, factory) -> bool:
+    """factory() 코루틴을 백그라운드로 시작. 이미 있거나 자리가 없으면 False"""
+    now = time.monotonic()
+    _evict_expired(now)
+    if key in _tasks or len(_tasks) >= SPECULATION_MAX:
+        return False
+
+    # 요청 trace에 붙지 않도록 빈 context로 시작 (요청이 끝난 뒤에도 계속 돌기 때문)
+    task = asyncio.create_task(factory(), context=contextvars.Context())
+    task.add_done_callback(_log_failure)
+    _tasks[key] = (now, task)
+    record_speculation(key[0], "started")
+    return True
+
+
+def pending(key: tuple) -> bool:
+    """claim할 수 있는 작업이 있는지 (만료 / 실패한 작업은 제외, 가져가지는 않음)"""
+    entry = _tasks.get(key)
+    if entry is None or time.monotonic() - entry[0] >= SPECULATION_TTL:
+        return False
+    task = entry[1]
+    return not task.done() or (not task.cancelled() and task.exception() is None)
+
+
+async def claim(key: tuple):
+    """미리 돌려둔 결과 (진행 중이면 끝날 때까지 대기). 없거나 실패했으면 None"""
+    entry = _tasks.pop(key, None)
+    if entry is None or time.monotonic() - entry[0] >= SPECULATION_TTL:
+        record_speculation(key[0], "miss")
+        return None
+
+    try:
+        result = await entry[1]
+    except Exception:
+        record_speculation(key[0], "failed")
+        return None
+    record_speculation(key[0], "hit")
+    return result
+
+
+def claim_done(key: tuple) -> bool:
+    """
+    결과 대신 캐시를 채워두는 작업용 claim (스레드풀의 sync 라우트에서 호출, 기다리지 않음)
+    - 끝난 작업이면 hit → 호출부는 캐시를 그대로 읽음
+    - 아직 진행 중이면 running (작업은 계속 돌며 캐시를 채움, 호출부는 직접 조회)
+    """
+    entry = _tasks.get(key)
+    if entry is None or time.monotonic() - entry[0] >= SPECULATION_TTL:
+        record_speculation(key[0], "miss")   # 만료된 작업 정리는 _evict_expired가 담당 (이벤트 루프)
+        return False
+    _tasks.pop(key, None)
+
+    task = entry[1]
+    if not task.done():
+        record_speculation(key[0], "running")
+        return False
+    if task.cancelled() or task.exception() is not None:
+        record_speculation(key[0], "failed")
+        return False
+    record_speculation(key[0], "hit")
+    return True
+
+
+def _warm_recommendation(style_id: int):
+    with SessionLocal() as db:
+        recommendation_snapshot(db, style_id)
+
+
+def speculate_for_survey(session_id: int | None, final_style: str, choice_answers: dict) -> list[str]:
+    """
+    최종 스타일이 확정된 설문에 대해 뒤 단계 작업 시작 → 시작한(또는 이미 진행 중인) 작업 종류 반환
+    - 추천 스냅샷: 스타일만 알면 됨 (혼합 추천용으로 궁합 좋은 스타일까지)
+    - 이미지: 유료 호출이므로 SURVEY_SPECULATE_IMAGE + 세션이 있을 때만 (final-analysis 기본 prompt 기준)
+    - follow-up: 질문 생성에 응답 전체가 들어가므로 Q1~Q7을 모두 답한 뒤에만
+    """
+    kinds = []
+
+    style_ids = [STYLE_MAP.get(code) for code in [final_style, *STYLE_COMPAT.get(final_style, [])]]
+    for i, style_id in enumerate(style_ids):
+        if not style_id:
+            continue
+        key = ("recommend", style_id)
+        started = start(key, lambda sid=style_id: run_in_threadpool(_warm_recommendation, sid))
+        if i == 0 and (started or key in _tasks):
+            kinds.append("recommend")
+
+    if session_id is None:
+        return kinds
+
+    if settings.SURVEY_SPECULATE_IMAGE:
+        prompt = build_image_prompt(final_style)
+        key = ("image", session_id, prompt)
+        if start(key, lambda: generate_image(prompt)) or key in _tasks:
+            kinds.append("image")
+
+    if all(q in choice_answers for q in CHOICE_QUESTIONS):
+        key = ("followup", session_id, answers_key(choice_answers))
+        if start(key, lambda: generate_followup_questions(choice_answers)) or key in _tasks:
+            kinds.append("followup")
+
+    return kinds
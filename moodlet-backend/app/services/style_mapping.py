@@ -27,6 +27,7 @@ STYLE_MAP = {
     # 4. 빈티지 & 앤티크
     "VINTAGE": 4,
     "ANTIQUE": 4,
+    "VINTAGE_ANTIQUE": 4,
     "CLASSIC_VINTAGE": 4,
 
     # 5. 파스텔
@@ -46,6 +47,7 @@ STYLE_MAP = {
 
     # 8. 플랜테리어
     "PLANT": 8,
+    "PLANTERIOR": 8,
     "BOTANIC": 8,
     "GREEN_INTERIOR": 8,
 }
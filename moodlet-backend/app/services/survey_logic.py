@@ -1,7 +1,11 @@
 # app/services/survey_logic.py
 
-from typing import Dict, Literal
+from functools import lru_cache
+from itertools import product
+from typing import Dict, List, Literal, Optional, Tuple
 from app.models.style_types import (
+    STYLE_COMPAT,
+    STYLE_OPPOSITE,
     STYLE_MINIMAL_MODERN,
     STYLE_SCANDINAVIAN,
     STYLE_NATURAL_WOOD,
@@ -30,8 +34,8 @@ GROUP_MAP = {
 }
 
 
-def pick_group(choice_answers: Dict[str, ChoiceOption]) -> str:
-    """7개 문항으로 A/B/C 중 하나 선택"""
+def group_scores(choice_answers: Dict[str, ChoiceOption]) -> Dict[str, int]:
+    """7개 문항의 A/B/C 득표 수"""
     scores = {"A": 0, "B": 0, "C": 0}
 
     for qid, opt in choice_answers.items():
@@ -39,6 +43,12 @@ def pick_group(choice_answers: Dict[str, ChoiceOption]) -> str:
             group = GROUP_MAP[qid][opt]
             scores[group] += 1
 
+    return scores
+
+
+def pick_group(choice_answers: Dict[str, ChoiceOption]) -> str:
+    """7개 문항으로 A/B/C 중 하나 선택"""
+    scores = group_scores(choice_answers)
     return max(scores, key=lambda g: scores[g])
 
 
@@ -49,7 +59,7 @@ def pick_group(choice_answers: Dict[str, ChoiceOption]) -> str:
 # -------------------------------
 # A 그룹 → 미니멀·모던·인더스트리얼
 # -------------------------------
-def pick_style_in_group_a(choice_answers: Dict[str, ChoiceOption]) -> str:
+def scores_in_group_a(choice_answers: Dict[str, ChoiceOption]) -> Dict[str, int]:
     scores = {
         STYLE_MINIMAL_MODERN: 0,
         STYLE_INDUSTRIAL: 0,
@@ -91,13 +101,18 @@ def pick_style_in_group_a(choice_answers: Dict[str, ChoiceOption]) -> str:
     if q7 == "C":
         scores[STYLE_INDUSTRIAL] += 2
 
+    return scores
+
+
+def pick_style_in_group_a(choice_answers: Dict[str, ChoiceOption]) -> str:
+    scores = scores_in_group_a(choice_answers)
     return max(scores, key=lambda k: scores[k])
 
 
 # -------------------------------
 # B 그룹 → 북유럽·내추럴·플랜테리어
 # -------------------------------
-def pick_style_in_group_b(choice_answers: Dict[str, ChoiceOption]) -> str:
+def scores_in_group_b(choice_answers: Dict[str, ChoiceOption]) -> Dict[str, int]:
     scores = {
         STYLE_SCANDINAVIAN: 0,
         STYLE_NATURAL_WOOD: 0,
@@ -145,13 +160,18 @@ def pick_style_in_group_b(choice_answers: Dict[str, ChoiceOption]) -> str:
     if q7 == "C":
         scores[STYLE_PLANTERIOR] += 2
 
+    return scores
+
+
+def pick_style_in_group_b(choice_answers: Dict[str, ChoiceOption]) -> str:
+    scores = scores_in_group_b(choice_answers)
     return max(scores, key=lambda k: scores[k])
 
 
 # -------------------------------
 # C 그룹 → 빈티지·미드센츄리·파스텔
 # -------------------------------
-def pick_style_in_group_c(choice_answers: Dict[str, ChoiceOption]) -> str:
+def scores_in_group_c(choice_answers: Dict[str, ChoiceOption]) -> Dict[str, int]:
     scores = {
         STYLE_VINTAGE_ANTIQUE: 0,
         STYLE_MIDCENTURY: 0,
@@ -191,6 +211,11 @@ def pick_style_in_group_c(choice_answers: Dict[str, ChoiceOption]) -> str:
         scores[STYLE_PASTEL] += 1
         scores[STYLE_VINTAGE_ANTIQUE] += 1
 
+    return scores
+
+
+def pick_style_in_group_c(choice_answers: Dict[str, ChoiceOption]) -> str:
+    scores = scores_in_group_c(choice_answers)
     return max(scores, key=lambda k: scores[k])
 
 
@@ -205,3 +230,108 @@ def pick_final_style(choice_answers: Dict[str, ChoiceOption]) -> str:
     if group == "B":
         return pick_style_in_group_b(choice_answers)
     return pick_style_in_group_c(choice_answers)
+
+
+# =======================================================
+# 🔥 4) 전체 스타일 점수 벡터 + 로컬 Best/Worst (AI 호출 없음)
+# =======================================================
+STYLE_GROUP = {
+    STYLE_MINIMAL_MODERN: "A",
+    STYLE_INDUSTRIAL: "A",
+    STYLE_SCANDINAVIAN: "B",
+    STYLE_NATURAL_WOOD: "B",
+    STYLE_PLANTERIOR: "B",
+    STYLE_VINTAGE_ANTIQUE: "C",
+    STYLE_MIDCENTURY: "C",
+    STYLE_PASTEL: "C",
+}
+
+# 그룹 득표 1표 > 그룹 내부 점수 전체 (pick_final_style과 같은 우선순위)
+GROUP_WEIGHT = 10
+# pick_group 동점 처리 순서 (max는 먼저 나온 그룹)
+GROUP_ORDER = ("A", "B", "C")
+
+MAX_BEST_STYLES = 3
+
+
+def style_scores(choice_answers: Dict[str, ChoiceOption]) -> Dict[str, int]:
+    """
+    8개 스타일 전체 점수 = 그룹 순위 × GROUP_WEIGHT + 그룹 내부 점수
+    - 그룹 순위 = 득표 × 3 + 동점 우선순위 (GROUP_ORDER 앞쪽이 높음)
+    - dict 순서 = pick_style_in_group_* 의 동점 처리 순서
+    → max(scores, key=scores.get)가 항상 pick_final_style과 같음
+    """
+    groups = group_scores(choice_answers)
+    inner = {
+        **scores_in_group_a(choice_answers),
+        **scores_in_group_b(choice_answers),
+        **scores_in_group_c(choice_answers),
+    }
+    n = len(GROUP_ORDER)
+    rank = {g: groups[g] * n + (n - 1 - i) for i, g in enumerate(GROUP_ORDER)}
+    return {s: rank[STYLE_GROUP[s]] * GROUP_WEIGHT + inner[s] for s in inner}
+
+
+def pick_best_worst(
+    final_style: str,
+    choice_answers: Dict[str, ChoiceOption],
+) -> Tuple[List[str], Optional[str]]:
+    """
+    STYLE_COMPAT / STYLE_OPPOSITE 테이블 + 사용자 점수 벡터로 Best/Worst 결정
+    - best : 궁합 스타일을 사용자 점수 순으로 정렬,
+             궁합 목록 밖에서 그보다 점수가 높은 스타일이 있으면 3번째로 추가
+    - worst: 반대 스타일
+    """
+    scores = style_scores(choice_answers)
+    worst = STYLE_OPPOSITE.get(final_style)
+
+    best = sorted(STYLE_COMPAT.get(final_style, []), key=lambda s: -scores[s])
+    others = [
+        s for s in sorted(scores, key=lambda s: -scores[s])
+        if s not in best and s not in (final_style, worst)
+    ]
+    if best and others and len(best) < MAX_BEST_STYLES and scores[others[0]] >= scores[best[-1]]:
+        best.append(others[0])
+
+    return best, worst
+
+
+# =======================================================
+# 🔥 5) 부분 응답으로 최종 스타일 확정 여부 판단 (조기 결정)
+# =======================================================
+CHOICE_QUESTIONS = tuple(GROUP_MAP)
+CHOICE_OPTIONS = ("A", "B", "C")
+
+
+def _answered_key(choice_answers: Dict[str, ChoiceOption]) -> Tuple[Tuple[str, str], ...]:
+    """Q1~Q7 중 유효하게 답한 문항만 정렬된 튜플로 (캐시 키). 빈 값/알 수 없는 값은 미응답 취급"""
+    return tuple(sorted(
+        (qid, opt) for qid, opt in choice_answers.items()
+        if qid in GROUP_MAP and opt in CHOICE_OPTIONS
+    ))
+
+
+@lru_cache(maxsize=4096)
+def _candidates(answered: Tuple[Tuple[str, str], ...]) -> Tuple[Tuple[str, int], ...]:
+    fixed = dict(answered)
+    remaining = [q for q in CHOICE_QUESTIONS if q not in fixed]
+
+    counts: Dict[str, int] = {}
+    for combo in product(CHOICE_OPTIONS, repeat=len(remaining)):
+        style = pick_final_style({**fixed, **dict(zip(remaining, combo))})
+        counts[style] = counts.get(style, 0) + 1
+    return tuple(sorted(counts.items(), key=lambda kv: -kv[1]))
+
+
+def final_style_candidates(choice_answers: Dict[str, ChoiceOption]) -> Dict[str, int]:
+    """
+    남은 문항 k개의 3^k가지 완성 조합을 전부 돌려 최종 스타일별 조합 수 반환 (많은 순)
+    - 최대 3^7 = 2187회 pick_final_style, 같은 부분 응답은 lru_cache로 재사용
+    """
+    return dict(_candidates(_answered_key(choice_answers)))
+
+
+def decided_final_style(choice_answers: Dict[str, ChoiceOption]) -> Optional[str]:
+    """남은 답이 무엇이든 최종 스타일이 같으면 그 스타일, 아니면 None"""
+    candidates = _candidates(_answered_key(choice_answers))
+    return candidates[0][0] if len(candidates) == 1 else None
@@ -0,0 +1,259 @@
+# bench/fake_openai.py
+
+"""
+OpenAI 호환 로컬 fake 서버 (벤치마크 / 오프라인 개발용).
+
+지원 엔드포인트
+- POST /v1/chat/completions   (follow-up 질문 / 스타일 분석 / 가구 배치, stream=true 지원)
+- POST /v1/responses          (평면도 vision 분석)
+- POST /v1/images/generations (1x1 PNG)
+
+실행
+    python -m bench.fake_openai --port 8100 --latency-ms 800 --jitter-ms 300 --error-rate 0.02
+
+앱 쪽 .env
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1
+    OPENAI_API_KEY=fake
+
+--canned 로 JSON 파일을 주면 기본 응답 대신 사용
+    {"followup": {...}, "style": {...}, "layout": {...}, "floorplan": {...}}
+각 값은 모델이 돌려줄 JSON 본문 그대로.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+PNG_1PX_B64 = (
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+
+DEFAULT_CANNED = {
+    "followup": {
+        "questions": [
+            {"id": "T1", "text": "집에서 가장 오래 머무는 공간은 어디이고, 그곳에서 주로 무엇을 하나요?"},
+            {"id": "T2", "text": "좋아하는 조명 분위기를 자유롭게 설명해 주세요."},
+            {"id": "T3", "text": "꼭 들여놓고 싶은 가구나 소품이 있다면 무엇인가요?"},
+        ]
+    },
+    "style": {
+        "bestMatchStyles": ["SCANDINAVIAN", "NATURAL_WOOD"],
+        "worstStyle": "VINTAGE_ANTIQUE",
+        "prompt": "bright minimal living room, ultra high quality interior render",
+    },
+    "floorplan": {
+        "walls": [
+            {"x1": 0, "y1": 0, "x2": 600, "y2": 0},
+            {"x1": 600, "y1": 0, "x2": 600, "y2": 400},
+            {"x1": 600, "y1": 400, "x2": 0, "y2": 400},
+            {"x1": 0, "y1": 400, "x2": 0, "y2": 0},
+            {"x1": 300, "y1": 0, "x2": 300, "y2": 250},
+        ],
+        "doors": [{"x": 300, "y": 320, "width_cm": 80}],
+        "windows": [{"x": 150, "y": 0, "width_cm": 120}, {"x": 450, "y": 0, "width_cm": 120}],
+        "rooms": [
+            {"type": "bedroom", "polygon": [[0, 0], [300, 0], [300, 400], [0, 400]]},
+            {"type": "living", "polygon": [[300, 0], [600, 0], [600, 400], [300, 400]]},
+        ],
+        "built_in": [],
+    },
+}
+
+# 가구 id: JSON 목록("id": 12) / 표 형식 목록(줄 맨 앞 "12|...") 둘 다
+_FURNITURE_ID_RE = re.compile(r'"id":\s*(\d+)|^\s*(\d+)\|', re.MULTILINE)
+
+
+class FakeConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    canned: dict = DEFAULT_CANNED
+
+
+config = FakeConfig()
+app = FastAPI(title="fake-openai")
+
+
+def _usage(prompt_text: str, completion_text: str) -> dict:
+    # 대략 4글자 = 1토큰
+    prompt_tokens = max(len(prompt_text) // 4, 1)
+    completion_tokens = max(len(completion_text) // 4, 1)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _layout_items(prompt_text: str) -> dict:
+    """프롬프트의 가구 목록에서 id를 뽑아 격자 배치 생성"""
+    ids = [int(a or b) for a, b in _FURNITURE_ID_RE.findall(prompt_text)]
+    return {
+        "items": [
+            {
+                "furniture_id": fid,
+                "position": {"x": 40 + (idx % 4) * 130, "y": 40 + (idx // 4) * 110},
+                "size": {"w": 100, "h": 60},
+                "rotation": 0,
+                "confidence": 0.9,
+                "z_index": idx + 1,
+            }
+            for idx, fid in enumerate(dict.fromkeys(ids))
+        ]
+    }
+
+
+def _chat_body(messages: list) -> dict:
+    text = json.dumps(messages, ensure_ascii=False)
+    if "follow-up" in text:
+        return config.canned.get("followup", DEFAULT_CANNED["followup"])
+    if "배치" in text:
+        contents = "\n".join(str(m.get("content", "")) for m in messages)
+        return config.canned.get("layout") or _layout_items(contents)
+    return config.canned.get("style", DEFAULT_CANNED["style"])
+
+
+def _delay_sec() -> float:
+    return max(config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms), 0) / 1000
+
+
+async def _simulate(delay: bool = True) -> JSONResponse | None:
+    """지연 + 확률적 오류 (429 / 500 반반)"""
+    if delay:
+        await asyncio.sleep(_delay_sec())
+
+    if config.error_rate and random.random() < config.error_rate:
+        status = random.choice((429, 500))
+        return JSONResponse(
+            {"error": {"message": "fake injected error", "type": "server_error", "code": None}},
+            status_code=status,
+        )
+    return None
+
+
+STREAM_CHUNK_CHARS = 12
+
+
+def _stream_chat(body: dict, content: str) -> StreamingResponse:
+    """지연 전체를 조각 수로 나눠 토큰 스트림처럼 흘려보냄 (마지막 chunk에 usage)"""
+    cid = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+    usage = _usage(json.dumps(body.get("messages", []), ensure_ascii=False), content)
+
+    def chunk(choices: list, usage=None) -> str:
+        data = {
+            "id": cid, "object": "chat.completion.chunk", "created": created,
+            "model": body.get("model"), "choices": choices, "usage": usage,
+        }
+        return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    async def events():
+        step = _delay_sec() / max(len(pieces), 1)
+        for idx, piece in enumerate(pieces):
+            await asyncio.sleep(step)
+            delta = {"role": "assistant", "content": piece} if idx == 0 else {"content": piece}
+            yield chunk([{"index": 0, "delta": delta, "finish_reason": None}])
+        yield chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        yield chunk([], usage)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stream = bool(body.get("stream"))
+    if (err := await _simulate(delay=not stream)) is not None:
+        return err
+
+    if stream:
+        return _stream_chat(body, json.dumps(_chat_body(body.get("messages", [])), ensure_ascii=False))
+
+    content = json.dumps(_chat_body(body.get("messages", [])), ensure_ascii=False)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": _usage(json.dumps(body.get("messages", []), ensure_ascii=False), content),
+    }
+
+
+@app.post("/v1/responses")
+async def responses(request: Request):
+    body = await request.json()
+    if (err := await _simulate()) is not None:
+        return err
+
+    text = json.dumps(config.canned.get("floorplan", DEFAULT_CANNED["floorplan"]), ensure_ascii=False)
+    usage = _usage(json.dumps(body.get("input", []), ensure_ascii=False)[:4000], text)
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": body.get("model"),
+        "status": "completed",
+        "output": [
+            {
+                "id": f"msg_{uuid.uuid4().hex}",
+                "type": "message",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        ],
+        "usage": {
+            "input_tokens": usage["prompt_tokens"],
+            "output_tokens": usage["completion_tokens"],
+            "total_tokens": usage["total_tokens"],
+        },
+    }
+
+
+@app.post("/v1/images/generations")
+async def images_generations(request: Request):
+    await request.json()
+    if (err := await _simulate()) is not None:
+        return err
+    return {"created": int(time.time()), "data": [{"b64_json": PNG_1PX_B64}]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI 호환 로컬 fake 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="응답 평균 지연")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="지연 ± 범위 (균등분포)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="429/500 응답 비율 (0~1)")
+    parser.add_argument("--canned", help="엔드포인트별 응답 JSON 파일")
+    args = parser.parse_args()
+
+    config.latency_ms = args.latency_ms
+    config.jitter_ms = args.jitter_ms
+    config.error_rate = args.error_rate
+    if args.canned:
+        with open(args.canned, encoding="utf-8") as f:
+            config.canned = {**DEFAULT_CANNED, **json.load(f)}
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+# bench/micro.py
+
+"""
+CPU 위주 hot path 마이크로 벤치마크.
+
+- 고정 fixture(시드 고정)로 매번 같은 입력 사용
+- 케이스별로 loop 수를 자동 보정 → repeat 회 측정 → 1회 호출당 min / median 기록
+- 실행 결과는 bench/results/micro_history.jsonl 에 누적 (git 커밋 해시 포함)
+- 기준 실행(직전 실행 또는 --baseline 커밋) 대비 median이 threshold 이상 느려지면 exit 1
+
+실행 (moodlet-backend 디렉터리에서)
+    python -m bench.micro                      # 전체 실행 + 직전 결과와 비교
+    python -m bench.micro -k survey -k json    # 이름에 포함된 케이스만
+    python -m bench.micro --baseline 1a2b3c4 --threshold 0.10
+    python -m bench.micro --no-save            # 기록 없이 측정만
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+HISTORY_PATH = "bench/results/micro_history.jsonl"
+
+DEFAULT_THRESHOLD = 0.15     # median 15% 이상 느려지면 회귀
+MIN_REPEAT_SEC = 0.2         # repeat 1회 최소 측정 시간
+DEFAULT_REPEAT = 5
+
+CASES: dict = {}
+
+
+def case(name: str):
+    """
+    setup 함수 등록. setup은 fixture를 만들고 측정 대상 (인자 없는) 함수를 반환
+        @case("survey.pick_final_style")
+        def _():
+            ...
+            return lambda: ...
+    """
+    def deco(setup):
+        CASES[name] = setup
+        return setup
+    return deco
+
+
+# --------------------------------------------------------
+# fixture
+# --------------------------------------------------------
+def _rng() -> random.Random:
+    return random.Random(42)
+
+
+def _all_choice_answers() -> list:
+    """Q1~Q7 × A/B/C 전체 조합 (3^7 = 2187)"""
+    qs = [f"Q{i}" for i in range(1, 8)]
+    return [dict(zip(qs, combo)) for combo in itertools.product("ABC", repeat=7)]
+
+
+def _fp_objects(rng: random.Random, walls: int = 40) -> list:
+    objs = []
+    for _ in range(walls):
+        x, y = rng.uniform(0, 800), rng.uniform(0, 600)
+        objs.append(SimpleNamespace(type="wall", position_json={
+            "x1": x, "y1": y, "x2": x + rng.uniform(-200, 200), "y2": y + rng.uniform(-200, 200),
+        }))
+    for kind in ("door", "window"):
+        for _ in range(6):
+            objs.append(SimpleNamespace(type=kind, position_json={
+                "x": rng.uniform(0, 800), "y": rng.uniform(0, 600), "width_cm": 90,
+            }))
+    for _ in range(4):
+        x, y = rng.uniform(0, 600), rng.uniform(0, 400)
+        objs.append(SimpleNamespace(type="room", position_json={
+            "type": "room", "polygon": [[x, y], [x + 200, y], [x + 200, y + 200], [x, y + 200]],
+        }))
+    return objs
+
+
+def _layout_items(rng: random.Random, n: int = 12) -> list:
+    return [
+        SimpleNamespace(
+            lf_id=i,
+            furniture_id=1000 + i,
+            position_json={"x": rng.uniform(0, 700), "y": rng.uniform(0, 500)},
+            size_json={"w": rng.uniform(40, 200), "h": rng.uniform(40, 120)},
+            rotation_deg=rng.choice([0, 90, 180, 270]),
+            z_index=i,
+            updated_at=None,
+        )
+        for i in range(n)
+    ]
+
+
+def _product_rows(rng: random.Random, n: int = 60) -> list:
+    return [
+        SimpleNamespace(
+            product_id=i,
+            name=f"상품 {i}",
+            image_url=f"https://img.example.com/{i}.jpg",
+            detail_url=f"https://shop.example.com/p/{i}",
+            category=rng.choice(["sofa", "bed_frame", "desk", "chair"]),
+            lowest_price=rng.randint(30_000, 2_000_000),
+            highest_price=rng.randint(2_000_000, 3_000_000),
+            score=rng.random() * 5,
+        )
+        for i in range(n)
+    ]
+
+
+_JSON_CLEAN = json.dumps({
+    "bestMatchStyles": ["SCANDINAVIAN", "NATURAL_WOOD"],
+    "worstStyle": "INDUSTRIAL",
+    "prompt": "bright minimal living room " * 20,
+})
+_JSON_FENCED = f"Here is the result:\n```json\n{_JSON_CLEAN}\n```\nLet me know {{if}} you need more."
+_JSON_TRUNCATED = json.dumps({
+    "items": [
+        {"furniture_id": i, "position": {"x": i * 10, "y": i * 5}, "size": {"w": 100, "h": 60}}
+        for i in range(20)
+    ]
+})[:-40]
+
+
+# --------------------------------------------------------
+# cases
+# --------------------------------------------------------
+@case("survey.pick_final_style[all 2187]")
+def _():
+    from app.services.survey_logic import pick_final_style
+    answers = _all_choice_answers()
+    return lambda: [pick_final_style(a) for a in answers]
+
+
+@case("survey.final_style_candidates[empty, uncached]")
+def _():
+    from app.services.survey_logic import _candidates
+    return lambda: _candidates.__wrapped__(())
+
+
+@case("ai_client.build_image_prompt[all styles]")
+def _():
+    from app.models.style_types import ALL_STYLES
+    from app.services.ai_client import build_image_prompt
+    return lambda: [build_image_prompt(s) for s in ALL_STYLES]
+
+
+@case("ai_decoding.parse_json_loose[clean]")
+def _():
+    from app.services.ai_decoding import parse_json_loose
+    return lambda: parse_json_loose(_JSON_CLEAN)
+
+
+@case("ai_decoding.parse_json_loose[fenced]")
+def _():
+    from app.services.ai_decoding import parse_json_loose
+    return lambda: parse_json_loose(_JSON_FENCED)
+
+
+@case("ai_decoding.parse_json_loose[truncated]")
+def _():
+    from app.services.ai_decoding import parse_json_loose
+    return lambda: parse_json_loose(_JSON_TRUNCATED)
+
+
+@case("schemas.FurnitureProductSimpleResponse[60 orm rows]")
+def _():
+    from app.schemas.furniture import FurnitureProductSimpleResponse
+    rows = _product_rows(_rng())
+    return lambda: [FurnitureProductSimpleResponse.model_validate(r, from_attributes=True) for r in rows]
+
+
+@case("schemas.RecommendationResponse[4x6 items]")
+def _():
+    from app.schemas.recommend import RecommendationResponse
+    rows = _product_rows(_rng(), 24)
+    payload = {
+        "session_id": 1,
+        "style_id": 1,
+        "categories": {
+            c: [vars(r) for r in rows if r.category == c][:6]
+            for c in ("sofa", "bed_frame", "desk", "chair")
+        },
+    }
+    return lambda: RecommendationResponse.model_validate(payload)
+
+
+@case("responses.dumps[60 simple rows]")
+def _():
+    from app.core.responses import dumps
+    payload = [vars(r) for r in _product_rows(_rng())]
+    return lambda: dumps(payload)
+
+
+@case("survey_routes._to_question_out[20 rows]")
+def _():
+    from app.routes.survey_routes import _to_question_out
+    rows = [
+        SimpleNamespace(
+            code=f"Q{i}",
+            question_text=f"질문 {i}",
+            type="CHOICE",
+            options_json=[{"value": v, "label": f"보기 {v}"} for v in "ABC"],
+        )
+        for i in range(20)
+    ]
+    return lambda: [_to_question_out(r) for r in rows]
+
+
+@case("layout_planner.build_floorplan_struct[56 objects]")
+def _():
+    from app.ai.layout_planner.gpt_layout_planner import build_floorplan_struct
+    objs = _fp_objects(_rng())
+    return lambda: json.dumps(build_floorplan_struct(objs), ensure_ascii=False)
+
+
+@case("occupancy.build_occupancy[56 objects]")
+def _():
+    from app.ai.layout_planner.gpt_layout_planner import build_floorplan_struct
+    from app.ai.layout_planner.occupancy import build_occupancy
+    struct = build_floorplan_struct(_fp_objects(_rng()))
+    return lambda: build_occupancy(struct)
+
+
+@case("occupancy.clearance_cm+rect_free[1000 points]")
+def _():
+    from app.ai.layout_planner.gpt_layout_planner import build_floorplan_struct
+    from app.ai.layout_planner.occupancy import build_occupancy
+    rng = _rng()
+    grid = build_occupancy(build_floorplan_struct(_fp_objects(rng)))
+    grid.integral   # 누적합은 첫 조회 때 1회 계산 → 측정에서 제외
+    points = [(rng.uniform(0, 800), rng.uniform(0, 600)) for _ in range(1000)]
+    return lambda: [(grid.clearance_cm(x, y), grid.rect_free(x, y, 80, 40)) for x, y in points]
+
+
+@case("catalog_fit.fit_catalog[200k products, 4 rooms, all categories]")
+def _():
+    from app.ai.layout_planner.gpt_layout_planner import build_floorplan_struct
+    from app.ai.layout_planner.occupancy import build_occupancy
+    from app.services.catalog_fit import CatalogArrays, fit_catalog, resolve_categories, room_dimensions
+    rng = _rng()
+    categories = resolve_categories(None, None)
+    catalog = CatalogArrays.from_rows([
+        (i, rng.choice(categories), rng.uniform(30, 300), rng.uniform(30, 250),
+         rng.uniform(30, 250), rng.random() * 5)
+        for i in range(200_000)
+    ])
+    struct = build_floorplan_struct(_fp_objects(rng))
+    rooms = room_dimensions(struct, build_occupancy(struct))
+    return lambda: fit_catalog(catalog, rooms, categories)
+
+
+@case("bundle_optimizer.best_bundles[6 categories x 3000, top 5]")
+def _():
+    from app.services.bundle_optimizer import best_bundles
+    rng = _rng()
+    groups = [
+        [(rng.randint(30, 3000) * 1000, rng.random() * 5, i) for i in range(3000)]
+        for _ in range(6)
+    ]
+    return lambda: best_bundles(groups, 2_000_000, 5)
+
+
+@case("preview_renderer.render_layout_svg[56 objects, 12 items]")
+def _():
+    from app.ai.layout_planner.preview_renderer import render_layout_svg
+    rng = _rng()
+    objs = _fp_objects(rng)
+    items = _layout_items(rng)
+    names = {i.furniture_id: f"가구 {i.furniture_id}" for i in items}
+    return lambda: render_layout_svg("/static/fp.png", objs, items, names)
+
+
+@case("preview_renderer.layout_version[12 items]")
+def _():
+    from app.ai.layout_planner.preview_renderer import layout_version
+    items = _layout_items(_rng())
+    return lambda: layout_version(items)
+
+
+# --------------------------------------------------------
+# runner
+# --------------------------------------------------------
+def measure(fn, repeat: int) -> dict:
+    # loop 수 보정: repeat 1회가 MIN_REPEAT_SEC 이상 되도록
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_REPEAT_SEC:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(MIN_REPEAT_SEC / elapsed * 1.2))
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops)
+
+    return {
+        "loops": loops,
+        "min_us": min(samples) * 1e6,
+        "median_us": statistics.median(samples) * 1e6,
+    }
+
+
+def _git_rev() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history() -> list:
+    if not os.path.exists(HISTORY_PATH):
+        return []
+    with open(HISTORY_PATH, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def pick_baseline(history: list, rev: str | None) -> dict | None:
+    if rev:
+        matches = [run for run in history if run.get("git_rev") == rev]
+        return matches[-1] if matches else None
+    return history[-1] if history else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU hot path 마이크로 벤치마크")
+    parser.add_argument("-k", action="append", default=[], help="케이스 이름 필터 (부분 일치, 여러 번 가능)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="회귀 판정 비율 (0.15 = 15%%)")
+    parser.add_argument("--baseline", help="비교할 git 커밋 (기본: 직전 실행)")
+    parser.add_argument("--no-save", action="store_true", help="결과를 history에 기록하지 않음")
+    args = parser.parse_args()
+
+    selected = {n: s for n, s in CASES.items() if not args.k or any(k in n for k in args.k)}
+
+    history = load_history()
+    baseline = pick_baseline(history, args.baseline)
+    base_results = baseline["results"] if baseline else {}
+
+    results = {}
+    regressions = []
+    print(f"{'case':<58}{'median':>12}{'min':>12}{'vs base':>10}")
+    print("-" * 92)
+    for name, setup in selected.items():
+        try:
+            fn = setup()
+        except Exception as e:   # 환경 문제(설정/의존성 누락)는 해당 케이스만 건너뜀
+            print(f"{name:<58}  SKIP ({type(e).__name__}: {e})")
+            continue
+
+        r = measure(fn, args.repeat)
+        results[name] = r
+
+        delta = ""
+        base = base_results.get(name)
+        if base:
+            ratio = r["median_us"] / base["median_us"] - 1
+            delta = f"{ratio:+.1%}"
+            if ratio > args.threshold:
+                regressions.append((name, ratio))
+                delta += " !"
+        print(f"{name:<58}{r['median_us']:>10.1f}us{r['min_us']:>10.1f}us{delta:>10}")
+
+    if baseline:
+        print(f"\nbaseline: {baseline.get('git_rev')} ({baseline.get('timestamp')})")
+
+    if results and not args.no_save:
+        os.makedirs(os.path.dirname(HISTORY_PATH), exist_ok=True)
+        with open(HISTORY_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "git_rev": _git_rev(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, ensure_ascii=False) + "\n")
+
+    if regressions:
+        print(f"\n{len(regressions)}개 케이스가 threshold({args.threshold:.0%})를 넘어 느려짐:")
+        for name, ratio in regressions:
+            print(f"  - {name}: {ratio:+.1%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
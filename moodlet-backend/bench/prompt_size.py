@@ -0,0 +1,85 @@
+# bench/prompt_size.py
+
+"""
+가구 배치 프롬프트 크기 비교: 기존 JSON vs 압축 인코딩 (precision별).
+
+- 평면도: fake 서버 기본 평면도 + 시드 고정 랜덤 평면도(벽 조각/방 polygon 꼭짓점 많음)
+- 토큰 수는 tiktoken이 있으면 실제 값, 없으면 근사치 (geometry_encoding.count_tokens)
+
+실행 (moodlet-backend 디렉터리에서)
+    python -m bench.prompt_size
+    python -m bench.prompt_size --precision 5 --precision 10 --precision 25
+"""
+
+import argparse
+import math
+import random
+
+from app.ai.layout_planner.geometry_encoding import encode_layout_inputs
+from bench.fake_openai import DEFAULT_CANNED
+
+DEFAULT_PRECISIONS = (1.0, 5.0, 10.0, 25.0)
+
+
+def _detailed_plan(rng: random.Random) -> dict:
+    """벽을 20cm 조각으로 쪼개고 방 polygon에 거의 일직선인 꼭짓점을 추가한 평면도 (검출 모델 출력 흉내)"""
+    walls = []
+    for w in DEFAULT_CANNED["floorplan"]["walls"]:
+        x1, y1, x2, y2 = w["x1"], w["y1"], w["x2"], w["y2"]
+        n = max(int(math.hypot(x2 - x1, y2 - y1) // 20), 1)
+        for k in range(n):
+            a, b = k / n, (k + 1) / n
+            walls.append({
+                "x1": round(x1 + (x2 - x1) * a + rng.uniform(-0.8, 0.8), 2),
+                "y1": round(y1 + (y2 - y1) * a + rng.uniform(-0.8, 0.8), 2),
+                "x2": round(x1 + (x2 - x1) * b + rng.uniform(-0.8, 0.8), 2),
+                "y2": round(y1 + (y2 - y1) * b + rng.uniform(-0.8, 0.8), 2),
+            })
+
+    rooms = []
+    for room in DEFAULT_CANNED["floorplan"]["rooms"]:
+        pts = room["polygon"]
+        dense = []
+        for (ax, ay), (bx, by) in zip(pts, pts[1:] + pts[:1]):
+            for k in range(10):
+                t = k / 10
+                dense.append([round(ax + (bx - ax) * t + rng.uniform(-1, 1), 2),
+                              round(ay + (by - ay) * t + rng.uniform(-1, 1), 2)])
+        rooms.append({"type": room["type"], "polygon": dense})
+
+    return {**DEFAULT_CANNED["floorplan"], "walls": walls, "rooms": rooms}
+
+
+def _furniture(rng: random.Random, n: int = 8) -> list:
+    return [
+        {
+            "id": 1000 + i,
+            "name": f"원목 수납장 {i}",
+            "width": float(rng.randint(40, 220)),
+            "depth": float(rng.randint(30, 90)),
+            "category": rng.choice(["sofa", "bed_frame", "desk", "chair", "shelf"]),
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="배치 프롬프트 토큰 수 비교")
+    parser.add_argument("--precision", type=float, action="append", help="양자화 단위 (여러 번 가능)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    plans = {"canned": DEFAULT_CANNED["floorplan"], "detailed": _detailed_plan(rng)}
+    furniture = _furniture(rng)
+
+    print(f"{'plan':<10}{'precision':>10}{'before':>10}{'after':>10}{'saved':>10}")
+    print("-" * 50)
+    for name, plan in plans.items():
+        for precision in args.precision or DEFAULT_PRECISIONS:
+            _, _, stats = encode_layout_inputs(plan, furniture, precision)
+            before, after = stats["tokens_before"], stats["tokens_after"]
+            print(f"{name:<10}{precision:>10g}{before:>10}{after:>10}{1 - after / before:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
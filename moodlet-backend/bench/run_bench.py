@@ -0,0 +1,239 @@
+# bench/run_bench.py
+
+"""
+엔드투엔드 벤치마크: 실제 사용자 흐름을 동시 사용자 N명으로 반복 실행.
+
+흐름 (사용자 1명, 1회)
+    설문 세션 생성 → follow-up → 최종 분석 → 추천
+    → 평면도 업로드 → 가구 배치 → 배치 프리뷰
+
+준비
+    1) 로컬 Postgres + `python migrate.py` (+ 가구 데이터: ingest_catalog.py)
+    2) python -m bench.fake_openai --latency-ms 800 --jitter-ms 300
+    3) .env 에 OPENAI_BASE_URL=http://127.0.0.1:8100/v1  (또는 AI_BACKEND=stub)
+
+실행 (moodlet-backend 디렉터리에서)
+    python -m bench.run_bench --users 20 --iterations 5
+    python -m bench.run_bench --url http://127.0.0.1:8000 --users 50 --json bench_result.json
+    python -m bench.run_bench --stream-followup     # follow-up을 SSE로 (첫 질문 도착 시간 ttfq 별도 집계)
+
+--url 이 없으면 main.app 을 같은 프로세스에서 ASGI로 직접 호출 (네트워크 제외한 서버 비용만 측정)
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import math
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+PNG_1PX = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+
+CHOICE_QUESTIONS = [f"Q{i}" for i in range(1, 8)]
+TEXT_ANSWERS = {
+    "T1": "거실에서 책 읽고 음악 듣는 시간이 제일 길어요.",
+    "T2": "따뜻한 간접 조명이 좋아요.",
+    "T3": "원목 테이블은 꼭 두고 싶어요.",
+}
+LAYOUT_FURNITURE_COUNT = 4
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, endpoint: str, seconds: float, ok: bool):
+        self.latencies[endpoint].append(seconds)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    @staticmethod
+    def _pct(sorted_values: list, p: float) -> float:
+        # nearest-rank
+        idx = max(math.ceil(p / 100 * len(sorted_values)) - 1, 0)
+        return sorted_values[idx]
+
+    def summary(self, elapsed: float) -> list:
+        rows = []
+        for endpoint, values in self.latencies.items():
+            values = sorted(values)
+            rows.append({
+                "endpoint": endpoint,
+                "count": len(values),
+                "errors": self.errors.get(endpoint, 0),
+                "rps": len(values) / elapsed if elapsed > 0 else 0.0,
+                "p50_ms": self._pct(values, 50) * 1000,
+                "p95_ms": self._pct(values, 95) * 1000,
+                "p99_ms": self._pct(values, 99) * 1000,
+                "max_ms": values[-1] * 1000,
+            })
+        return rows
+
+
+async def _request(client: httpx.AsyncClient, rec: Recorder, endpoint: str, method: str, url: str, **kwargs):
+    """endpoint: 집계용 라우트 템플릿 이름"""
+    start = time.perf_counter()
+    try:
+        resp = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        rec.add(endpoint, time.perf_counter() - start, ok=False)
+        return None
+    rec.add(endpoint, time.perf_counter() - start, ok=resp.status_code < 400)
+    return resp if resp.status_code < 400 else None
+
+
+async def _stream_followup(client: httpx.AsyncClient, rec: Recorder, payload: dict):
+    """SSE follow-up: 첫 질문 도착까지(ttfq)와 스트림 종료까지를 따로 기록"""
+    start = time.perf_counter()
+    first = None
+    ok = False
+    try:
+        async with client.stream("POST", "/survey/followup/stream", json=payload) as resp:
+            async for line in resp.aiter_lines():
+                if line == "event: question" and first is None:
+                    first = time.perf_counter() - start
+                elif line == "event: done":
+                    ok = True
+                elif line == "event: error":
+                    break
+    except httpx.HTTPError:
+        pass
+    if first is not None:
+        rec.add("POST /survey/followup/stream (ttfq)", first, ok=True)
+    rec.add("POST /survey/followup/stream", time.perf_counter() - start, ok=ok)
+
+
+async def _user_flow(client: httpx.AsyncClient, rec: Recorder, furniture_ids: list, stream_followup: bool):
+    choice_answers = {q: random.choice("ABC") for q in CHOICE_QUESTIONS}
+
+    # 1) 설문
+    resp = await _request(client, rec, "POST /survey/sessions", "POST", "/survey/sessions", json={})
+    session_id = resp.json()["session_id"] if resp else None
+
+    followup = {"session_id": session_id, "choiceAnswers": choice_answers}
+    if stream_followup:
+        await _stream_followup(client, rec, followup)
+    else:
+        await _request(client, rec, "POST /survey/followup", "POST", "/survey/followup", json=followup)
+    await _request(
+        client, rec, "POST /survey/final-analysis", "POST", "/survey/final-analysis",
+        json={"session_id": session_id, "choiceAnswers": choice_answers, "textAnswers": TEXT_ANSWERS},
+    )
+
+    # 2) 추천
+    if session_id:
+        await _request(
+            client, rec, "POST /recommendations/from-survey", "POST", "/recommendations/from-survey",
+            params={"session_id": session_id},
+        )
+
+    # 3) 평면도 → 배치
+    resp = await _request(
+        client, rec, "POST /api/floorplan/upload", "POST", "/api/floorplan/upload",
+        files={"file": ("bench.png", PNG_1PX, "image/png")},
+    )
+    if not resp or not furniture_ids:
+        return
+    fp_id = resp.json()["fp_id"]
+
+    picked = random.sample(furniture_ids, min(LAYOUT_FURNITURE_COUNT, len(furniture_ids)))
+    resp = await _request(
+        client, rec, "POST /api/layout/start", "POST", "/api/layout/start",
+        json={"fp_id": fp_id, "furniture_ids": picked},
+    )
+    if resp:
+        layout_id = resp.json()["layout_id"]
+        await _request(
+            client, rec, "GET /api/layout/preview/{layout_id}", "GET", f"/api/layout/preview/{layout_id}",
+        )
+
+
+async def _virtual_user(client, rec, furniture_ids, iterations: int, stream_followup: bool):
+    for _ in range(iterations):
+        await _user_flow(client, rec, furniture_ids, stream_followup)
+
+
+def _make_client(url: str | None, timeout: float) -> httpx.AsyncClient:
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=timeout)
+
+    from main import app
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://bench",
+        timeout=timeout,
+    )
+
+
+async def run(
+    url: str | None, users: int, iterations: int, timeout: float, stream_followup: bool = False
+) -> tuple[list, float]:
+    rec = Recorder()
+    async with _make_client(url, timeout) as client:
+        resp = await client.get("/furniture/search", params={"limit": 50})
+        furniture_ids = (
+            [row["product_id"] for row in resp.json()["items"]] if resp.status_code == 200 else []
+        )
+        if not furniture_ids:
+            print("[bench] 가구 데이터가 없어 배치 단계는 건너뜀 (ingest_catalog.py로 적재 필요)")
+
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            _virtual_user(client, rec, furniture_ids, iterations, stream_followup) for _ in range(users)
+        ])
+        elapsed = time.perf_counter() - start
+
+    return rec.summary(elapsed), elapsed
+
+
+def print_report(rows: list, elapsed: float, users: int, iterations: int):
+    total = sum(r["count"] for r in rows)
+    errors = sum(r["errors"] for r in rows)
+    print(
+        f"\nusers={users} iterations={iterations} elapsed={elapsed:.1f}s "
+        f"requests={total} errors={errors} throughput={total / elapsed:.1f} req/s\n"
+    )
+    header = f"{'endpoint':<40}{'count':>7}{'err':>6}{'rps':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(
+            f"{r['endpoint']:<40}{r['count']:>7}{r['errors']:>6}{r['rps']:>8.1f}"
+            f"{r['p50_ms']:>8.0f}ms{r['p95_ms']:>8.0f}ms{r['p99_ms']:>8.0f}ms{r['max_ms']:>8.0f}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Moodlet 엔드투엔드 벤치마크")
+    parser.add_argument("--url", help="대상 서버 (없으면 in-process ASGI)")
+    parser.add_argument("--users", type=int, default=10, help="동시 가상 사용자 수")
+    parser.add_argument("--iterations", type=int, default=3, help="사용자당 흐름 반복 횟수")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stream-followup", action="store_true", help="follow-up을 SSE 엔드포인트로 호출 (ttfq 측정)")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장 (변경 전/후 비교용)")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    rows, elapsed = asyncio.run(
+        run(args.url, args.users, args.iterations, args.timeout, args.stream_followup)
+    )
+    print_report(rows, elapsed, args.users, args.iterations)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {"users": args.users, "iterations": args.iterations, "elapsed": elapsed, "endpoints": rows},
+                f, ensure_ascii=False, indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,4 +6,17 @@ load_dotenv()
 class Settings:
     DB_URL: str = os.getenv("DATABASE_URL")
 
-settings = Settings()
\ No newline at end of file
+    # 커넥션 풀 (워커 1개 기준)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "5"))       # 커넥션 대기 최대 초
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+
+    # PgBouncer(transaction pooling) 앞단 사용 시 true → 앱 풀 비활성화
+    DB_PGBOUNCER: bool = os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes")
+
+    # SQL 로그 출력 (쿼리마다 로깅 비용 → 디버깅할 때만 true)
+    DB_ECHO: bool = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+
+settings = Settings()
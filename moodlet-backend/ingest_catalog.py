@@ -0,0 +1,25 @@
+# 상품 카탈로그 적재 스크립트
+#
+#   python ingest_catalog.py products.jsonl
+#   python ingest_catalog.py products.csv --batch-size 10000
+
+import argparse
+
+from app.database import engine
+from app.services.catalog_ingest import DEFAULT_BATCH_SIZE, ingest_catalog, read_feed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV/JSONL 상품 피드를 furniture_product 로 적재")
+    parser.add_argument("feeds", nargs="+", help="상품 피드 파일 (.csv / .jsonl)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    for path in args.feeds:
+        print(f"▶ {path}")
+        stats = ingest_catalog(engine, read_feed(path), batch_size=args.batch_size)
+        print(f"✅ 완료: {stats.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,38 @@
-from app.routes import user_routes, survey_routes, recommend_routes
-from app.database import Base, engine   # ⬅ 여기 수정됨
+import time
+
+_import_started = time.perf_counter()   # 콜드 스타트 측정용 (import ~ startup 완료)
+
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
+
 from app.core.config import settings
+from app.core.metrics import HTTP_REQUEST_SECONDS
+from app.core.tracing import (
+    configure_tracing,
+    debug_requested,
+    trace_request,
+    tree_header_value,
+    DEBUG_HEADER,
+    TRACE_ID_HEADER,
+    TRACE_TREE_HEADER,
+)
+from app.database import engine, async_engine
+from app.services.ai_gateway import close_gateway
+from app.routes import user_routes, survey_routes, recommend_routes
 from app.routes.google_auth import router as google_auth_router
 from app.routes.furniture_routes import router as furniture_router
 from app.routes.floorplan_router import router as floorplan_router
 from app.routes.layout_router import router as layout_router
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-import os
-
-# 모델 import (테이블 생성 위해)
-from app.models.user import User
+from app.routes.metrics_routes import router as metrics_router
 
-app = FastAPI()
+# backend 절대경로
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
 
 # ✅ CORS 설정
 origins = [
@@ -22,33 +40,84 @@ origins = [
     "http://127.0.0.1:3000",
 ]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,   # 개발 중이면 ["*"] 도 가능
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-app.add_middleware(
-    SessionMiddleware,
-    secret_key=settings.JWT_SECRET,
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    import 시점에는 DB 연결 / 외부 호출을 하지 않음
+    - 테이블 생성은 migrate.py 로 분리 (서버 기동과 무관)
+    - OpenAI 클라이언트(ai_gateway), Google OAuth 는 첫 사용 시 생성
+    """
+    configure_tracing(settings.TRACE_SAMPLE_RATE, settings.TRACE_EXPORT_PATH, settings.TRACE_DEBUG_TOKEN)
+    print(f"[startup] ready in {(time.perf_counter() - _import_started) * 1000:.0f}ms")
+    yield
+    await close_gateway()
+    await async_engine.dispose()
+    engine.dispose()
 
-# 개발 단계에서는 자동 테이블 생성
-Base.metadata.create_all(bind=engine)
 
-# 라우터 등록
-app.include_router(user_routes.router)
-app.include_router(google_auth_router)
-app.include_router(furniture_router)
-app.include_router(survey_routes.router)  # ⬅ 추가
-app.include_router(recommend_routes.router)  # ⬅ 추가
-app.include_router(floorplan_router, prefix="/api")
-app.include_router(layout_router, prefix="/api")
+async def record_request_metrics(request, call_next):
+    """라우트별 응답 시간 메트릭 (/metrics) + 요청 트레이싱"""
+    start = time.perf_counter()
+    status = 500
+    debug = debug_requested(request.headers.get(DEBUG_HEADER))
+
+    with trace_request(f"{request.method} {request.url.path}", force=debug) as root:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            if root is not None:
+                root.set(status=status)
+                response.headers[TRACE_ID_HEADER] = root.trace_id
+                if debug:
+                    response.headers[TRACE_TREE_HEADER] = tree_header_value(root)
+            return response
+        finally:
+            # 경로 파라미터가 들어간 실제 URL 대신 라우트 템플릿으로 집계 (/furniture/{product_id})
+            route = request.scope.get("route")
+            route_path = route.path if route else "unmatched"
+            if root is not None:
+                root.name = f"{request.method} {route_path}"
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                request.method,
+                route_path,
+                str(status),
+            )
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(lifespan=lifespan)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,   # 개발 중이면 ["*"] 도 가능
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Total-Count", TRACE_ID_HEADER, TRACE_TREE_HEADER],
+    )
+
+    app.add_middleware(
+        SessionMiddleware,
+        secret_key=settings.JWT_SECRET,
+    )
+
+    app.middleware("http")(record_request_metrics)
+
+    # 라우터 등록
+    app.include_router(user_routes.router)
+    app.include_router(google_auth_router)
+    app.include_router(furniture_router)
+    app.include_router(survey_routes.router)
+    app.include_router(recommend_routes.router)
+    app.include_router(floorplan_router, prefix="/api")
+    app.include_router(layout_router, prefix="/api")
+    app.include_router(metrics_router)
+
+    app.mount("/static", StaticFiles(directory="static"), name="static")
+
+    return app
 
-# backend 절대경로
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
\ No newline at end of file
+app = create_app()
@@ -0,0 +1,141 @@
+# 테이블 생성 스크립트 (서버 기동 시 자동 생성하지 않음)
+#
+#   python migrate.py
+#
+# create_all은 이미 있는 테이블에 컬럼/인덱스를 추가하지 않음
+# → 기존 DB용 변경은 아래 upgrade 단계에서 (모두 여러 번 실행해도 안전)
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+
+from app.database import Base, SessionLocal, engine
+
+# 모델 import (metadata 등록용)
+from app.models import user, survey, style_theme, furniture, floorplan, image_composition, idempotency  # noqa: F401
+from app.models.furniture import FurniturePrice, FurnitureProduct
+from app.services.furniture_service import backfill_price_values
+
+
+def _create_indexes(conn, table, names: tuple):
+    """모델에 선언된 인덱스를 CREATE INDEX IF NOT EXISTS로 생성"""
+    for index in table.indexes:
+        if index.name in names:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+# --------------------------------------------------------
+# 쇼핑몰 가격 정수 컬럼 (텍스트 가격 파싱 값)
+# --------------------------------------------------------
+PRICE_VALUE_COLUMNS = (
+    "ALTER TABLE furniture_price ADD COLUMN IF NOT EXISTS mall_price_value BIGINT",
+    "ALTER TABLE furniture_price ADD COLUMN IF NOT EXISTS ship_fee_value BIGINT",
+)
+PRICE_VALUE_INDEXES = ("ix_furniture_price_product_price", "ix_furniture_price_product_total")
+
+
+def upgrade_price_values():
+    with engine.begin() as conn:
+        for sql in PRICE_VALUE_COLUMNS:
+            conn.execute(text(sql))
+        _create_indexes(conn, FurniturePrice.__table__, PRICE_VALUE_INDEXES)
+
+    # 비어 있는 정수 값 채우기 + 상품별 lowest/highest_price 재계산
+    with SessionLocal() as db:
+        updated = backfill_price_values(db)
+    print(f"✅ furniture_price 가격 값 backfill: {updated}건")
+
+
+# --------------------------------------------------------
+# 카탈로그 적재 upsert 자연키 (ON CONFLICT 대상 unique 인덱스)
+# 크롤링 데이터에 이미 중복이 있으면 인덱스 생성이 실패하므로 먼저 정리
+# --------------------------------------------------------
+DEDUPE_CATALOG_SQL = (
+    # detail_url별 가장 최근(product_id 최대) 행만 남김
+    """
+    CREATE TEMP TABLE product_dupes ON COMMIT DROP AS
+    SELECT product_id, keep_id
+    FROM (
+        SELECT product_id, MAX(product_id) OVER (PARTITION BY detail_url) AS keep_id
+        FROM furniture_product
+        WHERE detail_url IS NOT NULL
+    ) t
+    WHERE product_id <> keep_id
+    """,
+    # 배치 결과 / 쇼핑몰 가격은 남기는 행으로 옮김 (임베딩은 CASCADE로 삭제 후 재계산)
+    """
+    UPDATE layout_furniture_item lf SET furniture_id = d.keep_id
+    FROM product_dupes d WHERE lf.furniture_id = d.product_id
+    """,
+    """
+    UPDATE furniture_price fp SET product_id = d.keep_id
+    FROM product_dupes d WHERE fp.product_id = d.product_id
+    """,
+    """
+    DELETE FROM furniture_product p
+    USING product_dupes d WHERE p.product_id = d.product_id
+    """,
+    # (product_id, mall_name)별 가장 최근(price_id 최대) 가격만 남김
+    """
+    DELETE FROM furniture_price a
+    USING furniture_price b
+    WHERE a.product_id = b.product_id
+      AND a.mall_name = b.mall_name
+      AND a.price_id < b.price_id
+    """,
+    """
+    UPDATE furniture_product p
+    SET lowest_price = agg.low, highest_price = agg.high
+    FROM (
+        SELECT product_id, MIN(mall_price_value) AS low, MAX(mall_price_value) AS high
+        FROM furniture_price
+        WHERE product_id IN (SELECT keep_id FROM product_dupes)
+        GROUP BY product_id
+    ) agg
+    WHERE p.product_id = agg.product_id
+    """,
+)
+
+
+def upgrade_catalog_keys():
+    with engine.begin() as conn:
+        removed = 0
+        for sql in DEDUPE_CATALOG_SQL:
+            result = conn.execute(text(sql))
+            if sql.lstrip().startswith("DELETE"):
+                removed += result.rowcount
+        _create_indexes(conn, FurnitureProduct.__table__, ("ux_furniture_product_detail_url",))
+        _create_indexes(conn, FurniturePrice.__table__, ("ux_furniture_price_product_mall",))
+    print(f"✅ 카탈로그 자연키 unique 인덱스 확인 (중복 {removed}행 정리)")
+
+
+# --------------------------------------------------------
+# 목록 조회 인덱스 (keyset 페이지네이션 + 패싯 검색 필터)
+# --------------------------------------------------------
+LISTING_INDEXES = (
+    "ix_furniture_product_category_score",
+    "ix_furniture_product_category_price",
+    "ix_furniture_product_category_created",
+    "ix_furniture_product_category_width",
+    "ix_furniture_product_material",
+    "ix_furniture_product_color",
+    "ix_furniture_product_style_id",
+)
+
+
+def upgrade_listing_indexes():
+    with engine.begin() as conn:
+        _create_indexes(conn, FurnitureProduct.__table__, LISTING_INDEXES)
+    print("✅ 목록 조회 인덱스 확인")
+
+
+def migrate():
+    Base.metadata.create_all(bind=engine)
+    print("✅ 테이블 생성/확인 완료")
+
+    upgrade_price_values()
+    upgrade_catalog_keys()
+    upgrade_listing_indexes()
+
+
+if __name__ == "__main__":
+    migrate()